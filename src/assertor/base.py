@@ -1,8 +1,9 @@
 """
 断言基类
-每个断言必须实现 verify(context)
+每个断言必须实现 render(context) 和 assert_result(result, rerun)
 """
 from abc import ABC, abstractmethod
+from assertor.scan import OutputView
 
 class Asserter(ABC):
     @abstractmethod
@@ -10,5 +11,54 @@ class Asserter(ABC):
         ...
 
     @abstractmethod
-    def assert_result(self, result: dict):
+    def assert_result(self, result: dict, rerun=None):
+        """
+        rerun: 可选，rerun() 重新执行命令返回新结果（eventually 类断言使用）
+        返回最终用于判断的结果
+        """
         ...
+
+
+class Check(Asserter):
+    """
+    可组合的断言（contains / regex / rc / json ... 以及 all / any）
+
+    子类声明需要在输出中查找的子串 / 正则（substrings / regexes），
+    由 check() 汇总整棵断言树的需求后对每个 stream 只扫描一遍（见 assertor.scan），
+    再逐个 evaluate(view) 判定；不满足时抛 AssertionError
+    """
+
+    # 断言作用的输出：stdout / stderr
+    stream = "stdout"
+
+    def substrings(self):
+        return ()
+
+    def regexes(self):
+        return ()
+
+    def children(self):
+        return ()
+
+    def walk(self):
+        yield self
+        for child in self.children():
+            yield from child.walk()
+
+    def evaluate(self, view):
+        raise NotImplementedError
+
+    def describe(self) -> dict:
+        """--plan 中展示的断言内容"""
+        return {"type": type(self).__name__, "stream": self.stream}
+
+    def check(self, result: dict):
+        self.evaluate(OutputView(result, list(self.walk())))
+
+    def assert_result(self, result: dict, rerun=None):
+        self.check(result)
+        return result
+
+    async def aassert_result(self, result: dict, rerun=None):
+        self.check(result)
+        return result
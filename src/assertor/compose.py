@@ -0,0 +1,44 @@
+"""
+组合断言：all（全部满足）/ any（任一满足）
+
+    expect:
+      all:
+        - rc: 0
+        - contains_all: ["ready", "primary"]
+        - any:
+            - contains: "promoted"
+            - stderr: {contains: "already leader"}
+
+整棵组合树只扫描一次输出（见 Check.check / assertor.scan），子断言各自在共享的 OutputView 上判定
+"""
+from assertor.base import Check
+
+
+class AllAsserter(Check):
+    def __init__(self, checks):
+        self.checks = list(checks)
+
+    def children(self):
+        return self.checks
+
+    def render(self, context: dict):
+        return type(self)([c.render(context) for c in self.checks])
+
+    def describe(self):
+        return {"type": type(self).__name__, "checks": [c.describe() for c in self.checks]}
+
+    def evaluate(self, view):
+        for c in self.checks:
+            c.evaluate(view)
+
+
+class AnyAsserter(AllAsserter):
+    def evaluate(self, view):
+        errors = []
+        for c in self.checks:
+            try:
+                c.evaluate(view)
+                return
+            except AssertionError as e:
+                errors.append(str(e))
+        raise AssertionError("expect any of:\n" + "\n".join(f"- {e}" for e in errors))
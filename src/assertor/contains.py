@@ -1,29 +1,50 @@
-from jinja2 import Environment, StrictUndefined
-import time
+from assertor.base import Check
+from assertor.eventually import Backoff, poll_until, apoll_until
+from core.template import compile_template
 
-_env = Environment(undefined=StrictUndefined)
-
-class ContainsAsserter:
-    def __init__(self, text: str, eventually=False, timeout=5):
+class ContainsAsserter(Check):
+    def __init__(self, text: str, eventually=False, timeout=5, backoff=None, stream="stdout"):
         self.raw = text
         self.text = text
         self.eventually = eventually
         self.timeout = timeout
+        self.backoff = backoff
+        self.stream = stream
 
     def render(self, context: dict):
-        tpl = _env.from_string(self.raw)
-        return ContainsAsserter(tpl.render(**context), eventually=self.eventually, timeout=self.timeout)
+        tpl = compile_template(self.raw)
+        return ContainsAsserter(tpl.render(**context), eventually=self.eventually,
+                                timeout=self.timeout, backoff=self.backoff, stream=self.stream)
+
+    def substrings(self):
+        return [self.text]
+
+    def evaluate(self, view):
+        # 流式捕获的大输出由 OutputView 扫描完整输出，不依赖被截断的 stdout 摘要
+        if not view.found(self.stream, self.text):
+            raise AssertionError(f"expect {self.stream} contains '{self.text}', got:\n{view.summary(self.stream)}")
+
+    def describe(self):
+        return dict(super().describe(), text=self.text, eventually=self.eventually)
 
-    def assert_result(self, result: dict):
+    def assert_result(self, result: dict, rerun=None):
+        """
+        :param rerun: rerun() -> 新的执行结果（engine 传入 redo 执行函数）
+                      eventually 模式下检查失败会重新执行命令再检查
+        :return: 最终通过检查的结果
+        """
         if not self.eventually:
-            if self.text not in result["stdout"]:
-                raise AssertionError(f"expect stdout contains '{self.text}', got:\n{result['stdout']}")
-        else:
-            end_time = time.time() + self.timeout
-            last_exc = None
-            while time.time() < end_time:
-                if self.text in result["stdout"]:
-                    return
-                last_exc = AssertionError(f"expect stdout contains '{self.text}', got:\n{result['stdout']}")
-                time.sleep(0.5)
-            raise last_exc
+            self.check(result)
+            return result
+
+        return poll_until(self.check, result, rerun, self.timeout,
+                          backoff=Backoff(**(self.backoff or {})))
+
+    async def aassert_result(self, result: dict, rerun=None):
+        """assert_result 的 asyncio 版本，rerun() 返回 awaitable"""
+        if not self.eventually:
+            self.check(result)
+            return result
+
+        return await apoll_until(self.check, result, rerun, self.timeout,
+                                 backoff=Backoff(**(self.backoff or {})))
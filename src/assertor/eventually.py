@@ -0,0 +1,107 @@
+"""
+Eventually 轮询引擎
+
+用于最终一致性断言：检查失败时重新执行命令（redo）拿到新结果再检查，
+间隔按指数退避 + 抖动增长，直到成功或超时
+"""
+import random
+import time
+from assertor.base import Asserter
+
+
+class Backoff:
+    """
+    指数退避间隔生成器
+
+    第 n 次间隔 = min(max_interval, min_interval * factor ** n)，
+    再乘以 [1 - jitter, 1 + jitter] 的随机因子，并限制在 [min_interval, max_interval]
+    """
+
+    def __init__(self, min_interval=0.1, max_interval=2.0, factor=2.0, jitter=0.2, rng=None):
+        if min_interval <= 0 or max_interval < min_interval:
+            raise ValueError(f"invalid backoff interval: min={min_interval}, max={max_interval}")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.jitter = jitter
+        self._rng = rng or random.Random()
+
+    def __iter__(self):
+        delay = self.min_interval
+        while True:
+            jittered = delay * self._rng.uniform(1 - self.jitter, 1 + self.jitter)
+            yield min(self.max_interval, max(self.min_interval, jittered))
+            delay = min(self.max_interval, delay * self.factor)
+
+
+def poll_until(check, result, rerun, timeout, backoff=None):
+    """
+    轮询直到 check 通过
+
+    :param check:   check(result)，不满足时抛 AssertionError
+    :param result:  首次执行（do）的结果，先直接检查一次
+    :param rerun:   rerun() -> 新结果；为 None 时无法刷新结果，失败立即抛出
+    :param timeout: 总超时（秒）
+    :param backoff: Backoff 实例，默认 Backoff()
+    :return: 通过检查的那次结果
+    """
+    deadline = time.monotonic() + timeout
+    delays = iter(backoff or Backoff())
+
+    while True:
+        try:
+            check(result)
+            return result
+        except AssertionError:
+            remaining = deadline - time.monotonic()
+            if rerun is None or remaining <= 0:
+                raise
+
+        time.sleep(min(next(delays), remaining))
+        result = rerun()
+
+
+async def apoll_until(check, result, rerun, timeout, backoff=None):
+    """poll_until 的 asyncio 版本：rerun() 返回 awaitable，等待期间不阻塞事件循环"""
+    import asyncio
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    delays = iter(backoff or Backoff())
+
+    while True:
+        try:
+            check(result)
+            return result
+        except AssertionError:
+            remaining = deadline - loop.time()
+            if rerun is None or remaining <= 0:
+                raise
+
+        await asyncio.sleep(min(next(delays), remaining))
+        result = await rerun()
+
+
+class EventuallyAsserter(Asserter):
+    """
+    把任意断言（contains_all / regex / rc / json / all / any ...）包装成 eventually 断言：
+    检查失败时 redo 重新执行命令，按退避间隔轮询直到通过或超时
+    """
+
+    def __init__(self, inner, timeout=5, backoff=None):
+        self.inner = inner
+        self.timeout = timeout
+        self.backoff = backoff
+
+    def render(self, context: dict):
+        return EventuallyAsserter(self.inner.render(context), timeout=self.timeout, backoff=self.backoff)
+
+    def describe(self):
+        return {"type": "EventuallyAsserter", "timeout": self.timeout, "inner": self.inner.describe()}
+
+    def assert_result(self, result: dict, rerun=None):
+        return poll_until(self.inner.check, result, rerun, self.timeout,
+                          backoff=Backoff(**(self.backoff or {})))
+
+    async def aassert_result(self, result: dict, rerun=None):
+        return await apoll_until(self.inner.check, result, rerun, self.timeout,
+                                 backoff=Backoff(**(self.backoff or {})))
@@ -1,17 +1,77 @@
+from assertor.compose import AllAsserter, AnyAsserter
 from assertor.contains import ContainsAsserter
+from assertor.eventually import EventuallyAsserter
+from assertor.structured import JsonAsserter, RcAsserter, RowAsserter, RowCountAsserter
+from assertor.text import ContainsAllAsserter, ContainsAnyAsserter, NotContainsAsserter, RegexAsserter
+
+# eventually 配置中透传给 Backoff 的字段
+_BACKOFF_KEYS = ("min_interval", "max_interval", "factor", "jitter")
+
+# 以流为参数的叶子断言：key -> (conf, stream) -> Check
+_LEAVES = {
+    "contains": lambda v, s: ContainsAsserter(v, stream=s) if isinstance(v, str) else ContainsAllAsserter(v, s),
+    "contains_all": ContainsAllAsserter,
+    "contains_any": ContainsAnyAsserter,
+    "not_contains": NotContainsAsserter,
+    "regex": RegexAsserter,
+    "rc": lambda v, s: RcAsserter(v),
+    "json": lambda v, s: _each(v, lambda c: JsonAsserter.from_config(c, s)),
+    "row": lambda v, s: _each(v, lambda c: RowAsserter.from_config(c, s)),
+    "row_count": RowCountAsserter.from_config,
+}
+
 
 def build_asserter(conf: dict):
     """
     conf: dict, 可以是:
       {"contains": "..."}             -> 普通 assert
       {"eventually": {"contains": "...", "timeout": 5}} -> Eventually assert
+        可选退避参数: min_interval / max_interval / factor / jitter
+      contains_all / contains_any / not_contains / regex / rc / json / row / row_count，
+      all / any 组合，stdout / stderr 切换作用的输出；同一层写多个 key 等价于 all
+      eventually 中可以是上面任意一种
     """
-    if "contains" in conf:
-        return ContainsAsserter(conf["contains"])
-    elif "eventually" in conf:
-        eventual_conf = conf["eventually"]
-        text = eventual_conf["contains"]
-        timeout = eventual_conf.get("timeout", 5)
-        return ContainsAsserter(text, eventually=True, timeout=timeout)
-
-    raise ValueError(f"Unknown assertor: {conf}")
+    if not isinstance(conf, dict) or not conf:
+        raise ValueError(f"Unknown assertor: {conf}")
+
+    if "eventually" in conf:
+        if len(conf) > 1:
+            raise ValueError(f"'eventually' can not be combined with other keys: {conf}")
+        eventual_conf = dict(conf["eventually"])
+        timeout = eventual_conf.pop("timeout", 5)
+        backoff = {k: eventual_conf.pop(k) for k in _BACKOFF_KEYS if k in eventual_conf}
+        if list(eventual_conf) == ["contains"] and isinstance(eventual_conf["contains"], str):
+            return ContainsAsserter(eventual_conf["contains"], eventually=True, timeout=timeout, backoff=backoff)
+        return EventuallyAsserter(_build(eventual_conf), timeout=timeout, backoff=backoff)
+
+    return _build(conf)
+
+
+def _build(conf, stream="stdout"):
+    if not isinstance(conf, dict) or not conf:
+        raise ValueError(f"Unknown assertor: {conf}")
+
+    checks = []
+    for key, value in conf.items():
+        if key in ("all", "any"):
+            if not isinstance(value, list) or not value:
+                raise ValueError(f"'{key}' expects a non-empty list: {value}")
+            children = [_build(c, stream) for c in value]
+            checks.append(AllAsserter(children) if key == "all" else AnyAsserter(children))
+        elif key in ("stdout", "stderr"):
+            checks.append(_build(value, key))
+        elif key in _LEAVES:
+            checks.append(_LEAVES[key](value, stream))
+        else:
+            raise ValueError(f"Unknown assertor: {key} in {conf}")
+
+    return checks[0] if len(checks) == 1 else AllAsserter(checks)
+
+
+def _each(conf, build):
+    """json / row 可写成单个 dict 或 dict 列表（全部满足）"""
+    if isinstance(conf, dict):
+        return build(conf)
+    if isinstance(conf, list) and conf and all(isinstance(c, dict) for c in conf):
+        return AllAsserter([build(c) for c in conf])
+    raise ValueError(f"expected a dict or a list of dicts, got {conf}")
@@ -0,0 +1,214 @@
+"""
+输出扫描：一次断言判定只读一遍输出
+
+组合断言（all / any / 多个 contains_*、not_contains、regex）中所有需要查找的子串和正则
+按 stream（stdout / stderr）汇总，每个 stream 只扫描一遍：
+- 内存中的输出：整段文本作为一块查找
+- 落盘的大输出（OutputBuffer.spooled）：按块流式读取，子串在块之间保留 (最长子串 - 1) 个字符的重叠
+- 正则逐行匹配（不跨行，^ / $ 为行首 / 行尾），与输出在内存还是落盘、块怎么切分无关；
+  先在整块上查找，命中跨行时再只用命中所在的行确认
+- 所有子串 / 正则都已命中时提前结束，不再读剩余输出
+
+多子串查找每块只扫描一趟：装了 pyahocorasick 时用其 Aho–Corasick 自动机（C 实现）；
+否则用全部待查子串组成的一个正则交替式（re.escape，按长度降序）从前往后查找，
+每命中一个新子串就把它移出交替式，从命中位置的下一个字符继续（子串可以互相重叠），整块文本只过一遍
+JSON / 按行解析的结构化结果在同一次判定中也只解析一次
+"""
+import ast
+import functools
+import json
+import re
+
+try:
+    import ahocorasick
+except ImportError:  # 可选依赖
+    ahocorasick = None
+
+# 落盘输出上正则的单行上限：超长行按此长度截断查找，避免残行无限增长
+_MAX_LINE = 1024 * 1024
+
+
+class OutputView:
+    """一次判定中共享的执行结果视图：子串 / 正则命中、解析后的 JSON / 行只计算一次"""
+
+    def __init__(self, result: dict, checks):
+        self.result = result
+        self._found = {}
+        self._matched = {}
+        self._parsed = {}
+
+        wanted = {}
+        for check in checks:
+            subs, regexes = wanted.setdefault(check.stream, (set(), {}))
+            subs.update(check.substrings())
+            for r in check.regexes():
+                regexes[r.pattern, r.flags] = r
+        for stream, (subs, regexes) in wanted.items():
+            self._found[stream], self._matched[stream] = _scan(
+                self._chunks(stream), subs, list(regexes.values()))
+
+    def found(self, stream, text):
+        return not text or text in self._found.get(stream, ())
+
+    def matched(self, stream, regex):
+        return (regex.pattern, regex.flags) in self._matched.get(stream, ())
+
+    def summary(self, stream):
+        """失败信息中展示的（有界）输出"""
+        return self.result.get(stream) or ""
+
+    def text(self, stream):
+        """完整输出（落盘时从文件读回；结构化断言需要完整内容）"""
+        return self._parse(("text", stream), lambda: "".join(self._chunks(stream)))
+
+    def json(self, stream):
+        def parse():
+            try:
+                return json.loads(self.text(stream))
+            except ValueError as e:
+                raise AssertionError(f"expect {stream} to be JSON: {e}, got:\n{self.summary(stream)}") from None
+        return self._parse(("json", stream), parse)
+
+    def rows(self, stream, separator="|"):
+        return self._parse(("rows", stream, separator),
+                           lambda: [_parse_row(line, separator) for line in self.text(stream).splitlines() if line])
+
+    def _parse(self, key, fn):
+        if key not in self._parsed:
+            self._parsed[key] = fn()
+        return self._parsed[key]
+
+    def _spooled(self, stream):
+        buf = self.result.get(f"{stream}_buffer")
+        return buf is not None and buf.spooled
+
+    def _chunks(self, stream):
+        if self._spooled(stream):
+            return self.result[f"{stream}_buffer"].iter_text()
+        return [self.result.get(stream) or ""]
+
+
+def _parse_row(line, separator):
+    """SQL 命令输出为 str(tuple)；其他（如 psql -At）按分隔符切分"""
+    if line.startswith("(") and line.endswith(")"):
+        try:
+            row = ast.literal_eval(line)
+        except (ValueError, SyntaxError):
+            pass
+        else:
+            return list(row) if isinstance(row, tuple) else [row]
+    return line.split(separator)
+
+
+def _scan(chunks, substrings, regexes):
+    """
+    返回 (命中的子串集合, 命中的正则 key 集合)
+    正则按行边界切块查找，块尾不完整的行留到下一块（超过 _MAX_LINE 的行截断查找）
+    """
+    pending = {s for s in substrings if s}
+    found = set(substrings) - pending
+    regexes = list(regexes)
+    matched = set()
+    if not pending and not regexes:
+        return found, matched
+
+    automaton = _automaton(pending) if ahocorasick is not None and len(pending) > 1 else None
+    keep = max((len(s) for s in pending), default=1) - 1
+    carry = ""
+    line = ""
+
+    for chunk in chunks:
+        if pending:
+            window = carry + chunk
+            if automaton is not None:
+                for _, s in automaton.iter(window):
+                    found.add(s)
+                pending -= found
+            else:
+                _find_literals(window, pending, found)
+            carry = window[-keep:] if keep else ""
+
+        if regexes:
+            window = line + chunk
+            cut = window.rfind("\n")
+            if cut >= 0:
+                # 不带最后的换行符查找：MULTILINE 下 ^ / $ 不会在块尾多匹配出一个空行
+                regexes = _search(regexes, window[:cut], matched)
+                line = window[cut + 1:]
+            elif len(window) > _MAX_LINE:
+                cut = len(window) - _MAX_LINE // 2
+                regexes = _search(regexes, window[:cut], matched)
+                line = window[cut:]
+            else:
+                line = window
+
+        if not pending and not regexes:
+            break
+
+    if line and regexes:
+        _search(regexes, line, matched)
+    return found, matched
+
+
+def _find_literals(text, pending, found):
+    """一趟扫描 text，把其中出现的 pending 子串移入 found"""
+    if len(pending) == 1:
+        s = next(iter(pending))
+        if s in text:
+            found.add(s)
+            pending.clear()
+        return
+
+    pos = 0
+    while pending:
+        m = _alternation(tuple(sorted(pending, key=lambda p: (-len(p), p)))).search(text, pos)
+        if m is None:
+            return
+        # 同一位置只报告最长的子串，它的前缀（以及其他被它包含的子串）也一定出现了
+        hit = m.group()
+        hits = {p for p in pending if p in hit}
+        found |= hits
+        pending -= hits
+        pos = m.start() + 1
+
+
+@functools.lru_cache(maxsize=256)
+def _alternation(patterns):
+    return re.compile("|".join(map(re.escape, patterns)))
+
+
+def _search(regexes, text, matched):
+    remaining = []
+    for r in regexes:
+        if _search_lines(r, text):
+            matched.add((r.pattern, r.flags))
+        else:
+            remaining.append(r)
+    return remaining
+
+
+def _search_lines(regex, text):
+    """text 中是否有某一行（不含换行符）匹配 regex"""
+    pos = 0
+    while pos <= len(text):
+        m = regex.search(text, pos)
+        if m is None:
+            return False
+        if "\n" not in m.group():
+            return True
+        # 命中跨行：只用命中起点所在的行确认，不成立则从下一行继续
+        start = text.rfind("\n", 0, m.start()) + 1
+        end = text.find("\n", m.start())
+        end = len(text) if end < 0 else end
+        if regex.search(text[start:end]):
+            return True
+        pos = end + 1
+    return False
+
+
+def _automaton(patterns):
+    automaton = ahocorasick.Automaton()
+    for s in patterns:
+        automaton.add_word(s, s)
+    automaton.make_automaton()
+    return automaton
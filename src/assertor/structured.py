@@ -0,0 +1,189 @@
+"""
+结构化断言：退出码 / JSON 字段 / 按行的字段
+
+    expect:
+      rc: 0                                  # 或 [0, 1]
+      json:                                  # stdout 解析为 JSON
+        path: "members[0].state"             # 点号 / [下标]，缺省为根
+        equals: "streaming"
+      row:                                   # SQL 结果（str(tuple) 每行一条）或按 separator 切分的文本
+        index: 0                             # 第几行（可为负数），缺省 0
+        column: 1                            # 第几列，缺省为整行
+        ge: 3
+      row_count: {ge: 1}                     # 或直接写整数（等于）
+
+比较运算：equals / not_equals / contains / not_contains / regex / in / gt / ge / lt / le / length / exists，
+同一条中写多个运算时全部满足；json / row 也可写成列表（全部满足）
+期望值中的字符串支持 {{ }} 模板
+"""
+import re
+from assertor.base import Check
+from assertor.text import render_text
+
+_MISSING = object()
+
+
+def _number(value):
+    return value if isinstance(value, (int, float)) else float(value)
+
+
+def _equals(actual, expected):
+    # 文本输出切分得到的是字符串，模板渲染后的期望值也是字符串：类型不同时按文本比较
+    return actual == expected or (type(actual) is not type(expected) and str(actual) == str(expected))
+
+
+OPS = {
+    "equals": _equals,
+    "not_equals": lambda a, e: not _equals(a, e),
+    "contains": lambda a, e: e in a,
+    "not_contains": lambda a, e: e not in a,
+    "regex": lambda a, e: re.search(e, str(a)) is not None,
+    "in": lambda a, e: any(_equals(a, x) for x in e),
+    "gt": lambda a, e: _number(a) > _number(e),
+    "ge": lambda a, e: _number(a) >= _number(e),
+    "lt": lambda a, e: _number(a) < _number(e),
+    "le": lambda a, e: _number(a) <= _number(e),
+    "length": lambda a, e: len(a) == e,
+}
+
+
+def _parse_ops(conf: dict, fields=()):
+    ops = {k: v for k, v in conf.items() if k not in fields}
+    unknown = set(ops) - set(OPS) - {"exists"}
+    if unknown:
+        raise ValueError(f"unknown comparison {sorted(unknown)} (expected {sorted(OPS) + ['exists']})")
+    if not ops:
+        raise ValueError(f"no comparison in {conf}")
+    return ops
+
+
+def _compare(what, actual, ops):
+    """按 ops 逐项比较，不满足时抛 AssertionError"""
+    exists = ops.get("exists", True)
+    if actual is _MISSING:
+        if exists:
+            raise AssertionError(f"expect {what} to exist")
+        return
+    if not exists:
+        raise AssertionError(f"expect {what} not to exist, got {actual!r}")
+
+    for op, expected in ops.items():
+        if op == "exists":
+            continue
+        try:
+            ok = OPS[op](actual, expected)
+        except (TypeError, ValueError) as e:
+            raise AssertionError(f"expect {what} {op} {expected!r}, got {actual!r} ({e})") from None
+        if not ok:
+            raise AssertionError(f"expect {what} {op} {expected!r}, got {actual!r}")
+
+
+def _render_ops(ops, context):
+    return {k: render_text(v, context) for k, v in ops.items()}
+
+
+class RcAsserter(Check):
+    def __init__(self, expected):
+        self.expected = list(expected) if isinstance(expected, (list, tuple)) else [expected]
+
+    def render(self, context: dict):
+        return self
+
+    def describe(self):
+        return {"type": type(self).__name__, "rc": self.expected}
+
+    def evaluate(self, view):
+        rc = view.result.get("rc")
+        if rc not in self.expected:
+            shown = self.expected[0] if len(self.expected) == 1 else self.expected
+            raise AssertionError(f"expect rc {shown}, got {rc}, stderr:\n{view.summary('stderr')}")
+
+
+class JsonAsserter(Check):
+    def __init__(self, path="", ops=None, stream="stdout"):
+        self.path = path or ""
+        self.ops = ops or {}
+        self.stream = stream
+        self._keys = _parse_path(self.path)
+
+    @classmethod
+    def from_config(cls, conf: dict, stream="stdout"):
+        return cls(conf.get("path", ""), _parse_ops(conf, ("path",)), stream)
+
+    def render(self, context: dict):
+        return JsonAsserter(self.path, _render_ops(self.ops, context), self.stream)
+
+    def describe(self):
+        return dict(super().describe(), path=self.path, **self.ops)
+
+    def evaluate(self, view):
+        value = view.json(self.stream)
+        for key in self._keys:
+            try:
+                value = value[key]
+            except (KeyError, IndexError, TypeError):
+                value = _MISSING
+                break
+        _compare(f"{self.stream} json '{self.path or '$'}'", value, self.ops)
+
+
+def _parse_path(path):
+    """'a.b[0].c' / 'a.b.0.c' -> ['a', 'b', 0, 'c']"""
+    keys = []
+    for part in re.findall(r"[^.\[\]]+", path):
+        keys.append(int(part) if part.lstrip("-").isdigit() else part)
+    return keys
+
+
+class RowAsserter(Check):
+    def __init__(self, index=0, column=None, ops=None, separator="|", stream="stdout"):
+        self.index = index
+        self.column = column
+        self.ops = ops or {}
+        self.separator = separator
+        self.stream = stream
+
+    @classmethod
+    def from_config(cls, conf: dict, stream="stdout"):
+        fields = ("index", "column", "separator")
+        return cls(conf.get("index", 0), conf.get("column"), _parse_ops(conf, fields),
+                   conf.get("separator", "|"), stream)
+
+    def render(self, context: dict):
+        return RowAsserter(self.index, self.column, _render_ops(self.ops, context), self.separator, self.stream)
+
+    def describe(self):
+        return dict(super().describe(), index=self.index, column=self.column, **self.ops)
+
+    def evaluate(self, view):
+        rows = view.rows(self.stream, self.separator)
+        try:
+            value = rows[self.index]
+            if self.column is not None:
+                value = value[self.column]
+        except IndexError:
+            value = _MISSING
+        where = f"row {self.index}" + ("" if self.column is None else f" column {self.column}")
+        _compare(f"{self.stream} {where}", value, self.ops)
+
+
+class RowCountAsserter(Check):
+    def __init__(self, ops, separator="|", stream="stdout"):
+        self.ops = ops
+        self.separator = separator
+        self.stream = stream
+
+    @classmethod
+    def from_config(cls, conf, stream="stdout"):
+        if not isinstance(conf, dict):
+            return cls({"equals": conf}, stream=stream)
+        return cls(_parse_ops(conf, ("separator",)), conf.get("separator", "|"), stream)
+
+    def render(self, context: dict):
+        return RowCountAsserter(_render_ops(self.ops, context), self.separator, self.stream)
+
+    def describe(self):
+        return dict(super().describe(), **self.ops)
+
+    def evaluate(self, view):
+        _compare(f"{self.stream} row count", len(view.rows(self.stream, self.separator)), self.ops)
@@ -0,0 +1,83 @@
+"""
+文本断言：多子串 / 否定 / 正则
+
+    expect:
+      contains_all: ["ready", "primary"]     # 全部出现
+      contains_any: ["promoted", "leader"]   # 任一出现
+      not_contains: "ERROR"                  # 都不出现（字符串或列表）
+      regex: "replication lag: \\d+ms"       # 全部匹配（字符串或列表，MULTILINE）
+
+子串和正则都支持 {{ }} 模板；查找统一交给 assertor.scan，一次扫描判定全部
+"""
+import re
+from assertor.base import Check
+from core.template import compile_template
+
+
+def render_text(text, context):
+    return compile_template(text).render(**context) if isinstance(text, str) else text
+
+
+class _PatternCheck(Check):
+    def __init__(self, patterns, stream="stdout"):
+        self.patterns = [patterns] if isinstance(patterns, str) else list(patterns)
+        self.stream = stream
+
+    def render(self, context: dict):
+        rendered = [render_text(p, context) for p in self.patterns]
+        if rendered == self.patterns:
+            return self
+        return type(self)(rendered, stream=self.stream)
+
+    def describe(self):
+        return dict(super().describe(), patterns=self.patterns)
+
+    def _fail(self, expectation, view):
+        raise AssertionError(f"expect {self.stream} {expectation}, got:\n{view.summary(self.stream)}")
+
+
+class ContainsAllAsserter(_PatternCheck):
+    def substrings(self):
+        return self.patterns
+
+    def evaluate(self, view):
+        missing = [p for p in self.patterns if not view.found(self.stream, p)]
+        if missing:
+            self._fail(f"contains all of {self.patterns}, missing {missing}", view)
+
+
+class ContainsAnyAsserter(_PatternCheck):
+    def substrings(self):
+        return self.patterns
+
+    def evaluate(self, view):
+        if not any(view.found(self.stream, p) for p in self.patterns):
+            self._fail(f"contains any of {self.patterns}", view)
+
+
+class NotContainsAsserter(_PatternCheck):
+    def substrings(self):
+        return self.patterns
+
+    def evaluate(self, view):
+        present = [p for p in self.patterns if p and view.found(self.stream, p)]
+        if present:
+            self._fail(f"not contains {present}", view)
+
+
+class RegexAsserter(_PatternCheck):
+    def __init__(self, patterns, stream="stdout"):
+        super().__init__(patterns, stream)
+        # 预编译；渲染结果不变时 render 返回自身，不重复编译
+        try:
+            self._regexes = [re.compile(p, re.MULTILINE) for p in self.patterns]
+        except re.error as e:
+            raise ValueError(f"invalid regex in {self.patterns}: {e}") from None
+
+    def regexes(self):
+        return self._regexes
+
+    def evaluate(self, view):
+        missing = [r.pattern for r in self._regexes if not view.matched(self.stream, r)]
+        if missing:
+            self._fail(f"matches {missing}", view)
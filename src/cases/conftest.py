@@ -0,0 +1,72 @@
+# cases/conftest.py
+import functools
+import sys
+import pytest
+from command.registry import CommandRegistry
+from core.engine import ExecutionEngine
+from core.loader import load_testcases
+from core.scheduler import DurationHistory, expand_suite, schedule
+from core.shard import parse_shard, shard_items
+from core.template import templates
+from core.yaml_files import yaml_files
+from observer.registry import OBSERVERS
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("onetear")
+    group.addoption("--results-db", default=None,
+                    help="结果库路径：记录本次结果，并按历史耗时从长到短排列用例")
+    group.addoption("--shard", type=parse_shard, default=None, metavar="I/N",
+                    help="只收集展开后组合的第 I 片（共 N 片，1-based）")
+    group.addoption("--shard-mode", choices=["hash", "duration"], default="hash",
+                    help="hash：按组合 id 哈希切分；duration：按结果库历史耗时均衡切分")
+    group.addoption("--template-cache-dir", default=None,
+                    help="Jinja2 模板字节码缓存目录（xdist 各 worker 共享编译结果）")
+    group.addoption("--yaml-cache-dir", default=None,
+                    help="YAML 解析结果缓存目录（xdist 各 worker 收集时共享）")
+
+
+def pytest_configure(config):
+    # 收集前配置好缓存：每个 xdist worker 都会重新加载命令和 testcase
+    templates.configure(bytecode_dir=config.getoption("template_cache_dir"))
+    yaml_files.configure(cache_dir=config.getoption("yaml_cache_dir"))
+
+
+@functools.lru_cache(maxsize=None)
+def command_registry():
+    cmds = CommandRegistry()
+    cmds.load_dir("conf/command")
+    return cmds
+
+
+def pytest_generate_tests(metafunc):
+    # 每个 (testcase, matrix 组合) 一个 pytest 用例，按预估耗时降序收集
+    # （pytest-xdist 按收集顺序分发，长用例先开始）
+    if "work_item" not in metafunc.fixturenames:
+        return
+    config = metafunc.config
+    history = DurationHistory.from_db(config.getoption("results_db"))
+    items = expand_suite(load_testcases("conf/testcases", command_registry()))
+    if config.getoption("shard"):
+        items = shard_items(items, *config.getoption("shard"),
+                            mode=config.getoption("shard_mode"), history=history)
+    items = schedule(items, history)
+    metafunc.parametrize("work_item", items, ids=[i.key for i in items])
+
+
+@pytest.fixture(scope="session")
+def engine(request):
+    observers = [OBSERVERS.create("logger")]
+    # 只有 allure-pytest 插件生效时才加载 allure（未安装或 -p no:allure_pytest 时跳过）
+    if request.config.pluginmanager.hasplugin("allure_pytest"):
+        observers.append(OBSERVERS.create("allure"))
+    results_db = request.config.getoption("results_db")
+    if results_db:
+        observers.append(OBSERVERS.create("results", results_db, argv=sys.argv[1:]))
+
+    eng = ExecutionEngine(command_registry(), observers=observers)
+    yield eng
+    eng.close()
+    for obs in observers:
+        if hasattr(obs, "close"):
+            obs.close()
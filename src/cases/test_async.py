@@ -0,0 +1,111 @@
+# cases/test_async.py
+# asyncio 引擎：SQL 在与连接池同样大小的专用线程池中执行，观察者队列满时不阻塞事件循环
+import asyncio
+import threading
+import time
+import pytest
+from command.sql import postgres
+from command.sql.base import BaseSQLCommand
+from command.sql.pool import ConnectionPool
+from core.async_engine import AsyncExecutionEngine
+from core.context import ExecutionContext
+from domain import testcase
+from domain.hooks import Hooks
+from observer.base import BaseObserver
+from observer.bus import ObserverBus
+
+
+class SlowSQL(BaseSQLCommand):
+    def __init__(self, pool):
+        super().__init__("slow", "select 1")
+        self.pool = pool
+        self.running = 0
+        self.peak = 0
+        self.threads = set()
+        self._lock = threading.Lock()
+
+    def executor(self, context):
+        return self.pool.executor
+
+    def run(self, sql, context, timeout=None):
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            self.threads.add(threading.current_thread().name)
+        time.sleep(0.02)
+        with self._lock:
+            self.running -= 1
+        return {"stdout": sql, "stderr": "", "rc": 0}
+
+
+def test_sql_arun_uses_pool_sized_executor():
+    pool = ConnectionPool(connect=object, max_size=2)
+    cmd = SlowSQL(pool)
+
+    async def main():
+        return await asyncio.gather(*(cmd.arun(f"select {i}", {}) for i in range(8)))
+
+    try:
+        results = asyncio.run(main())
+    finally:
+        pool.close()
+    assert [r["stdout"] for r in results] == [f"select {i}" for i in range(8)]
+    assert cmd.peak == 2
+    assert all(name.startswith("sql-pool") for name in cmd.threads)
+
+
+def test_postgres_executor_follows_pg_pool_size():
+    pytest.importorskip("psycopg2")
+    ctx = {"pg_host": "executor-test", "pg_user": "u", "pg_password": "p", "pg_db": "d", "pg_pool_size": 3}
+    cmd = postgres.PostgresSQLCommand("q", "select 1")
+    try:
+        executor = cmd.executor(ctx)
+        assert executor is cmd.executor(ctx)
+        assert executor._max_workers == 3
+    finally:
+        postgres._pool_for(ctx).close()
+
+
+class GatedObserver(BaseObserver):
+    def __init__(self):
+        self.gate = threading.Event()
+        self.events = []
+
+    def step_start(self, step, ctx):
+        self.gate.wait(5)
+        self.events.append(ctx.step_id)
+
+
+def test_full_observer_queue_does_not_block_the_loop():
+    obs = GatedObserver()
+    engine = AsyncExecutionEngine(None, observers=[obs])
+    engine.bus.close()
+    engine.bus = ObserverBus([obs], max_queue=1)
+    ctx = ExecutionContext({}, testcase.TestCase("async", {}, {}, [], Hooks()))
+    ticks = []
+
+    async def ticker():
+        for _ in range(20):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.005)
+        obs.gate.set()
+
+    async def producer():
+        for i in range(3):
+            ctx.next_step(f"s{i}")
+            await engine.anotify("step_start", None, ctx)
+
+    async def main():
+        await asyncio.gather(producer(), ticker())
+
+    try:
+        asyncio.run(main())
+        engine.bus.flush(5)
+    finally:
+        obs.gate.set()
+        engine.close()
+
+    # 投递线程卡住、队列满时 producer 让出循环，ticker 照常推进
+    assert len(ticks) == 20
+    assert obs.events == [f"async::step-{i + 1}:s{i}" for i in range(3)]
+    assert [p[0] for p in ctx.phases] == ["observe"]
@@ -0,0 +1,94 @@
+# cases/test_bus.py
+# observer.bus 的 drop 策略：慢观察者被事件淹没时只丢 step_start，对应的后续事件随之丢弃，开闭始终成对
+import threading
+import time
+from core.context import ExecutionContext
+from domain import testcase
+from domain.hooks import Hooks
+from observer.base import BaseObserver
+from observer.bus import ObserverBus
+
+
+class SlowObserver(BaseObserver):
+    def __init__(self):
+        self.events = []
+        self.gate = threading.Event()
+
+    def _record(self, event, ctx):
+        # 第一个事件卡住投递线程，让队列迅速填满
+        self.gate.wait(5)
+        time.sleep(0.001)
+        self.events.append((event, ctx.step_id))
+
+    def testcase_start(self, testcase, ctx):
+        self._record("testcase_start", ctx)
+
+    def testcase_end(self, testcase, ctx):
+        self._record("testcase_end", ctx)
+
+    def step_start(self, step, ctx):
+        self._record("step_start", ctx)
+
+    def step_retry(self, step, ctx):
+        self._record("step_retry", ctx)
+
+    def step_end(self, step, ctx):
+        self._record("step_end", ctx)
+
+    def step_fail(self, step, ctx):
+        self._record("step_fail", ctx)
+
+
+def test_drop_keeps_start_and_end_paired():
+    obs = SlowObserver()
+    bus = ObserverBus([obs], max_queue=4, overflow="drop")
+    tc = testcase.TestCase("flood", {}, {}, [], Hooks())
+    ctx = ExecutionContext({}, tc)
+    steps = 200
+    try:
+        bus.notify("testcase_start", tc, ctx)
+        for i in range(steps):
+            ctx.next_step(f"s{i}")
+            bus.notify("step_start", None, ctx)
+            if i % 3 == 0:
+                bus.notify("step_retry", None, ctx)
+            if i == 10:
+                obs.gate.set()
+            bus.notify("step_fail" if i % 5 == 0 else "step_end", None, ctx)
+        bus.notify("testcase_end", tc, ctx)
+        assert bus.flush(10)
+    finally:
+        obs.gate.set()
+        bus.close()
+
+    assert bus.dropped > 0
+    assert not bus._dropped_steps
+    assert obs.events[0][0] == "testcase_start" and obs.events[-1][0] == "testcase_end"
+
+    open_steps = set()
+    delivered = 0
+    for event, step_id in obs.events[1:-1]:
+        if event == "step_start":
+            assert step_id not in open_steps
+            open_steps.add(step_id)
+            delivered += 1
+        elif event == "step_retry":
+            assert step_id in open_steps
+        else:
+            open_steps.remove(step_id)
+    assert not open_steps
+    assert 0 < delivered < steps
+
+
+def test_block_policy_delivers_everything():
+    obs = SlowObserver()
+    obs.gate.set()
+    bus = ObserverBus([obs], max_queue=2, overflow="block")
+    tc = testcase.TestCase("block", {}, {}, [], Hooks())
+    ctx = ExecutionContext({}, tc)
+    for i in range(20):
+        ctx.next_step(f"s{i}")
+        bus.notify("step_start", None, ctx)
+        bus.notify("step_end", None, ctx)
+    bus.close()
+    assert bus.dropped == 0 and len(obs.events) == 40
@@ -0,0 +1,121 @@
+# cases/test_cache.py
+# command.cache 的结果缓存：effect 缺省不影响缓存、write 只换代自身作用域、hook 声明 effect、--cache 开关
+import types
+import pytest
+import main
+from command.cache import CachePolicy, ResultCache
+from command.shell import ShellCommand
+from core.context import ExecutionContext
+from core.engine import ExecutionEngine
+from domain import testcase
+from domain.hooks import Hook, Hooks
+
+TC = testcase.TestCase("t", {"n": [1, 2]}, {}, [], Hooks())
+
+
+def _ctx(n):
+    return ExecutionContext({"n": n}, TC)
+
+
+def _command(name, **policy):
+    cmd = ShellCommand(name, "true")
+    cmd.cache_policy = CachePolicy(**policy)
+    return cmd
+
+
+def _run(cache, command, text, ctx):
+    """模拟 engine._run_rendered：命中返回缓存结果，否则记一次执行"""
+    cached = cache.lookup(command, "do", text, ctx)
+    if cached is not None:
+        return cached
+    result = {"stdout": text, "stderr": "", "rc": 0}
+    cache.after_execute(command, "do", text, ctx, result)
+    return result
+
+
+def test_policy_defaults():
+    assert CachePolicy().effect == "none" and CachePolicy().invalidates == ()
+    assert CachePolicy(cacheable=True).effect == "read"
+    assert CachePolicy(effect="write").invalidates == ("testcase",)
+    assert CachePolicy(effect="write", effect_scope="run").invalidates == ("testcase", "run")
+    assert CachePolicy(effect="chaos").invalidates == ("testcase", "run", "persistent")
+    with pytest.raises(ValueError):
+        CachePolicy(effect="write", effect_scope="global")
+    with pytest.raises(ValueError):
+        CachePolicy(cacheable=True, effect="write")
+
+
+def test_undeclared_commands_keep_cache():
+    cache = ResultCache()
+    probe = _command("probe", cacheable=True)
+    ctx = _ctx(1)
+    _run(cache, probe, "select 1", ctx)
+    _run(cache, _command("echo"), "echo hi", ctx)
+    assert _run(cache, probe, "select 1", ctx).get("cached")
+
+
+def test_write_only_invalidates_its_own_scope():
+    cache = ResultCache()
+    local = _command("local", cacheable=True)
+    shared = _command("shared", cacheable=True, scope="run")
+    a, b = _ctx(1), _ctx(2)
+    for ctx in (a, b):
+        _run(cache, local, "local", ctx)
+    _run(cache, shared, "shared", a)
+
+    _run(cache, _command("write", effect="write"), "insert", a)
+    assert not _run(cache, local, "local", a).get("cached")
+    assert _run(cache, local, "local", b).get("cached")
+    assert _run(cache, shared, "shared", b).get("cached")
+
+    _run(cache, _command("wide", effect="write", effect_scope="run"), "create table", b)
+    assert not _run(cache, shared, "shared", a).get("cached")
+    assert _run(cache, local, "local", a).get("cached")
+
+    _run(cache, _command("kill", effect="chaos"), "pkill", a)
+    assert not _run(cache, local, "local", b).get("cached")
+
+
+def test_persistent_generation_bumped_only_by_wide_effects(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    probe = _command("probe", cacheable=True, scope="persistent")
+    ctx = _ctx(1)
+    _run(cache, probe, "version", ctx)
+
+    _run(cache, _command("write", effect="write"), "insert", ctx)
+    assert not (tmp_path / "GENERATION").exists()
+    assert _run(cache, probe, "version", ctx).get("cached")
+
+    _run(cache, _command("kill", effect="chaos"), "pkill", ctx)
+    assert (tmp_path / "GENERATION").read_text() == "1"
+    assert not _run(cache, probe, "version", ctx).get("cached")
+
+
+def test_hooks_declare_effect():
+    assert Hook.parse("echo prepare").cache_policy.invalidates == ()
+    hook = Hook.parse({"cmd": "pg_ctl restart", "effect": "chaos"})
+    assert hook.cache_policy.effect == "chaos"
+    with pytest.raises(ValueError):
+        Hook.parse({"cmd": "x", "effect": "delete"})
+
+    engine = ExecutionEngine(None)
+    try:
+        assert engine._hook_command(hook).cache_policy is hook.cache_policy
+        assert engine._hook_command(Hook.parse("pg_ctl restart")).cache_policy.effect == "none"
+    finally:
+        engine.close()
+
+
+@pytest.mark.parametrize("argv, enabled, persistent", [
+    ([], False, False),
+    (["--cache"], True, False),
+    (["--cache-dir", "DIR"], True, True),
+    (["--cache", "--no-cache"], False, False),
+    (["--cache-dir", "DIR", "--no-cache"], False, False),
+])
+def test_cache_switch(argv, enabled, persistent, tmp_path, monkeypatch):
+    monkeypatch.setattr("sys.argv", ["main.py"] + [str(tmp_path) if a == "DIR" else a for a in argv])
+    cmds = types.SimpleNamespace(cache_scopes=lambda: {"testcase", "persistent"})
+    cache = main.build_cache(main.parse_args(), cmds)
+    assert (cache is not None) == enabled
+    assert enabled is False or cache._persistent == persistent
@@ -0,0 +1,67 @@
+# cases/test_checkpoint.py
+# core.checkpoint：引擎每个组合结束时写日志，--resume 只重跑失败 / 未完成的组合；残行容错与分片路径
+import json
+from assertor.registry import build_asserter
+from command.shell import ShellCommand
+from core.checkpoint import CheckpointJournal, load_journal, shard_path
+from core.engine import ExecutionEngine
+from core.scheduler import expand_suite
+from domain import testcase
+from domain.hooks import Hooks
+from domain.step import Step
+
+
+def _run(journal, log, marker, done=()):
+    # n=2 在 marker 不存在时失败
+    steps = [Step("run", ShellCommand("run", f"echo {{{{ n }}}} >> {log}; test {{{{ n }}}} != 2 || test -e {marker}"),
+                  build_asserter({"rc": 0}))]
+    items = expand_suite([testcase.TestCase("ckpt", {"n": [1, 2, 3]}, {}, steps, Hooks())])
+    engine = ExecutionEngine(None, max_workers=3, checkpoint=journal)
+    try:
+        engine.run_items([i for i in items if i.key not in done])
+    except AssertionError:
+        pass
+    finally:
+        engine.close()
+        journal.close()
+
+
+def test_resume_skips_passed_combos(tmp_path):
+    path, log, marker = tmp_path / "ckpt.jsonl", tmp_path / "ran", tmp_path / "marker"
+    _run(CheckpointJournal(path), log, marker)
+    entries = load_journal(str(path))
+    assert {k: e["status"] for k, e in entries.items()} == \
+        {"ckpt[n=1]": "passed", "ckpt[n=2]": "failed", "ckpt[n=3]": "passed"}
+    assert entries["ckpt[n=2]"]["error"] and entries["ckpt[n=1]"]["duration"] >= 0
+
+    marker.touch()
+    log.unlink()
+    journal = CheckpointJournal(path, resume=True)
+    assert journal.completed() == {"ckpt[n=1]", "ckpt[n=3]"}
+    _run(journal, log, marker, done=journal.completed())
+    assert log.read_text().split() == ["2"]
+    # 追加写：旧记录保留，同一组合以最后一行为准
+    assert len(path.read_text().splitlines()) == 4
+    assert CheckpointJournal(path, resume=True).completed() == {"ckpt[n=1]", "ckpt[n=2]", "ckpt[n=3]"}
+
+    # 不带 resume 时清空旧日志
+    CheckpointJournal(path).close()
+    assert path.read_text() == "" and load_journal(str(path)) == {}
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    path = tmp_path / "ckpt.jsonl"
+    path.write_text(json.dumps({"key": "a", "status": "passed"}) + "\n" + '{"key": "b", "sta')
+    journal = CheckpointJournal(path, resume=True)
+    assert journal.completed() == {"a"}
+    journal.record("b", "passed", 1.0)
+    journal.close()
+    lines = path.read_text().splitlines()
+    assert lines[1] == '{"key": "b", "sta' and json.loads(lines[2])["key"] == "b"
+    assert set(load_journal(str(path))) == {"a", "b"}
+
+
+def test_shard_path():
+    assert shard_path("logs/checkpoint.jsonl") == "logs/checkpoint.jsonl"
+    assert shard_path("logs/checkpoint.jsonl", (1, 4)) == "logs/checkpoint.shard-1-of-4.jsonl"
+    assert shard_path("ckpt", (2, 2)) == "ckpt.shard-2-of-2"
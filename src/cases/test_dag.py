@@ -0,0 +1,69 @@
+# cases/test_dag.py
+# domain.dag 的校验与拓扑序；engine 按依赖并发调度 step，失败后不再派发新 step
+import time
+import pytest
+from assertor.registry import build_asserter
+from command.shell import ShellCommand
+from core.engine import ExecutionEngine
+from domain import testcase
+from domain.dag import StepDAG
+from domain.hooks import Hooks
+from domain.step import Step
+
+
+def _step(name, cmd="true", depends_on=None):
+    return Step(name, ShellCommand(name, cmd), build_asserter({"rc": 0}), depends_on=depends_on)
+
+
+def _run(steps, step_workers=4, parallelism=None):
+    tc = testcase.TestCase("dag", {}, {}, steps, Hooks(), parallelism=parallelism)
+    engine = ExecutionEngine(None, step_workers=step_workers)
+    started = time.monotonic()
+    try:
+        engine.run(tc)
+    finally:
+        engine.close()
+    return time.monotonic() - started
+
+
+def test_validation():
+    with pytest.raises(ValueError, match="duplicate"):
+        StepDAG([_step("a"), _step("a", depends_on="a")])
+    with pytest.raises(ValueError, match="unknown step 'x'"):
+        StepDAG([_step("a", depends_on=["x"])])
+    with pytest.raises(ValueError, match="cycle"):
+        StepDAG([_step("a", depends_on="c"), _step("b", depends_on="a"), _step("c", depends_on="b")])
+
+
+def test_topological_order():
+    implicit = StepDAG([_step("a"), _step("b"), _step("a")])
+    assert not implicit.concurrent and implicit.order == [0, 1, 2]
+
+    dag = StepDAG([_step("report", depends_on=["load", "check"]), _step("check", depends_on="init"),
+                   _step("init"), _step("load", depends_on="init")])
+    assert dag.concurrent
+    assert [dag.steps[i].name for i in dag.order] == ["init", "check", "load", "report"]
+
+
+def test_independent_steps_run_concurrently(tmp_path):
+    steps = [
+        _step("a", f"sleep 0.3; touch {tmp_path}/a"),
+        _step("b", f"sleep 0.3; touch {tmp_path}/b"),
+        _step("c", f"test -e {tmp_path}/a && test -e {tmp_path}/b", depends_on=["a", "b"]),
+    ]
+    assert _run(steps) < 0.55
+    # testcase.parallelism 优先于 engine 的 step_workers
+    assert _run(steps, parallelism=1) >= 0.6
+
+
+def test_failure_stops_dispatch(tmp_path):
+    steps = [
+        _step("fail", "exit 1"),
+        _step("slow", f"sleep 0.2; touch {tmp_path}/slow"),
+        _step("after", f"touch {tmp_path}/after", depends_on=["fail", "slow"]),
+        _step("late", f"touch {tmp_path}/late", depends_on="slow"),
+    ]
+    with pytest.raises(AssertionError, match="expect rc 0"):
+        _run(steps)
+    # 在途的 step 跑完，依赖它的 step 因为已有失败不再派发
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["slow"]
@@ -0,0 +1,108 @@
+# cases/test_distributed.py
+# core.distributed 协调者：attempt 编号丢弃过期事件 / 结果，丢失补发与事件转发串行
+import threading
+from command.shell import ShellCommand
+from core.context import ExecutionContext
+from core.distributed import Coordinator, _Worker, _ctx_state
+from core.scheduler import expand_suite
+from domain import testcase
+from domain.hooks import Hooks
+from domain.step import Step
+from observer.base import BaseObserver
+
+
+class Recorder(BaseObserver):
+    # 在转发线程内同步调用，便于观察 notify 与 _lost 的先后
+    synchronous = True
+
+    def __init__(self, block_on=None):
+        self.events = []
+        self.block_on = block_on
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def _record(self, event, ctx):
+        self.events.append((event, ctx.error))
+        if event == self.block_on:
+            self.entered.set()
+            self.release.wait(5)
+
+    def testcase_start(self, testcase, ctx):
+        self._record("testcase_start", ctx)
+
+    def testcase_fail(self, testcase, ctx):
+        self._record("testcase_fail", ctx)
+
+    def step_start(self, step, ctx):
+        self._record("step_start", ctx)
+
+    def step_end(self, step, ctx):
+        self._record("step_end", ctx)
+
+    def step_fail(self, step, ctx):
+        self._record("step_fail", ctx)
+
+
+def _coordinator(observer, max_attempts=2):
+    tc = testcase.TestCase("dist", {}, {}, [Step("s1", ShellCommand("s1", "true"))], Hooks())
+    coordinator = Coordinator(expand_suite([tc]), [observer], max_attempts=max_attempts)
+    coordinator.listener.close()
+    item = coordinator.items[0]
+    return coordinator, item, _ctx_state(ExecutionContext(item.vars, tc))
+
+
+def test_stale_attempt_is_ignored():
+    rec = Recorder()
+    coordinator, item, state = _coordinator(rec)
+    first, second = _Worker(None), _Worker(None)
+    try:
+        assert coordinator._next_item(first) is item and first.attempt == 1
+        coordinator._on_event(first, "testcase_start", item.key, 1, None, state)
+        coordinator._on_event(first, "step_start", item.key, 1, "s1", state)
+        coordinator._lost(first, "WorkerLost: heartbeat")
+
+        assert coordinator._next_item(second) is item and second.attempt == 2
+        # 被判丢失的慢工作者仍在发送旧 attempt 的事件 / 结果
+        coordinator._on_event(first, "step_end", item.key, 1, "s1", state)
+        coordinator._on_done(first, item.key, 1, "stale failure")
+        assert item.key not in coordinator.results
+
+        coordinator._on_event(second, "testcase_start", item.key, 2, None, state)
+        coordinator._on_done(second, item.key, 2, None)
+    finally:
+        coordinator.bus.close()
+
+    assert coordinator.results == {item.key: None}
+    assert rec.events == [
+        ("testcase_start", None), ("step_start", None),
+        ("step_fail", "WorkerLost: heartbeat"), ("testcase_fail", "WorkerLost: heartbeat"),
+        ("testcase_start", None),
+    ]
+
+
+def test_lost_waits_for_inflight_event():
+    rec = Recorder(block_on="step_end")
+    coordinator, item, state = _coordinator(rec, max_attempts=1)
+    w = _Worker(None)
+    try:
+        coordinator._next_item(w)
+        coordinator._on_event(w, "testcase_start", item.key, 1, None, state)
+        coordinator._on_event(w, "step_start", item.key, 1, "s1", state)
+
+        forward = threading.Thread(target=coordinator._on_event, args=(w, "step_end", item.key, 1, "s1", state))
+        forward.start()
+        assert rec.entered.wait(5)
+        lost = threading.Thread(target=coordinator._lost, args=(w, "WorkerLost: disconnected"))
+        lost.start()
+        lost.join(0.2)
+        # step_end 还在投递中：丢失处理必须等它结束，不能抢先补发
+        assert lost.is_alive()
+        rec.release.set()
+        forward.join(5)
+        lost.join(5)
+    finally:
+        rec.release.set()
+        coordinator.bus.close()
+
+    assert coordinator.results == {item.key: "WorkerLost: disconnected"}
+    assert [e for e, _ in rec.events] == ["testcase_start", "step_start", "step_end", "testcase_fail"]
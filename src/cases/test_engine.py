@@ -0,0 +1,50 @@
+# cases/test_engine.py
+# ExecutionEngine.run 的组合并发：有界线程池、结果按展开顺序、全部结束后按展开顺序抛出首个失败
+import time
+import pytest
+from assertor.registry import build_asserter
+from command.shell import ShellCommand
+from core.engine import ExecutionEngine
+from domain import testcase
+from domain.hooks import Hooks
+from domain.step import Step
+
+
+def _testcase(cmd, values):
+    step = Step("s", ShellCommand("s", cmd), build_asserter({"rc": 0}))
+    return testcase.TestCase("combo", {"n": values}, {}, [step], Hooks())
+
+
+def _run(tc, max_workers):
+    engine = ExecutionEngine(None, max_workers=max_workers)
+    started = time.monotonic()
+    try:
+        return engine.run(tc), time.monotonic() - started
+    finally:
+        engine.close()
+
+
+def test_combos_run_concurrently_in_expand_order():
+    tc = _testcase("sleep 0.{{ 4 - n }}; echo {{ n }}", [1, 2, 3, 4])
+    ctxs, elapsed = _run(tc, max_workers=4)
+
+    assert [c.vars["n"] for c in ctxs] == [1, 2, 3, 4]
+    assert [c.vars["last_stdout"].strip() for c in ctxs] == ["1", "2", "3", "4"]
+    assert len({c.testcase_id for c in ctxs}) == 4
+    # 串行需要 0.3 + 0.2 + 0.1 + 0.0 秒
+    assert elapsed < 0.5
+
+
+def test_pool_is_bounded_by_max_workers():
+    tc = _testcase("sleep 0.2", [1, 2, 3, 4])
+    _, elapsed = _run(tc, max_workers=2)
+    assert elapsed >= 0.4
+
+
+def test_failure_raised_after_all_combos_finish(tmp_path):
+    # n=3 最先失败，但抛出的是展开顺序上第一个失败的 n=2
+    cmd = (f"touch {tmp_path}/{{{{ n }}}}; sleep 0.{{{{ 4 - n }}}}; "
+           "test {{ n }} -lt 2 || { echo fail-{{ n }} >&2; exit 1; }")
+    with pytest.raises(AssertionError, match="fail-2"):
+        _run(_testcase(cmd, [1, 2, 3]), max_workers=3)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["1", "2", "3"]
@@ -0,0 +1,81 @@
+# cases/test_eventually.py
+# assertor.eventually：退避间隔、失败时重新执行命令直到通过 / 超时，以及引擎中的 redo 重跑
+import asyncio
+import random
+import time
+import pytest
+from assertor.eventually import Backoff, apoll_until, poll_until
+from assertor.registry import build_asserter
+from command.shell import ShellCommand
+from core.engine import ExecutionEngine
+from domain import testcase
+from domain.hooks import Hooks
+from domain.step import Step
+
+
+def _result(stdout, rc=0):
+    return {"stdout": stdout, "stderr": "", "rc": rc}
+
+
+def test_backoff_grows_within_bounds():
+    delays = iter(Backoff(min_interval=0.1, max_interval=1.0, factor=2, jitter=0.2, rng=random.Random(1)))
+    values = [next(delays) for _ in range(8)]
+    assert all(0.1 <= d <= 1.0 for d in values)
+    assert values[0] < 0.13 and values[-1] >= 0.8
+
+    assert list(zip(range(4), Backoff(min_interval=0.1, max_interval=0.4, jitter=0))) == \
+        [(0, 0.1), (1, 0.2), (2, 0.4), (3, 0.4)]
+    with pytest.raises(ValueError):
+        Backoff(min_interval=0)
+
+
+def test_poll_reruns_until_pass():
+    outputs = iter(["starting", "starting", "ready"])
+    calls = []
+
+    def rerun():
+        calls.append(1)
+        return _result(next(outputs))
+
+    asserter = build_asserter({"eventually": {"contains_all": ["ready"], "timeout": 2, "min_interval": 0.01}})
+    assert asserter.assert_result(_result("booting"), rerun=rerun)["stdout"] == "ready"
+    assert len(calls) == 3
+
+
+def test_poll_times_out():
+    backoff = Backoff(min_interval=0.01, max_interval=0.05)
+    started = time.monotonic()
+    with pytest.raises(AssertionError):
+        poll_until(build_asserter({"contains": "ready"}).check, _result("booting"),
+                   lambda: _result("booting"), 0.2, backoff)
+    assert 0.2 <= time.monotonic() - started < 0.5
+
+    # 没有 rerun 时无法刷新结果，立即失败
+    with pytest.raises(AssertionError):
+        poll_until(build_asserter({"contains": "ready"}).check, _result("booting"), None, 5)
+
+
+def test_async_poll():
+    outputs = iter(["no", "ready"])
+
+    async def rerun():
+        return _result(next(outputs))
+
+    check = build_asserter({"contains": "ready"}).check
+    result = asyncio.run(apoll_until(check, _result("no"), rerun, 2, Backoff(min_interval=0.01)))
+    assert result["stdout"] == "ready"
+
+
+def test_engine_reruns_redo_command(tmp_path):
+    counter = tmp_path / "n"
+    counter.write_text("0")
+    bump = f"n=$(( $(cat {counter}) + 1 )); echo $n > {counter}; echo attempt-$n"
+    cmd = ShellCommand("probe", "echo attempt-0", redo_cmd=bump)
+    expect = build_asserter({"eventually": {"contains": "attempt-3", "timeout": 5, "min_interval": 0.01}})
+    tc = testcase.TestCase("eventually", {}, {}, [Step("probe", cmd, expect)], Hooks())
+    engine = ExecutionEngine(None)
+    try:
+        ctx = engine.run(tc)[0]
+    finally:
+        engine.close()
+    assert ctx.vars["last_stdout"].strip() == "attempt-3"
@@ -0,0 +1,92 @@
+# cases/test_logger.py
+# observer.logger.LoggerObserver：每组合一个文件、输出截断、结束后 gzip 压缩、轮转与有界打开文件池
+import gzip
+import logging
+from assertor.registry import build_asserter
+from command.shell import ShellCommand
+from core.engine import ExecutionEngine
+from domain import testcase
+from domain.hooks import Hooks
+from domain.step import Step
+from observer.logger import LoggerObserver, _TestcaseFileRouter, _formatter
+
+
+def _run(observer, steps, matrix):
+    tc = testcase.TestCase("logged", matrix, {}, steps, Hooks())
+    engine = ExecutionEngine(None, observers=[observer], max_workers=2)
+    try:
+        return engine.run(tc)
+    finally:
+        engine.close()
+        observer.close()
+
+
+def test_one_file_per_combo_with_clipped_output(tmp_path):
+    obs = LoggerObserver(base_dir=tmp_path, max_output=40)
+    steps = [Step("big", ShellCommand("big", "seq 1 {{ n }}"), build_asserter({"rc": 0}))]
+    _run(obs, steps, {"n": [3, 500]})
+
+    small = (tmp_path / "logged" / "logged[n=3].log").read_text()
+    large = (tmp_path / "logged" / "logged[n=500].log").read_text()
+    assert "[TESTCASE START] logged[n=3]" in small and "[TESTCASE END] logged[n=3]" in small
+    assert "STDOUT:\n1\n2\n3" in small and "truncated" not in small
+    assert "logged[n=3]" not in large
+    assert "chars truncated, full output not kept" in large
+    assert "STDOUT:\n1\n2\n3\n" in large and "499\n500" in large and "\n250\n" not in large
+
+
+def test_finished_combo_is_gzipped(tmp_path):
+    obs = LoggerObserver(base_dir=tmp_path, compress="gzip")
+    steps = [Step("fail", ShellCommand("fail", "echo {{ n }}; exit {{ n }}"), build_asserter({"rc": 0}))]
+    try:
+        _run(obs, steps, {"n": [1]})
+    except AssertionError:
+        pass
+
+    tc_dir = tmp_path / "logged"
+    assert sorted(p.name for p in tc_dir.iterdir()) == ["logged[n=1].log.gz"]
+    text = gzip.decompress((tc_dir / "logged[n=1].log.gz").read_bytes()).decode()
+    assert "[STEP FAIL]" in text and "[TESTCASE FAIL] logged[n=1]" in text and "RC: 1" in text
+
+
+def _router(tmp_path, **kwargs):
+    router = _TestcaseFileRouter(tmp_path, kwargs.pop("max_bytes", 0), kwargs.pop("backup_count", 5),
+                                 kwargs.pop("max_open", 64), kwargs.pop("compress", None))
+    router.setFormatter(_formatter())
+    return router
+
+
+def _record(tid, msg, **extra):
+    record = logging.LogRecord("onetear", logging.INFO, "", 0, msg, None, None)
+    record.testcase = "tc"
+    record.testcase_id = tid
+    record.__dict__.update(extra)
+    return record
+
+
+def test_rotation_compresses_backups(tmp_path):
+    router = _router(tmp_path, max_bytes=200, backup_count=2, compress="gzip")
+    for i in range(20):
+        router.handle(_record("tc[a]", f"line {i:02d} " + "x" * 40))
+    router.handle(_record("tc[a]", "", finish=True))
+    router.close()
+
+    names = sorted(p.name for p in (tmp_path / "tc").iterdir())
+    assert names == ["tc[a].log.1.gz", "tc[a].log.2.gz", "tc[a].log.gz"]
+    latest = gzip.decompress((tmp_path / "tc" / "tc[a].log.gz").read_bytes()).decode()
+    backup = gzip.decompress((tmp_path / "tc" / "tc[a].log.1.gz").read_bytes()).decode()
+    assert "line 19" in latest and "line 00" not in latest + backup
+
+
+def test_open_files_bounded_and_reopened_in_append(tmp_path):
+    router = _router(tmp_path, max_open=2)
+    for tid in ("tc[a]", "tc[b]", "tc[c]"):
+        router.handle(_record(tid, f"first {tid}"))
+    assert list(router._files) == ["tc[b]", "tc[c]"]
+
+    router.handle(_record("tc[a]", "second tc[a]"))
+    assert list(router._files) == ["tc[c]", "tc[a]"]
+    router.close()
+
+    text = (tmp_path / "tc" / "tc[a].log").read_text()
+    assert "first tc[a]" in text and "second tc[a]" in text
@@ -0,0 +1,100 @@
+# cases/test_matrix.py
+# domain.matrix 的覆盖数组：t-wise 覆盖、exclude / include、确定性与规模；TestCase.expand 的组合缓存
+import itertools
+import time
+import pytest
+from domain import matrix as matrix_mod
+from domain.matrix import expand_matrix
+from domain import testcase
+from domain.hooks import Hooks
+
+
+def _uncovered(matrix, rows, strength, exclude=()):
+    """返回没有被 rows 覆盖、且不违反 exclude 的 strength 元组"""
+    keys = list(matrix)
+    missing = []
+    for params in itertools.combinations(keys, strength):
+        seen = {tuple(r[k] for k in params) for r in rows}
+        for values in itertools.product(*(matrix[k] for k in params)):
+            combo = dict(zip(params, values))
+            banned = any(all(k in combo and combo[k] in (v if isinstance(v, list) else [v])
+                             for k, v in ex.items()) for ex in exclude)
+            if values not in seen and not banned:
+                missing.append(combo)
+    return missing
+
+
+@pytest.mark.parametrize("strength", [2, 3])
+def test_n_wise_covers_every_tuple(strength):
+    matrix = {f"p{i}": list(range(3)) for i in range(7)}
+    rows = expand_matrix(matrix, "n-wise", strength=strength)
+    assert _uncovered(matrix, rows, strength) == []
+    assert len(rows) < 3 ** 7
+
+
+def test_pairwise_is_strength_two():
+    matrix = {"os": ["el8", "el9", "ubuntu"], "pg": [14, 15, 16], "arch": ["x86", "arm"], "fs": ["xfs", "ext4"]}
+    rows = expand_matrix(matrix, "pairwise", strength=3)
+    assert _uncovered(matrix, rows, 2) == []
+    assert len(rows) < 3 * 3 * 2 * 2
+
+
+def test_exclude_and_include():
+    matrix = {"os": ["el8", "el9"], "pg": [14, 15, 16], "arch": ["x86", "arm"]}
+    exclude = [{"os": "el8", "pg": [16]}]
+    include = [{"os": "el9", "pg": 17, "arch": "arm"}]
+    rows = expand_matrix(matrix, "pairwise", exclude=exclude, include=include)
+
+    assert rows[0] == include[0]
+    assert not any(r["os"] == "el8" and r["pg"] == 16 for r in rows)
+    assert _uncovered(matrix, rows, 2, exclude) == []
+
+    full = expand_matrix(matrix, "full", exclude=exclude)
+    assert len(full) == 2 * 3 * 2 - 2
+
+    with pytest.raises(ValueError):
+        expand_matrix(matrix, "pairwise", exclude=[{"nope": 1}])
+    with pytest.raises(ValueError):
+        expand_matrix(matrix, "pairwise", include=[{"os": "el8"}])
+
+
+def test_expansion_is_deterministic():
+    matrix = {f"p{i}": list(range(4)) for i in range(8)}
+    first = expand_matrix(matrix, "n-wise", strength=3, seed=7)
+    assert expand_matrix(matrix, "n-wise", strength=3, seed=7) == first
+    assert _uncovered(matrix, expand_matrix(matrix, "n-wise", strength=3, seed=8), 3) == []
+
+
+def test_covering_array_scales():
+    # 30 个参数 × 5 个取值的 pairwise：逐轮重新排序 / 逐个取值重算组合时需要数秒
+    matrix = {f"p{i}": list(range(5)) for i in range(30)}
+    started = time.perf_counter()
+    rows = expand_matrix(matrix, "pairwise")
+    elapsed = time.perf_counter() - started
+
+    assert _uncovered(matrix, rows, 2) == []
+    assert len(rows) <= 2 * 5 * 5 * 2
+    assert elapsed < 3.0, f"pairwise 30x5 took {elapsed:.2f}s"
+
+
+def test_testcase_expand_is_computed_once(monkeypatch):
+    calls = []
+
+    def counting(*args, **kwargs):
+        calls.append(1)
+        return expand_matrix(*args, **kwargs)
+
+    monkeypatch.setattr("domain.testcase.expand_matrix", counting)
+    tc = testcase.TestCase("t", {"a": [1, 2, 3], "b": [1, 2]}, {"base": 1}, [], Hooks(), matrix_strategy="pairwise")
+    first = list(tc.expand())
+    first[0]["base"] = "mutated"
+    second = list(tc.expand())
+
+    assert len(calls) == 1
+    assert second[0]["base"] == 1
+    assert [dict(c, base=1) for c in first] == second
+
+
+def test_prime_keys_are_unique():
+    primes = matrix_mod._primes(50)
+    assert len(set(primes)) == 50 and primes[:5] == [2, 3, 5, 7, 11]
@@ -0,0 +1,53 @@
+# cases/test_metrics.py
+# observer.metrics.MetricsObserver：跑一遍引擎后检查直方图 / 计数 / in-flight 归零、textfile 与 /metrics 端点
+import urllib.request
+import pytest
+from assertor.registry import build_asserter
+from command.shell import ShellCommand
+from core.engine import ExecutionEngine
+from domain import testcase
+from domain.hooks import Hooks
+from domain.step import Step
+
+prometheus_client = pytest.importorskip("prometheus_client")
+from observer.metrics import MetricsObserver  # noqa: E402
+
+
+def _run(observer):
+    steps = [
+        Step("ok", ShellCommand("probe", "echo {{ n }}")),
+        Step("flaky", ShellCommand("flaky", "exit {{ n }}"), build_asserter({"rc": 0}), retries=1),
+    ]
+    tc = testcase.TestCase("metrics", {"n": [0, 1]}, {}, steps, Hooks())
+    engine = ExecutionEngine(None, observers=[observer], max_workers=2)
+    try:
+        with pytest.raises(AssertionError):
+            engine.run(tc)
+    finally:
+        engine.close()
+
+
+def test_step_and_testcase_metrics(tmp_path):
+    textfile = tmp_path / "onetear.prom"
+    obs = MetricsObserver(registry=prometheus_client.CollectorRegistry(), textfile=textfile, port=0)
+    try:
+        _run(obs)
+        sample = obs.registry.get_sample_value
+        assert sample("onetear_step_duration_seconds_count", {"testcase": "metrics", "command": "probe"}) == 2
+        assert sample("onetear_step_duration_seconds_count", {"testcase": "metrics", "command": "flaky"}) == 2
+        assert sample("onetear_testcase_duration_seconds_count", {"testcase": "metrics", "status": "passed"}) == 1
+        assert sample("onetear_testcase_duration_seconds_count", {"testcase": "metrics", "status": "failed"}) == 1
+        assert sample("onetear_step_retries_total", {"testcase": "metrics", "command": "flaky"}) == 1
+        # n=1：首次与重试各 rc 1；n=0：rc 0
+        assert sample("onetear_step_rc_total", {"command": "flaky", "rc": "1"}) == 2
+        assert sample("onetear_step_rc_total", {"command": "flaky", "rc": "0"}) == 1
+        assert sample("onetear_steps_in_flight", {"command": "flaky"}) == 0
+        assert sample("onetear_testcases_in_flight", {"testcase": "metrics"}) == 0
+
+        assert 'onetear_testcase_duration_seconds_count{status="failed",testcase="metrics"} 1.0' \
+            in textfile.read_text()
+        port = obs.server.server_port
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as resp:
+            assert b"onetear_step_retries_total" in resp.read()
+    finally:
+        obs.close()
@@ -0,0 +1,63 @@
+# cases/test_output.py
+# command.output.OutputBuffer 的有界内存捕获：小输出留在内存，大输出落盘只保留 head / tail，完整内容流式读回
+import gc
+import os
+from command.output import OutputBuffer
+from command.shell import ShellCommand
+from core.context import ExecutionContext
+from domain import testcase
+from domain.hooks import Hooks
+
+
+def _fill(buf, data, step=7):
+    for i in range(0, len(data), step):
+        buf.write(data[i:i + step])
+    buf.close()
+    return buf
+
+
+def test_small_output_stays_in_memory():
+    buf = _fill(OutputBuffer(spool_threshold=64), b"hello\nworld\n")
+    assert not buf.spooled and buf.path is None
+    assert buf.text == "hello\nworld\n"
+    assert "".join(buf.iter_text()) == buf.text
+
+
+def test_large_output_spools_with_head_and_tail():
+    data = "".join(f"line {i} 数据\n" for i in range(500)).encode()
+    buf = _fill(OutputBuffer(spool_threshold=256, head_bytes=32, tail_bytes=32), data)
+
+    assert buf.spooled and buf.size == len(data)
+    assert buf.text.startswith(data[:32].decode(errors="replace"))
+    assert f"[{len(data) - 64} bytes omitted, full output: {buf.path}]" in buf.text
+    assert buf.text.endswith(data[-32:].decode(errors="replace"))
+    # 多字节字符跨块切分也能完整解码
+    assert "".join(buf.iter_text(chunk_size=5)) == data.decode()
+    assert buf.contains("line 499 数据") and not buf.contains("line 500")
+
+    path = buf.path
+    del buf
+    gc.collect()
+    assert not os.path.exists(path)
+
+
+def test_spool_dir_keeps_file(tmp_path):
+    buf = _fill(OutputBuffer(spool_threshold=8, spool_dir=str(tmp_path)), b"x" * 100)
+    path = buf.path
+    del buf
+    gc.collect()
+    assert os.path.dirname(path) == str(tmp_path) and os.path.getsize(path) == 100
+
+
+def test_shell_capture_streams_large_output():
+    cmd = ShellCommand("seq", "seq 1 20000", capture={"spool_threshold": 1024, "head_bytes": 64, "tail_bytes": 64})
+    result = cmd.run(cmd.build("do", {}))
+    buf = result["stdout_buffer"]
+
+    assert result["rc"] == 0 and buf.spooled
+    assert len(result["stdout"]) < 512 and result["stdout"].rstrip().endswith("20000")
+    assert "".join(buf.iter_text()).split() == [str(i) for i in range(1, 20001)]
+
+    ctx = ExecutionContext({}, testcase.TestCase("capture", {}, {}, [], Hooks()))
+    ctx.update(result)
+    assert ctx.vars["last_stdout_file"] == buf.path and ctx.last_stdout_buffer is buf
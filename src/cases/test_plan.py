@@ -0,0 +1,40 @@
+# cases/test_plan.py
+# core.plan 的 dry-run 渲染：变量可见性与引擎一致（on_fail 可能在任何 step 之前执行）
+from command.shell import ShellCommand
+from core.plan import build_plan, render_item
+from core.scheduler import expand_suite
+from domain import testcase
+from domain.hooks import Hooks
+from domain.step import Step
+
+
+def _item(hooks, steps=None):
+    steps = steps or [Step("s1", ShellCommand("s1", "echo {{ name }}")),
+                      Step("s2", ShellCommand("s2", "echo {{ last_stdout }}"))]
+    tc = testcase.TestCase("plan", {"name": ["a", "b"]}, {}, steps, hooks)
+    return expand_suite([tc])
+
+
+def test_on_fail_cannot_see_last_vars():
+    items = _item(Hooks(before=["echo {{ name }}"],
+                        after=["echo {{ last_stdout }}"],
+                        on_fail=["echo failed {{ name }}", "echo {{ last_stdout }}"]))
+    plan, errors = render_item(items[0])
+
+    assert plan["hooks"]["on_fail"][0] == "echo failed a"
+    assert plan["hooks"]["after"] == ["echo "]
+    assert [e["where"] for e in errors] == ["hooks.on_fail[1]"]
+    assert "last_stdout" in errors[0]["error"]
+
+
+def test_root_step_cannot_see_last_vars():
+    steps = [Step("s1", ShellCommand("s1", "echo {{ last_stdout }}"))]
+    plan, errors = render_item(_item(Hooks(), steps)[0])
+    assert [e["where"] for e in errors] == ["step 's1' do"]
+
+
+def test_build_plan_reports_every_combo():
+    items = _item(Hooks(on_fail=["echo {{ last_returncode }}"]))
+    result = build_plan(items, workers=1)
+    assert sorted({e["key"] for e in result["errors"]}) == sorted(i.key for i in items)
+    assert [(s["where"], s["combos"]) for s in result["error_summary"]] == [("hooks.on_fail[0]", 2)]
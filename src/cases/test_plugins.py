@@ -0,0 +1,70 @@
+# cases/test_plugins.py
+# core.plugins.PluginRegistry：按名称延迟 import、覆盖注册、未知名称报错；入口模块与纯 shell 用例不加载重依赖
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+import pytest
+from command.registry import COMMAND_TYPES
+from core.plugins import PluginRegistry
+from observer.registry import OBSERVERS
+
+SRC = Path(__file__).resolve().parent.parent
+
+
+def test_target_imported_on_first_get(tmp_path, monkeypatch):
+    (tmp_path / "onetear_lazy_plugin.py").write_text("class Plugin:\n    def __init__(self, x):\n        self.x = x\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "onetear_lazy_plugin", raising=False)
+
+    registry = PluginRegistry("widget", {"lazy": "onetear_lazy_plugin:Plugin"})
+    assert registry.names() == ["lazy"] and "onetear_lazy_plugin" not in sys.modules
+    plugin = registry.get("lazy")
+    assert "onetear_lazy_plugin" in sys.modules and registry.get("lazy") is plugin
+    assert registry.create("lazy", 3).x == 3
+
+    # 同名覆盖：已加载的对象失效；也可直接登记对象
+    registry.register("lazy", dict)
+    assert registry.get("lazy") is dict
+
+    with pytest.raises(ValueError, match=r"unsupported widget: nope \(expected one of \['lazy'\]\)"):
+        registry.get("nope")
+
+
+def test_builtin_registries():
+    assert COMMAND_TYPES.names() == ["shell"]
+    assert OBSERVERS.names() == ["allure", "logger", "metrics", "results", "tracing"]
+
+
+def _loaded_after(code):
+    heavy = ["psycopg2", "allure", "prometheus_client", "sqlite3", "zstandard", "asyncio", "multiprocessing"]
+    probe = textwrap.dedent(code) + f"\nimport sys\nprint(sorted(m for m in {heavy!r} if m in sys.modules))\n"
+    proc = subprocess.run([sys.executable, "-c", probe], cwd=SRC, capture_output=True, text=True, timeout=60)
+    assert proc.returncode == 0, proc.stderr
+    return proc.stdout.strip().splitlines()[-1]
+
+
+def test_entry_and_shell_only_run_skip_heavy_imports():
+    assert _loaded_after("import main") == "[]"
+    assert _loaded_after("""
+        from command.registry import CommandRegistry
+        from observer.registry import OBSERVERS
+        cmds = CommandRegistry()
+        cmds._load_items([{"name": "hello", "type": "shell", "cmd": "echo hi"}])
+        cmd = cmds.get("hello")
+        assert cmd.run(cmd.build("do", {}))["stdout"] == "hi\\n"
+        OBSERVERS.get("logger")
+    """) == "[]"
+    # 启用结果库观察者时才加载 sqlite3
+    assert _loaded_after("from observer.registry import OBSERVERS; OBSERVERS.get('results')") == "['sqlite3']"
+
+
+def test_import_bench_reports_forbidden_modules():
+    bench = [sys.executable, "tools/import_bench.py", "--repeat", "1", "--top", "1"]
+    ok = subprocess.run(bench, cwd=SRC, capture_output=True, text=True, timeout=120)
+    assert ok.returncode == 0, ok.stdout + ok.stderr
+    assert ok.stdout.startswith("main: ")
+
+    bad = subprocess.run(bench + ["--module", "observer.results"], cwd=SRC,
+                         capture_output=True, text=True, timeout=120)
+    assert bad.returncode == 1 and "FAIL: heavy modules imported eagerly: sqlite3" in bad.stdout
@@ -0,0 +1,148 @@
+# cases/test_pool.py
+# command.sql.pool 的连接复用 / 上限 / 健康检查，PostgresSQLCommand 借连接失败重试、执行失败不重放
+import threading
+import time
+import pytest
+from command.sql import postgres
+from command.sql.pool import ConnectionPool, PoolRegistry
+
+# 驱动是可选依赖：没装时只跳过 PostgresSQLCommand 的用例
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+needs_psycopg2 = pytest.mark.skipif(psycopg2 is None, reason="psycopg2 not installed")
+
+
+class FakeConn:
+    def __init__(self, fail=None):
+        self.closed = 0
+        self.fail = fail
+        self.executed = []
+
+    def close(self):
+        self.closed = 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+class FakeCursor:
+    description = None
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append(sql)
+        if self.conn.fail is not None:
+            self.conn.closed = 1
+            raise self.conn.fail
+
+
+def test_reuse_and_bound():
+    created = []
+
+    def connect():
+        created.append(FakeConn())
+        return created[-1]
+
+    pool = ConnectionPool(connect, max_size=2)
+    a = pool.acquire()
+    pool.release(a)
+    assert pool.acquire() is a and len(created) == 1
+
+    b = pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.05)
+
+    # 归还后等待者拿到连接
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire(timeout=2)))
+    waiter.start()
+    time.sleep(0.05)
+    pool.release(b)
+    waiter.join(2)
+    assert got == [b]
+
+
+def test_broken_and_idle_connections_are_dropped():
+    pings = []
+    pool = ConnectionPool(FakeConn, max_size=2, idle_timeout=0.1, ping=pings.append, ping_after=0.0,
+                          is_alive=lambda c: c.closed == 0)
+    a = pool.acquire()
+    pool.release(a, broken=True)
+    assert a.closed
+
+    b = pool.acquire()
+    pool.release(b)
+    assert pool.acquire() is b and pings == [b]
+    pool.release(b)
+
+    time.sleep(0.15)
+    c = pool.acquire()
+    assert c is not b and b.closed
+
+    pool.release(c)
+    pool.close()
+    assert c.closed
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+
+def test_registry_shares_pool_per_key():
+    registry = PoolRegistry()
+    first = registry.get(("h", 5432), lambda: ConnectionPool(FakeConn))
+    assert registry.get(("h", 5432), lambda: ConnectionPool(FakeConn)) is first
+    assert registry.get(("h", 5433), lambda: ConnectionPool(FakeConn)) is not first
+    registry.close_all()
+    assert first.closed
+
+
+def _command(monkeypatch, connect):
+    pool = ConnectionPool(connect, max_size=2, is_alive=lambda c: c.closed == 0)
+    monkeypatch.setattr(postgres, "_pool_for", lambda context: pool)
+    return postgres.PostgresSQLCommand("q", "select 1"), pool
+
+
+@needs_psycopg2
+def test_postgres_retries_acquire_once(monkeypatch):
+    attempts = []
+
+    def connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise psycopg2.OperationalError("connection refused")
+        return FakeConn()
+
+    cmd, _ = _command(monkeypatch, connect)
+    assert cmd.run("insert into t values (1)", {})["rc"] == 0
+    assert len(attempts) == 2
+
+
+@needs_psycopg2
+def test_postgres_does_not_replay_failed_statement(monkeypatch):
+    conns = []
+
+    def connect():
+        conns.append(FakeConn(fail=psycopg2.OperationalError("server closed the connection")))
+        return conns[-1]
+
+    cmd, pool = _command(monkeypatch, connect)
+    result = cmd.run("insert into t values (1)", {})
+    assert result["rc"] == 1 and "server closed" in result["stderr"]
+    assert len(conns) == 1 and conns[0].executed == ["insert into t values (1)"]
+    # 失效连接被丢弃，不回到空闲队列
+    assert not pool._idle
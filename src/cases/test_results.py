@@ -0,0 +1,97 @@
+# cases/test_results.py
+# observer.results：观察者把组合 / step 结果写入 SQLite，历史查询（最近耗时、最慢 step、翻转率、趋势）与命令行
+import json
+from assertor.registry import build_asserter
+from command.shell import ShellCommand
+from core.engine import ExecutionEngine
+from domain import testcase
+from domain.hooks import Hooks
+from domain.step import Step
+from observer.results import ResultsObserver, ResultStore, main
+
+
+def _run(db, marker, run_id):
+    # marker 存在时 n=1 通过，否则失败：两次运行之间改变 marker 即得到一次翻转
+    steps = [
+        Step("probe", ShellCommand("probe", "echo {{ n }}")),
+        Step("check", ShellCommand("check", f"test {{{{ n }}}} = 0 || test -e {marker}"),
+             build_asserter({"rc": 0})),
+    ]
+    tc = testcase.TestCase("stored", {"n": [0, 1]}, {}, steps, Hooks())
+    obs = ResultsObserver(db, run_id=run_id, batch_size=1, argv=["--demo"])
+    engine = ExecutionEngine(None, observers=[obs], max_workers=2)
+    try:
+        engine.run(tc)
+    except AssertionError:
+        pass
+    finally:
+        engine.close()
+        obs.close()
+
+
+def test_rows_written_per_combo_and_step(tmp_path):
+    db = tmp_path / "results.db"
+    _run(db, tmp_path / "missing", "run-1")
+
+    store = ResultStore(db)
+    try:
+        run = store.query("SELECT * FROM runs")[0]
+        assert run["run_id"] == "run-1" and run["finished_at"] >= run["started_at"]
+        assert json.loads(run["argv"]) == ["--demo"]
+
+        cases = {r["testcase_id"]: r for r in store.query("SELECT * FROM testcases")}
+        assert cases["stored[n=0]"]["status"] == "passed" and cases["stored[n=0]"]["error"] is None
+        assert cases["stored[n=1]"]["status"] == "failed" and cases["stored[n=1]"]["error"]
+        assert json.loads(cases["stored[n=1]"]["params"]) == {"n": 1}
+        assert all(r["duration"] >= 0 for r in cases.values())
+
+        steps = store.query("SELECT * FROM steps ORDER BY testcase_id, step")
+        assert [(s["testcase_id"], s["step"], s["status"], s["rc"]) for s in steps] == [
+            ("stored[n=0]", "check", "passed", 0),
+            ("stored[n=0]", "probe", "passed", 0),
+            ("stored[n=1]", "check", "failed", 1),
+            ("stored[n=1]", "probe", "passed", 0),
+        ]
+        probes = [s for s in steps if s["step"] == "probe"]
+        # 输出不同，摘要不同；无 stderr 时不记摘要
+        assert probes[0]["stdout_digest"] != probes[1]["stdout_digest"]
+        assert all(s["stderr_digest"] is None for s in probes)
+    finally:
+        store.close()
+
+
+def test_history_queries_and_cli(tmp_path, capsys):
+    db = tmp_path / "results.db"
+    marker = tmp_path / "marker"
+    _run(db, marker, "run-1")
+    marker.touch()
+    _run(db, marker, "run-2")
+    marker.unlink()
+    _run(db, marker, "run-3")
+
+    store = ResultStore(db)
+    try:
+        recent = store.recent_durations(per_case=2)
+        assert sorted(r["testcase_id"] for r in recent) == ["stored[n=0]"] * 2 + ["stored[n=1]"] * 2
+
+        flaky = store.flakiest_cases(min_runs=3)
+        assert [(r["testcase_id"], r["runs"], r["flips"], r["failures"]) for r in flaky] == \
+            [("stored[n=1]", 3, 2, 2)]
+        assert flaky[0]["flip_rate"] == 1.0
+
+        slowest = store.slowest_steps(run_id="run-2")
+        assert {(r["step"], r["runs"]) for r in slowest} == {("probe", 2), ("check", 2)}
+
+        trend = store.duration_trend("check", testcase="stored")
+        assert [r["run_id"] for r in trend] == ["run-1", "run-2", "run-3"]
+        assert [r["failures"] for r in trend] == [1, 0, 1]
+    finally:
+        store.close()
+
+    main(["--db", str(db), "flaky", "--min-runs", "3"])
+    out = capsys.readouterr().out.splitlines()
+    assert out[0].split() == ["testcase", "testcase_id", "runs", "failures", "flips", "flip_rate"]
+    assert out[1].split() == ["stored", "stored[n=1]", "3", "2", "2", "1.000"]
+
+    main(["--db", str(db), "trend", "missing-step"])
+    assert capsys.readouterr().out == "(no results)\n"
@@ -0,0 +1,87 @@
+# cases/test_scan.py
+# assertor.scan 的单趟多子串查找：内存输出与落盘（spooled）输出，
+# 未安装 pyahocorasick 时走正则交替式，安装了再额外跑一遍 Aho–Corasick 路径；
+# 正则逐行匹配，结果与输出大小（是否落盘）无关
+import json
+import pytest
+from assertor import scan
+from assertor.registry import build_asserter
+from command.output import OutputBuffer
+
+BACKENDS = ["re"]
+if scan.ahocorasick is not None:
+    BACKENDS.append("ahocorasick")
+
+TEXT = "\n".join(f"line {i} state=ok" for i in range(3000)) + "\nreplication lag: 12ms\nREADY primary\n"
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, monkeypatch):
+    if request.param == "re":
+        monkeypatch.setattr(scan, "ahocorasick", None)
+    return request.param
+
+
+def _spooled(text):
+    buf = OutputBuffer(spool_threshold=64, head_bytes=16, tail_bytes=16)
+    for i in range(0, len(text), 7):
+        buf.write(text[i:i + 7].encode())
+    buf.close()
+    assert buf.spooled
+    return {"stdout": buf.text, "stdout_buffer": buf, "stderr": "", "rc": 0}
+
+
+@pytest.mark.parametrize("chunks", [[TEXT], [TEXT[i:i + 5] for i in range(0, len(TEXT), 5)]])
+def test_scan_finds_overlapping_and_split_substrings(backend, chunks):
+    patterns = {"line 2999 state", "state=ok", "ate=o", "READY", "READY primary", "lag: 12", "missing"}
+    found, _ = scan._scan(chunks, patterns, [])
+    assert found == patterns - {"missing"}
+
+
+@pytest.mark.parametrize("spooled", [False, True])
+def test_text_asserters_on_memory_and_spooled_output(backend, spooled):
+    result = _spooled(TEXT) if spooled else {"stdout": TEXT, "stderr": "warn", "rc": 0}
+    build_asserter({
+        "contains_all": ["READY", "line 2999 state", "lag: {{ n }}ms"],
+        "contains_any": ["nope", "primary"],
+        "not_contains": ["ERROR", "line 3000 "],
+        "regex": [r"lag: \d+ms$", r"^READY"],
+    }).render({"n": 12}).assert_result(result)
+
+    with pytest.raises(AssertionError, match="missing"):
+        build_asserter({"contains_all": ["READY", "missing"]}).assert_result(result)
+    with pytest.raises(AssertionError, match="not contains"):
+        build_asserter({"not_contains": ["ERROR", "state=ok"]}).assert_result(result)
+
+
+@pytest.mark.parametrize("spooled", [False, True])
+def test_regex_is_line_based_regardless_of_size(spooled):
+    result = _spooled(TEXT) if spooled else {"stdout": TEXT, "stderr": "", "rc": 0}
+
+    build_asserter({"regex": [r"^READY primary$", r"^line 0 state=ok$", r"lag: \d+ms"]}).assert_result(result)
+    for pattern in (r"12ms\nREADY", r"lag: 12ms\sREADY", r"^$", r"ok[\s\S]*READY"):
+        with pytest.raises(AssertionError, match="matches"):
+            build_asserter({"regex": pattern}).assert_result(result)
+
+
+@pytest.mark.parametrize("chunks", [["a\n\nb"], ["a\n", "\nb"], ["a", "\n", "\n", "b"]])
+def test_regex_empty_line_matches_only_real_empty_lines(chunks):
+    _, matched = scan._scan(chunks, set(), [scan.re.compile("^$", scan.re.MULTILINE)])
+    assert matched
+    _, matched = scan._scan(["a\nb\n"], set(), [scan.re.compile("^$", scan.re.MULTILINE)])
+    assert not matched
+
+
+def test_equals_coerces_in_both_directions():
+    json_result = {"stdout": json.dumps({"count": 5, "ok": True, "name": "5"}), "stderr": "", "rc": 0}
+    build_asserter({"json": [
+        {"path": "count", "equals": "{{ n }}"},
+        {"path": "count", "in": ["4", "5"]},
+        {"path": "name", "equals": 5},
+        {"path": "ok", "equals": True},
+    ]}).render({"n": 5}).assert_result(json_result)
+    with pytest.raises(AssertionError, match="equals"):
+        build_asserter({"json": {"path": "count", "equals": "6"}}).assert_result(json_result)
+
+    rows_result = {"stdout": "(5, 'streaming')\n", "stderr": "", "rc": 0}
+    build_asserter({"row": [{"column": 0, "equals": "5"}, {"column": 1, "not_equals": 5}]}).assert_result(rows_result)
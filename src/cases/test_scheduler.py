@@ -0,0 +1,68 @@
+# cases/test_scheduler.py
+# core.scheduler：历史耗时预估（组合 → testcase → 全局中位数 → default）、LPT 排序与引擎按此顺序启动组合
+from command.shell import ShellCommand
+from core.engine import ExecutionEngine
+from core.scheduler import DurationHistory, expand_suite, schedule
+from domain import testcase
+from domain.hooks import Hooks
+from domain.step import Step
+from observer.results import ResultStore
+
+
+def _suite(log=None):
+    cmd = f"echo {{{{ n }}}} >> {log}" if log else "true"
+    steps = [Step("run", ShellCommand("run", cmd))]
+    return [
+        testcase.TestCase("short", {"n": [1, 2]}, {}, steps, Hooks()),
+        testcase.TestCase("long", {"n": [3, 4]}, {}, steps, Hooks()),
+        testcase.TestCase("new", {"n": [5]}, {}, steps, Hooks()),
+    ]
+
+
+def test_estimate_fallbacks():
+    history = DurationHistory([
+        ("short", "short[n=1]", 1.0), ("short", "short[n=1]", 3.0),
+        ("long", "long[n=3]", 10.0), ("long", "long[n=3]", 30.0), ("long", "long[n=3]", 20.0),
+    ], default=99.0)
+    est = {i.key: history.estimate(i) for i in expand_suite(_suite())}
+    # 组合自身中位数；同名 testcase 的中位数；全部已知组合的中位数
+    assert est == {"short[n=1]": 2.0, "short[n=2]": 2.0, "long[n=3]": 20.0, "long[n=4]": 20.0, "new[n=5]": 11.0}
+    assert DurationHistory(default=5.0).estimate(expand_suite(_suite())[0]) == 5.0
+
+
+def test_schedule_longest_first_and_stable():
+    items = expand_suite(_suite())
+    history = DurationHistory([("long", "long[n=4]", 8.0), ("long", "long[n=3]", 4.0),
+                               ("short", "short[n=2]", 1.0)])
+    assert [i.key for i in schedule(items, history)] == \
+        ["long[n=4]", "long[n=3]", "new[n=5]", "short[n=1]", "short[n=2]"]
+    # 无历史时保持展开顺序
+    assert [i.index for i in schedule(items)] == [0, 1, 2, 3, 4]
+
+
+def test_history_from_results_db(tmp_path):
+    db = tmp_path / "results.db"
+    assert DurationHistory.from_db(db, default=1.5).default == 1.5
+
+    store = ResultStore(db)
+    rows = [("r", "long", "long[n=3]", "{}", "passed", float(t), float(t), None) for t in range(1, 6)]
+    store.write(testcases=rows)
+    store.close()
+    # 只取最近 per_case 次：3、4、5 秒
+    history = DurationHistory.from_db(db, per_case=3)
+    long3 = next(i for i in expand_suite(_suite()) if i.key == "long[n=3]")
+    assert history.estimate(long3) == 4.0
+
+
+def test_engine_starts_longest_combo_first(tmp_path):
+    log = tmp_path / "order"
+    history = DurationHistory([("long", "long[n=4]", 5.0), ("long", "long[n=3]", 3.0),
+                               ("new", "new[n=5]", 2.0), ("short", "short[n=1]", 1.0)])
+    engine = ExecutionEngine(None)
+    try:
+        ctxs = engine.run_items(expand_suite(_suite(log)), history)
+    finally:
+        engine.close()
+    assert log.read_text().split() == ["4", "3", "5", "1", "2"]
+    # 返回值仍按展开顺序
+    assert [c.testcase_id for c in ctxs] == ["short[n=1]", "short[n=2]", "long[n=3]", "long[n=4]", "new[n=5]"]
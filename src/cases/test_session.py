@@ -0,0 +1,75 @@
+# cases/test_session.py
+# command.session.ShellSession：shell 状态跨命令保留、rc / stderr、超时与 exit 后重建；engine 的 testcase 会话
+import shutil
+import time
+import pytest
+from assertor.registry import build_asserter
+from command.session import SessionPool, ShellSession
+from command.shell import ShellCommand
+from core.engine import ExecutionEngine
+from domain import testcase
+from domain.hooks import Hooks
+from domain.step import Step
+
+pytestmark = pytest.mark.skipif(shutil.which("bash") is None, reason="bash not installed")
+
+
+@pytest.fixture
+def session():
+    s = ShellSession()
+    yield s
+    s.close()
+
+
+def test_state_persists_between_commands(session):
+    assert session.run("cd /tmp && export ONETEAR_X=42")["rc"] == 0
+    result = session.run("pwd; echo $ONETEAR_X")
+    assert result == {"stdout": "/tmp\n42\n", "stderr": "", "rc": 0}
+
+
+def test_rc_stderr_and_syntax_errors(session):
+    result = session.run("echo oops >&2; false")
+    assert result["rc"] == 1 and result["stderr"] == "oops\n"
+    # 语法错误不杀掉会话
+    assert session.run("if then")["rc"] != 0
+    assert session.alive and session.run("echo ok")["stdout"] == "ok\n"
+    # 命令不读会话的 stdin
+    assert session.run("cat")["rc"] == 0
+
+
+def test_exit_and_timeout_respawn(session):
+    session.run("export ONETEAR_Y=1")
+    session.run("exit 3")
+    assert session.run("echo ${ONETEAR_Y:-unset}")["stdout"] == "unset\n"
+
+    started = time.monotonic()
+    result = session.run("sleep 10", timeout=0.3)
+    assert result["timed_out"] and time.monotonic() - started < 3
+    assert session.run("echo back")["stdout"] == "back\n"
+
+
+def test_pool_reuses_session_per_key():
+    pool = SessionPool()
+    try:
+        assert pool.get("a") is pool.get("a") and pool.get("a") is not pool.get("b")
+        pool.get("a").run("export K=a")
+        pool.close("a")
+        assert pool.get("a").run("echo ${K:-none}")["stdout"] == "none\n"
+    finally:
+        pool.close_all()
+
+
+def test_engine_testcase_session_keeps_state_within_combo():
+    steps = [
+        Step("set", ShellCommand("set", "export ONETEAR_N={{ n }}")),
+        Step("get", ShellCommand("get", "echo ${ONETEAR_N:-unset}"), build_asserter({"contains": "{{ n }}"})),
+        Step("fresh", ShellCommand("fresh", "echo ${ONETEAR_N:-unset}", session=False),
+             build_asserter({"contains": "unset"})),
+    ]
+    tc = testcase.TestCase("session", {"n": [1, 2]}, {}, steps, Hooks())
+    engine = ExecutionEngine(None, max_workers=2, shell_session="testcase")
+    try:
+        ctxs = engine.run(tc)
+    finally:
+        engine.close()
+    assert [c.vars["last_stdout"] for c in ctxs] == ["unset\n", "unset\n"]
@@ -0,0 +1,53 @@
+# cases/test_shard.py
+# core.shard：--shard 解析、hash 切分互不重叠且与顺序无关、duration 模式按历史耗时均衡装箱
+import pytest
+from command.shell import ShellCommand
+from core.scheduler import DurationHistory, expand_suite
+from core.shard import parse_shard, shard_items
+from domain import testcase
+from domain.hooks import Hooks
+from domain.step import Step
+
+
+def _items(n=40):
+    steps = [Step("run", ShellCommand("run", "true"))]
+    return expand_suite([testcase.TestCase("sharded", {"n": list(range(n))}, {}, steps, Hooks())])
+
+
+def test_parse_shard():
+    assert parse_shard("2/4") == (2, 4)
+    for bad in ("0/4", "5/4", "1/0", "x/4", "1-4"):
+        with pytest.raises(ValueError):
+            parse_shard(bad)
+
+
+def test_hash_shards_partition_the_suite():
+    items = _items()
+    shards = [shard_items(items, i, 4) for i in range(1, 5)]
+    keys = [[item.key for item in shard] for shard in shards]
+    assert sorted(k for shard in keys for k in shard) == sorted(i.key for i in items)
+    assert all(keys) and all(shard == sorted(shard, key=lambda k: int(k[10:-1])) for shard in keys)
+
+    # 与加载顺序无关；新增组合不影响已有组合的归属
+    assert [i.key for i in shard_items(items[::-1], 2, 4)] == keys[1][::-1]
+    grown = _items(41)
+    assert [i.key for i in shard_items(grown, 2, 4) if i.key != "sharded[n=40]"] == keys[1]
+    assert shard_items(items, 1, 1) == items
+
+
+def test_duration_shards_are_balanced():
+    items = _items(6)
+    # 一个 10 秒的长组合，其余 5 个各 2 秒：两片各约 10 秒
+    durations = [("sharded", "sharded[n=0]", 10.0)] + [("sharded", f"sharded[n={n}]", 2.0) for n in range(1, 6)]
+    history = DurationHistory(durations)
+    first = shard_items(items, 1, 2, mode="duration", history=history)
+    second = shard_items(items, 2, 2, mode="duration", history=history)
+    assert [i.key for i in first] == ["sharded[n=0]"]
+    assert len(second) == 5 and [i.index for i in second] == [1, 2, 3, 4, 5]
+
+    # 无历史时按个数均分
+    sizes = [len(shard_items(_items(10), i, 3, mode="duration")) for i in range(1, 4)]
+    assert sorted(sizes) == [3, 3, 4]
+
+    with pytest.raises(ValueError):
+        shard_items(items, 1, 2, mode="random")
@@ -0,0 +1,111 @@
+# cases/test_shared_hooks.py
+# core.shared_hooks：testcase / run 作用域 before hook 按渲染结果去重，最后一个使用者 teardown；setup 失败共享同一异常
+import threading
+import time
+from assertor.registry import build_asserter
+from command.shell import ShellCommand
+from core.engine import ExecutionEngine
+from core.scheduler import expand_suite
+from core.shared_hooks import SharedHooks
+from domain import testcase
+from domain.hooks import Hooks
+from domain.step import Step
+
+
+def _tc(name, log, scope="run", matrix=None):
+    hooks = Hooks(before=[{
+        "cmd": f"echo setup {{{{ pg }}}} >> {log}",
+        "scope": scope,
+        "teardown": f"echo teardown {{{{ pg }}}} >> {log}",
+    }])
+    steps = [Step("use", ShellCommand("use", f"sleep 0.05; echo use {{{{ pg }}}} {name} >> {log}"),
+                  build_asserter({"rc": 0}))]
+    return testcase.TestCase(name, matrix or {"pg": [14, 15], "node": [1, 2]}, {}, steps, hooks)
+
+
+def _lines(log):
+    return log.read_text().splitlines()
+
+
+def test_run_scope_shared_across_testcases(tmp_path):
+    log = tmp_path / "log"
+    engine = ExecutionEngine(None, max_workers=4)
+    try:
+        engine.run_items(expand_suite([_tc("a", log), _tc("b", log)]))
+        lines = _lines(log)
+        assert sorted(l for l in lines if l.startswith("setup")) == ["setup 14", "setup 15"]
+        assert sorted(l for l in lines if l.startswith("teardown")) == ["teardown 14", "teardown 15"]
+        assert len([l for l in lines if l.startswith("use")]) == 8
+        for pg in ("14", "15"):
+            uses = [i for i, l in enumerate(lines) if l.startswith(f"use {pg}")]
+            assert lines.index(f"setup {pg}") < min(uses) and lines.index(f"teardown {pg}") > max(uses)
+    finally:
+        engine.close()
+    # 已全部 teardown，close 不再重复执行
+    assert len(_lines(log)) == 12
+
+
+def test_testcase_and_combo_scope(tmp_path):
+    log = tmp_path / "log"
+    engine = ExecutionEngine(None, max_workers=4)
+    try:
+        engine.run_items(expand_suite([_tc("a", log, scope="testcase"), _tc("b", log, scope="testcase")]))
+    finally:
+        engine.close()
+    assert sum(l.startswith("setup") for l in _lines(log)) == 4
+    assert sum(l.startswith("teardown") for l in _lines(log)) == 4
+
+    log.unlink()
+    engine = ExecutionEngine(None, max_workers=4)
+    try:
+        engine.run_items(expand_suite([_tc("a", log, scope="combo")]))
+    finally:
+        engine.close()
+    assert sum(l.startswith("setup") for l in _lines(log)) == 4
+    assert sum(l.startswith("teardown") for l in _lines(log)) == 4
+
+
+def test_failed_setup_fails_every_user_once():
+    shared = SharedHooks()
+    key = ("run", "provision")
+    calls, errors = [], []
+    gate = threading.Event()
+
+    def setup():
+        calls.append(1)
+        gate.wait(5)
+        raise RuntimeError("provision failed")
+
+    def user(tid):
+        shared.plan(tid, [key])
+        try:
+            shared.acquire(key, setup)
+        except RuntimeError as e:
+            errors.append(e)
+        finally:
+            shared.release(tid)
+
+    threads = [threading.Thread(target=user, args=(f"c{i}",)) for i in range(3)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1 and len(errors) == 3 and errors[0] is errors[1] is errors[2]
+    # 失败的 setup 不 teardown；之后的使用者重新 setup
+    assert shared.leftovers() == []
+    shared.acquire(key, lambda: ("cmd", "destroy", None, {}))
+    assert shared.leftovers() == [("cmd", "destroy", None, {})]
+
+
+def test_unplanned_users_tear_down_on_close(tmp_path):
+    log = tmp_path / "log"
+    engine = ExecutionEngine(None)
+    try:
+        for item in expand_suite([_tc("a", log, matrix={"pg": [14], "node": [1, 2]})]):
+            engine.run_item(item)
+        assert _lines(log) == ["setup 14", "use 14 a", "use 14 a"]
+    finally:
+        engine.close()
+    assert _lines(log)[-1] == "teardown 14"
@@ -0,0 +1,122 @@
+# cases/test_step.py
+# domain.step 的重试条件：缺省 rc != 0 / 超时，声明 rc / stderr 后只按其匹配，非法正则在加载时报错；
+# 超时杀掉整个进程组（含孙进程）
+import asyncio
+import os
+import time
+import pytest
+from command.registry import CommandRegistry
+from command.shell import ShellCommand
+from core.engine import ExecutionEngine
+from core.loader import load_testcases
+from domain import testcase
+from domain.hooks import Hooks
+from domain.step import Step
+
+FAILED = {"rc": 1, "stderr": "connection refused", "stdout": ""}
+OK = {"rc": 0, "stderr": "", "stdout": ""}
+TIMED_OUT = {"rc": -9, "stderr": "", "stdout": "", "timed_out": True}
+
+
+def _step(retry_on=None):
+    return Step("s", ShellCommand("s", "true"), retries=2, retry_on=retry_on)
+
+
+def test_default_retry_condition():
+    step = _step()
+    assert step.should_retry(FAILED) and step.should_retry(TIMED_OUT)
+    assert not step.should_retry(OK)
+
+
+def test_timeout_only_keeps_rc_default():
+    step = _step({"timeout": False})
+    assert step.should_retry(FAILED)
+    assert not step.should_retry(TIMED_OUT)
+    assert not step.should_retry(OK)
+
+
+def test_declared_rc_and_stderr():
+    assert _step({"rc": [255]}).should_retry(dict(FAILED, rc=255))
+    assert not _step({"rc": [255]}).should_retry(FAILED)
+    assert _step({"stderr": "refused"}).should_retry(FAILED)
+    assert not _step({"stderr": "timeout"}).should_retry(FAILED)
+
+
+def test_invalid_stderr_regex_is_a_load_error(tmp_path):
+    with pytest.raises(ValueError, match="retry_on.stderr"):
+        _step({"stderr": "("})
+
+    (tmp_path / "bad.yaml").write_text(
+        "name: bad\n"
+        "steps:\n"
+        "  - name: s\n"
+        "    cmd_ref: echo\n"
+        "    retries: 1\n"
+        "    retry_on: {stderr: '('}\n"
+    )
+    cmds = CommandRegistry()
+    cmds._load_items([{"name": "echo", "type": "shell", "cmd": "echo hi"}])
+    errors = []
+    assert load_testcases(str(tmp_path), cmds, errors) == []
+    assert len(errors) == 1 and "retry_on.stderr" in errors[0]["error"]
+
+
+def test_engine_retries_with_timeout_only_retry_on(tmp_path):
+    marker = tmp_path / "attempts"
+    cmd = ShellCommand("flaky", f"echo x >> {marker}; exit 1", redo_cmd=f"echo x >> {marker}")
+    step = Step("flaky", cmd, retries=2, retry_on={"timeout": False})
+    tc = testcase.TestCase("retry", {}, {}, [step], Hooks())
+    engine = ExecutionEngine(None)
+    try:
+        engine.run(tc)
+    finally:
+        engine.close()
+    assert marker.read_text().count("x") == 2
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # 已退出但尚未被回收的僵尸进程也视为不存在
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().split(") ", 1)[1][0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+@pytest.mark.parametrize("mode", ["pipe", "capture", "async"])
+def test_timeout_kills_process_group(tmp_path, mode):
+    pidfile = tmp_path / "pid"
+    cmd = ShellCommand("hang", f"sleep 30 & echo $! > {pidfile}; wait",
+                       capture={"spool_threshold": 1024} if mode == "capture" else None)
+    text = cmd.build("do", {})
+    started = time.monotonic()
+    if mode == "async":
+        result = asyncio.run(cmd.arun(text, timeout=0.3))
+    else:
+        result = cmd.run(text, timeout=0.3)
+
+    assert time.monotonic() - started < 2.5
+    assert result["timed_out"] and "process group killed" in result["stderr"]
+    grandchild = int(pidfile.read_text())
+    deadline = time.monotonic() + 2
+    while _alive(grandchild) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not _alive(grandchild)
+
+
+def test_engine_raises_timeout_after_retries(tmp_path):
+    marker = tmp_path / "attempts"
+    cmd = ShellCommand("slow", f"echo x >> {marker}; sleep 5")
+    step = Step("slow", cmd, timeout=0.2, retries=1)
+    tc = testcase.TestCase("timeout", {}, {}, [step], Hooks())
+    engine = ExecutionEngine(None)
+    try:
+        with pytest.raises(TimeoutError, match="timed out after 0.2s"):
+            engine.run(tc)
+    finally:
+        engine.close()
+    assert marker.read_text().count("x") == 2
@@ -0,0 +1,54 @@
+# cases/test_template.py
+# core.template.TemplateService：按源码 LRU 共享编译结果、StrictUndefined、磁盘字节码缓存跨实例复用
+import pytest
+from jinja2 import UndefinedError
+from command.shell import ShellCommand
+from core.template import TemplateService, templates
+from domain.step import Step
+
+
+def test_same_source_compiled_once():
+    service = TemplateService(max_size=2)
+    first = service.compile("echo {{ a }}")
+    assert service.compile("echo {{ a }}") is first
+    assert service.stats()["hits"] == 1 and service.stats()["misses"] == 1
+    assert service.render("echo {{ a }}", {"a": 1}) == "echo 1"
+
+
+def test_lru_bound():
+    service = TemplateService(max_size=2)
+    a = service.compile("a")
+    service.compile("b")
+    service.compile("a")
+    service.compile("c")
+    assert service.stats()["size"] == 2
+    assert service.compile("a") is a
+    service.compile("b")
+    assert service.stats()["misses"] == 4
+
+
+def test_strict_undefined():
+    with pytest.raises(UndefinedError):
+        TemplateService().render("echo {{ missing }}", {})
+
+
+def test_commands_share_compiled_templates():
+    templates.clear()
+    ShellCommand("one", "echo {{ shared_x }}")
+    before = templates.stats()
+    two = ShellCommand("two", "echo {{ shared_x }}", redo_cmd="echo {{ shared_x }}")
+    Step("s", two)
+    after = templates.stats()
+    assert after["misses"] == before["misses"]
+    assert after["hits"] == before["hits"] + 2
+    assert two.templates["do"] is two.templates["redo"]
+
+
+def test_bytecode_cache_is_reused_across_services(tmp_path):
+    TemplateService(bytecode_dir=str(tmp_path)).compile("echo {% for i in range(3) %}{{ i }}{% endfor %}")
+    files = list(tmp_path.iterdir())
+    assert len(files) == 1
+
+    other = TemplateService(bytecode_dir=str(tmp_path))
+    assert other.render("echo {% for i in range(3) %}{{ i }}{% endfor %}", {}) == "echo 012"
+    assert list(tmp_path.iterdir()) == files
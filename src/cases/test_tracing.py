@@ -0,0 +1,59 @@
+# cases/test_tracing.py
+# observer.tracing.TracingObserver：一个组合一条 trace，step span 挂在 testcase 下，阶段子 span 与重试事件
+import json
+from assertor.registry import build_asserter
+from command.shell import ShellCommand
+from core.engine import ExecutionEngine
+from domain import testcase
+from domain.hooks import Hooks
+from domain.step import Step
+from observer.tracing import STATUS_ERROR, STATUS_OK, FileSpanExporter, TracingObserver
+
+
+def _spans(path):
+    spans = []
+    for line in path.read_text().splitlines():
+        for rs in json.loads(line)["resourceSpans"]:
+            for ss in rs["scopeSpans"]:
+                spans.extend(ss["spans"])
+    return spans
+
+
+def _attrs(span):
+    return {a["key"]: next(iter(a["value"].values())) for a in span["attributes"]}
+
+
+def test_spans_per_combo(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    obs = TracingObserver(FileSpanExporter(str(path)), batch_size=4, flush_interval=0.05)
+    steps = [
+        Step("probe", ShellCommand("probe", "echo {{ n }}"), build_asserter({"contains": "{{ n }}"})),
+        Step("check", ShellCommand("check", "exit {{ n }}"), build_asserter({"rc": 0}), retries=1),
+    ]
+    tc = testcase.TestCase("traced", {"n": [0, 1]}, {}, steps, Hooks())
+    engine = ExecutionEngine(None, observers=[obs])
+    try:
+        engine.run(tc)
+    except AssertionError:
+        pass
+    finally:
+        engine.close()
+        obs.close()
+
+    spans = _spans(path)
+    roots = [s for s in spans if not s["parentSpanId"]]
+    assert sorted(_attrs(r)["onetear.testcase_id"] for r in roots) == ["traced[n=0]", "traced[n=1]"]
+    assert {r["status"]["code"] for r in roots} == {STATUS_OK, STATUS_ERROR}
+    assert len({r["traceId"] for r in roots}) == 2
+
+    by_id = {s["spanId"]: s for s in spans}
+    step_spans = [s for s in spans if s["parentSpanId"] in {r["spanId"] for r in roots}]
+    assert sorted(s["name"] for s in step_spans) == ["check", "check", "probe", "probe"]
+    for s in step_spans:
+        assert s["traceId"] == by_id[s["parentSpanId"]]["traceId"]
+        assert int(s["startTimeUnixNano"]) <= int(s["endTimeUnixNano"])
+
+    failed = next(s for s in step_spans if s["status"]["code"] == STATUS_ERROR)
+    assert failed["name"] == "check" and [e["name"] for e in failed["events"]] == ["retry"]
+    phases = [s["name"] for s in spans if s["parentSpanId"] == failed["spanId"]]
+    assert phases.count("execute") >= 2 and "render" in phases
@@ -0,0 +1,72 @@
+# cases/test_yaml_files.py
+# core.yaml_files.YamlFileService：磁盘缓存跨实例命中、touch 不重新解析、内容变化失效、语法错误逐文件报告、并行加载
+import os
+import pytest
+from core.yaml_files import _INDEX, YamlFileService
+
+
+def _write(path, text):
+    path.write_text(text)
+    return str(path)
+
+
+def test_disk_cache_survives_new_service(tmp_path):
+    cache = tmp_path / "cache"
+    a = _write(tmp_path / "a.yaml", "name: a\nsteps: [1, 2]\n")
+    b = _write(tmp_path / "b.yaml", "- x\n- y\n")
+
+    first = YamlFileService(cache_dir=cache)
+    assert first.load_many([a, b]) == [{"name": "a", "steps": [1, 2]}, ["x", "y"]]
+    assert first.stats() == {"hits": 0, "misses": 2, "size": 2}
+
+    second = YamlFileService(cache_dir=cache)
+    assert second.load_many([b, a]) == [["x", "y"], {"name": "a", "steps": [1, 2]}]
+    assert second.stats()["hits"] == 2 and second.stats()["misses"] == 0
+
+    # 只改 mtime：比对 sha1 后仍命中，并刷新索引中的 mtime
+    st = os.stat(a)
+    os.utime(a, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    third = YamlFileService(cache_dir=cache)
+    assert third.load(a) == {"name": "a", "steps": [1, 2]} and third.stats()["hits"] == 1
+    assert YamlFileService(cache_dir=cache)._probe(os.path.abspath(a))[2] is None
+
+    # 内容变化：重新解析
+    _write(tmp_path / "a.yaml", "name: changed\n")
+    fourth = YamlFileService(cache_dir=cache)
+    assert fourth.load(a) == {"name": "changed"} and fourth.stats()["misses"] == 1
+
+
+def test_syntax_errors_reported_per_file(tmp_path):
+    good = _write(tmp_path / "good.yaml", "k: v\n")
+    bad = _write(tmp_path / "bad.yaml", "k: [unclosed\n")
+    service = YamlFileService(cache_dir=tmp_path / "cache")
+
+    results = service.load_many([bad, good], return_errors=True)
+    assert isinstance(results[0], ValueError) and "invalid YAML" in str(results[0])
+    assert results[1] == {"k": "v"}
+    # 坏文件不进缓存
+    assert service.stats()["size"] == 1
+
+    with pytest.raises(ValueError, match="bad.yaml"):
+        service.load_many([good, bad])
+
+
+def test_parallel_load_matches_serial(tmp_path):
+    paths = [_write(tmp_path / f"f{i}.yaml", f"index: {i}\nitems: {list(range(i))}\n") for i in range(12)]
+    paths.append(_write(tmp_path / "broken.yaml", "a: b: c\n"))
+    serial = YamlFileService().load_many(paths, return_errors=True)
+    parallel = YamlFileService(workers=2, parallel_threshold=4).load_many(paths, return_errors=True)
+
+    assert parallel[:-1] == serial[:-1] == [{"index": i, "items": list(range(i))} for i in range(12)]
+    assert isinstance(parallel[-1], ValueError) and str(parallel[-1]) == str(serial[-1])
+
+
+def test_corrupt_or_stale_index_is_ignored(tmp_path):
+    cache = tmp_path / "cache"
+    cache.mkdir()
+    (cache / _INDEX).write_bytes(b"not a pickle")
+    a = _write(tmp_path / "a.yaml", "k: 1\n")
+    service = YamlFileService(cache_dir=cache)
+    assert service.load(a) == {"k": 1} and service.stats()["misses"] == 1
+    # 重新写出了有效索引
+    assert YamlFileService(cache_dir=cache).stats()["size"] == 1
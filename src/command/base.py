@@ -13,5 +13,5 @@ class CommandDefinition(ABC):
         ...
 
     @abstractmethod
-    def run(self, cmd: str):
+    def run(self, cmd: str, context: dict = None, timeout=None):
         ...
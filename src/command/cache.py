@@ -0,0 +1,280 @@
+# command/cache.py
+"""
+只读命令的结果缓存（按内容寻址）
+
+命令 yaml 中声明：
+
+    - name: pg_version
+      type: shell
+      cmd: "psql -Atc 'select version()'"
+      cacheable: true
+      cache_ttl: 600            # 秒，缺省为作用域内一直有效
+      cache_scope: run          # testcase（默认）| run | persistent
+      cache_vars: [node]        # 除渲染后的命令文本外，参与 key 的 context 变量
+
+    - name: kill_primary
+      type: shell
+      cmd: "pkill -9 postgres"
+      effect: chaos             # none（默认）| read | write | chaos
+
+    - name: create_table
+      type: sql
+      sql: "create table t(id int)"
+      effect: write
+      effect_scope: run         # write 默认只影响当前组合（testcase）；testcase | run | persistent
+
+- key = sha256(命令类型 + 渲染后的命令文本 + cache_vars 的取值)，与命令名无关，
+  不同命令渲染出相同文本时共享结果；SQL 命令默认把连接参数（pg_host / pg_port / pg_user / pg_db）计入 key
+- 只缓存 do 动作且成功（rc == 0、未超时、输出未落盘）的结果；redo（重试 / eventually 轮询）总是真实执行
+- 没有声明 effect 的命令（none）既不缓存也不使缓存失效
+- write / chaos 命令执行后使 effect_scope 及更窄的作用域失效：write 默认只换代当前组合的 testcase 作用域，
+  chaos 默认 persistent（系统状态整体变化，所有组合缓存的探测结果都不再可信）；
+  hook 条目同样可以声明 effect / effect_scope
+- 套件中没有 cacheable 命令、或当前没有缓存条目时失效为空操作，不做任何磁盘 I/O
+- persistent 作用域落盘到 cache_dir，跨运行有效；失效通过递增盘上的 generation 实现，
+  只在盘上已有缓存条目时才递增
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+SCOPES = ("testcase", "run", "persistent")
+EFFECTS = ("none", "read", "write", "chaos")
+
+# 结果中可以缓存的字段（OutputBuffer 等对象不缓存）
+_RESULT_FIELDS = ("stdout", "stderr", "rc")
+
+
+class CachePolicy:
+    def __init__(self, cacheable=False, ttl=None, scope="testcase", vars=(), effect=None, effect_scope=None):
+        effect = effect or ("read" if cacheable else "none")
+        effect_scope = effect_scope or ("persistent" if effect == "chaos" else "testcase")
+        if scope not in SCOPES:
+            raise ValueError(f"unknown cache_scope: {scope} (expected one of {SCOPES})")
+        if effect not in EFFECTS:
+            raise ValueError(f"unknown effect: {effect} (expected one of {EFFECTS})")
+        if effect_scope not in SCOPES:
+            raise ValueError(f"unknown effect_scope: {effect_scope} (expected one of {SCOPES})")
+        if cacheable and effect != "read":
+            raise ValueError(f"only read commands can be cacheable (effect={effect})")
+
+        self.cacheable = cacheable
+        self.ttl = ttl
+        self.scope = scope
+        self.vars = tuple(vars)
+        self.effect = effect
+        self.effect_scope = effect_scope
+
+    @classmethod
+    def from_config(cls, cfg: dict, default_vars=()):
+        return cls(
+            cacheable=cfg.get("cacheable", False),
+            ttl=cfg.get("cache_ttl"),
+            scope=cfg.get("cache_scope", "testcase"),
+            vars=cfg.get("cache_vars", default_vars),
+            effect=cfg.get("effect"),
+            effect_scope=cfg.get("effect_scope"),
+        )
+
+    @property
+    def invalidates(self):
+        """执行后需要换代的作用域：effect_scope 及比它窄的作用域"""
+        if self.effect not in ("write", "chaos"):
+            return ()
+        return SCOPES[:SCOPES.index(self.effect_scope) + 1]
+
+
+# 没有声明策略的命令既不缓存也不使缓存失效
+_DEFAULT_POLICY = CachePolicy()
+
+
+def policy_of(command):
+    return getattr(command, "cache_policy", None) or _DEFAULT_POLICY
+
+
+class ResultCache:
+    def __init__(self, cache_dir=None, max_entries=4096, scopes=SCOPES):
+        """
+        cache_dir:   persistent 作用域的目录；为空时 persistent 退化为 run 作用域
+        max_entries: 内存中缓存的结果数上限（LRU）
+        scopes:      套件中 cacheable 命令用到的作用域（CommandRegistry.cache_scopes()）；
+                     为空时没有可缓存的命令，invalidate 为空操作
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.scopes = frozenset(scopes)
+        self.hits = 0
+        self.misses = 0
+
+        # (作用域标识, generation, key) -> (过期时间 monotonic 或 None, result)
+        self._mem = OrderedDict()
+        self._run_generation = 0
+        self._testcase_generation = {}
+        self._lock = threading.Lock()
+
+        # 盘上是否已有 persistent 条目（一旦为真不再检查）
+        self._disk_entries = False
+        if cache_dir and "persistent" in self.scopes:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    # ---------- engine 接口 ----------
+    def lookup(self, command, action, cmd_str, ctx):
+        policy = policy_of(command)
+        if not policy.cacheable or action != "do":
+            return None
+        key = self._key(command, cmd_str, ctx, policy)
+
+        if policy.scope == "persistent" and self._persistent:
+            result = self._disk_get(key)
+        else:
+            with self._lock:
+                slot = self._slot(policy, ctx, key)
+                entry = self._mem.get(slot)
+                result = None
+                if entry is not None:
+                    expires, result = entry
+                    if expires is not None and time.monotonic() >= expires:
+                        del self._mem[slot]
+                        result = None
+                    else:
+                        self._mem.move_to_end(slot)
+
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return dict(result, cached=True)
+
+    def after_execute(self, command, action, cmd_str, ctx, result):
+        """命令执行后：read 命令存结果，write / chaos 命令使缓存失效（执行抛异常时 result 为 None）"""
+        policy = policy_of(command)
+        if policy.invalidates:
+            self.invalidate(ctx, policy.invalidates)
+            return
+        if not policy.cacheable or action != "do" or result is None or not _cacheable_result(result):
+            return
+
+        key = self._key(command, cmd_str, ctx, policy)
+        value = {f: result[f] for f in _RESULT_FIELDS}
+        if policy.scope == "persistent" and self._persistent:
+            self._disk_put(key, value, policy.ttl)
+            self._disk_entries = True
+            return
+
+        expires = None if policy.ttl is None else time.monotonic() + policy.ttl
+        with self._lock:
+            self._mem[self._slot(policy, ctx, key)] = (expires, value)
+            while len(self._mem) > self.max_entries:
+                self._mem.popitem(last=False)
+
+    def invalidate(self, ctx, scopes=SCOPES):
+        """换代 scopes 中的作用域；testcase 作用域只换代当前组合，其他组合的条目不受影响"""
+        if not self.scopes:
+            return
+        with self._lock:
+            # 内存中没有条目时无需换代：之后写入的条目本来就反映变更后的状态
+            if self._mem:
+                if "testcase" in scopes:
+                    tid = ctx.testcase_id
+                    self._testcase_generation[tid] = self._testcase_generation.get(tid, 0) + 1
+                if "run" in scopes:
+                    self._run_generation += 1
+            if "persistent" in scopes and self._persistent and self._has_disk_entries():
+                self._write_generation(self._read_generation() + 1)
+
+    def forget(self, ctx):
+        """组合结束：丢弃其 testcase 作用域的条目"""
+        tid = ctx.testcase_id
+        with self._lock:
+            self._testcase_generation.pop(tid, None)
+            for slot in [s for s in self._mem if s[0] == ("testcase", tid)]:
+                del self._mem[slot]
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._mem)}
+
+    # ---------- helpers ----------
+    @property
+    def _persistent(self):
+        return bool(self.cache_dir) and "persistent" in self.scopes
+
+    def _has_disk_entries(self):
+        # 其他进程（分布式工作者）可能刚写入条目：没见过条目时每次都重新看一眼目录
+        if not self._disk_entries:
+            try:
+                with os.scandir(self.cache_dir) as it:
+                    self._disk_entries = any(e.name.endswith(".json") for e in it)
+            except OSError:
+                pass
+        return self._disk_entries
+
+    def _key(self, command, cmd_str, ctx, policy):
+        h = hashlib.sha256()
+        h.update(type(command).__name__.encode())
+        h.update(b"\0")
+        h.update(cmd_str.encode("utf-8"))
+        for name in policy.vars:
+            h.update(b"\0")
+            h.update(f"{name}={ctx.vars.get(name)!r}".encode("utf-8"))
+        return h.hexdigest()
+
+    def _slot(self, policy, ctx, key):
+        if policy.scope == "testcase":
+            tid = ctx.testcase_id
+            return ("testcase", tid), self._testcase_generation.get(tid, 0), key
+        return ("run",), self._run_generation, key
+
+    def _generation_path(self):
+        return os.path.join(self.cache_dir, "GENERATION")
+
+    def _read_generation(self):
+        try:
+            with open(self._generation_path()) as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _write_generation(self, generation):
+        _atomic_write(self._generation_path(), str(generation))
+
+    def _disk_get(self, key):
+        # 其他进程（分布式工作者 / 上一次运行）可能已使缓存失效，以盘上的 generation 为准
+        generation = self._read_generation()
+        try:
+            with open(os.path.join(self.cache_dir, f"{key}.json"), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry["generation"] != generation:
+            return None
+        if entry["expires"] is not None and time.time() >= entry["expires"]:
+            return None
+        return entry["result"]
+
+    def _disk_put(self, key, value, ttl):
+        entry = {
+            "generation": self._read_generation(),
+            "expires": None if ttl is None else time.time() + ttl,
+            "result": value,
+        }
+        _atomic_write(os.path.join(self.cache_dir, f"{key}.json"), json.dumps(entry, ensure_ascii=False))
+
+
+def _cacheable_result(result):
+    if result.get("rc") != 0 or result.get("timed_out"):
+        return False
+    buf = result.get("stdout_buffer")
+    return buf is None or not buf.spooled
+
+
+def _atomic_write(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(data)
+    os.replace(tmp, path)
@@ -0,0 +1,141 @@
+import codecs
+import os
+import tempfile
+import weakref
+
+
+class OutputBuffer:
+    """
+    有界内存的命令输出缓冲（流式写入）
+
+    - 累计输出 <= spool_threshold：全部保存在内存，text 即完整输出
+    - 超过后：完整输出落盘到临时文件（spool），内存只保留 head / tail 两段，
+      text 返回 head + 省略提示 + tail，完整内容通过 iter_text() 流式读取
+
+    spool_dir 为空时使用系统临时目录，缓冲对象被回收时自动删除 spool 文件；
+    指定 spool_dir 时文件保留，供日志 / 报告引用
+    """
+
+    def __init__(self, spool_threshold=8 * 1024 * 1024, head_bytes=64 * 1024,
+                 tail_bytes=64 * 1024, spool_dir=None, encoding="utf-8"):
+        self.spool_threshold = spool_threshold
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.spool_dir = spool_dir
+        self.encoding = encoding
+
+        self.size = 0
+        self.path = None
+        self._mem = bytearray()
+        self._head = b""
+        self._tail = bytearray()
+        self._file = None
+
+    @property
+    def spooled(self):
+        return self.path is not None
+
+    def write(self, data: bytes):
+        if not data:
+            return
+        self.size += len(data)
+
+        if self._file is None:
+            self._mem += data
+            if self.spool_threshold is not None and len(self._mem) > self.spool_threshold:
+                self._spool()
+            return
+
+        self._file.write(data)
+        self._tail += data
+        if len(self._tail) > 2 * self.tail_bytes:
+            self._trim_tail()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._trim_tail()
+
+    @property
+    def text(self):
+        """内存中的（可能被截断的）文本"""
+        if not self.spooled:
+            return self._decode(self._mem)
+
+        omitted = self.size - len(self._head) - len(self._tail)
+        return (
+            self._decode(self._head)
+            + f"\n... [{omitted} bytes omitted, full output: {self.path}] ...\n"
+            + self._decode(self._tail)
+        )
+
+    def iter_text(self, chunk_size=1024 * 1024):
+        """按块流式返回完整输出（不一次性读入内存）"""
+        if not self.spooled:
+            yield self._decode(self._mem)
+            return
+
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+        with open(self.path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield decoder.decode(chunk)
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+    def contains(self, needle: str):
+        """流式子串查找，块之间保留 len(needle)-1 个字符的重叠，避免漏掉跨块匹配"""
+        if not needle:
+            return True
+        keep = len(needle) - 1
+        carry = ""
+        for chunk in self.iter_text():
+            window = carry + chunk
+            if needle in window:
+                return True
+            carry = window[-keep:] if keep else ""
+        return False
+
+    # ---------- helpers ----------
+    def _spool(self):
+        fd, self.path = tempfile.mkstemp(prefix="onetear-", suffix=".out", dir=self.spool_dir)
+        self._file = os.fdopen(fd, "wb")
+        if self.spool_dir is None:
+            weakref.finalize(self, _unlink_quietly, self.path)
+
+        self._file.write(self._mem)
+        self._head = bytes(self._mem[:self.head_bytes])
+        self._tail = bytearray(self._mem)
+        self._trim_tail()
+        self._mem = bytearray()
+
+    def _trim_tail(self):
+        del self._tail[:max(len(self._tail) - self.tail_bytes, 0)]
+
+    def _decode(self, data):
+        return bytes(data).decode(self.encoding, errors="replace")
+
+
+def _unlink_quietly(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def pump(stream, buffer: OutputBuffer, chunk_size=64 * 1024):
+    """把管道内容增量读入 buffer，读到 EOF 后关闭管道与 buffer"""
+    try:
+        fd = stream.fileno()
+        while True:
+            chunk = os.read(fd, chunk_size)
+            if not chunk:
+                break
+            buffer.write(chunk)
+    finally:
+        stream.close()
+        buffer.close()
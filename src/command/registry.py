@@ -1,8 +1,18 @@
-import yaml
 from pathlib import Path
 
-from command.shell import ShellCommand
-from command.sql.postgres import PostgresSQLCommand
+from command.cache import CachePolicy
+from core.plugins import PluginRegistry
+from core.yaml_files import yaml_files
+
+# 命令实现按 type（sql 按 db）延迟加载：只用 shell 命令时不会 import psycopg2
+# 第三方实现需提供 from_config(cfg) 类方法，例如：
+#     COMMAND_TYPES.register("http", "my_plugins.http:HttpCommand")
+COMMAND_TYPES = PluginRegistry("command type", {
+    "shell": "command.shell:ShellCommand",
+})
+SQL_DBS = PluginRegistry("sql db", {
+    "postgres": "command.sql.postgres:PostgresSQLCommand",
+})
 
 
 class CommandRegistry:
@@ -10,42 +20,25 @@ class CommandRegistry:
         self._cmds = {}
 
     def load_dir(self, path: str):
-        path = Path(path)
-        for yml in path.rglob("*.yaml"):
-            self._load_file(yml)
-
-    def _load_file(self, file: Path):
-        with open(file) as f:
-            items = yaml.safe_load(f) or []
+        files = list(Path(path).rglob("*.yaml"))
+        for items in yaml_files.load_many(files):
+            self._load_items(items or [])
 
+    def _load_items(self, items):
         for item in items:
             cmd = self._build_command(item)
+            cmd.cache_policy = CachePolicy.from_config(item, getattr(cmd, "cache_vars", ()))
             self._cmds[cmd.name] = cmd
 
     def _build_command(self, cfg: dict):
-        ctype = cfg["type"]
-
-        if ctype == "shell":
-            return ShellCommand(
-                name=cfg["name"],
-                cmd=cfg["cmd"],
-                redo_cmd=cfg.get("redo_cmd", ""),
-                undo_cmd=cfg.get("undo_cmd", ""),
-                description=cfg.get("description", ""),
-            )
-
-        if ctype == "sql":
-            db = cfg["db"]
-            if db == "postgres":
-                return PostgresSQLCommand(
-                    name=cfg["name"],
-                    sql=cfg["sql"],
-                    description=cfg.get("description", ""),
-                )
-
-            raise ValueError(f"unsupported sql db: {db}")
-
-        raise ValueError(f"unsupported command type: {ctype}")
+        # sql 命令再按 db 选择实现
+        if cfg["type"] == "sql":
+            return SQL_DBS.get(cfg["db"]).from_config(cfg)
+        return COMMAND_TYPES.get(cfg["type"]).from_config(cfg)
 
     def get(self, name: str):
         return self._cmds[name]
+
+    def cache_scopes(self):
+        """cacheable 命令用到的缓存作用域（见 command.cache.ResultCache）"""
+        return {c.cache_policy.scope for c in self._cmds.values() if c.cache_policy.cacheable}
@@ -0,0 +1,201 @@
+import os
+import selectors
+import shlex
+import signal
+import subprocess
+import threading
+import time
+import uuid
+
+# 正常关闭会话时等待 bash 退出的时间（秒）
+_CLOSE_GRACE = 2.0
+
+
+class ShellSession:
+    """
+    常驻 bash 会话
+
+    命令通过 stdin 写入，用 eval 执行（语法错误不会杀掉会话），
+    执行完在 stdout / stderr 各打印一个随机 sentinel，stdout 的 sentinel 后附带返回码：
+
+        eval '<cmd>' </dev/null; __rc=$?; printf '<TOKEN>%d\\n' $__rc; printf '<TOKEN>\\n' >&2
+
+    - 省去每条命令一次 fork/exec /bin/sh 的开销
+    - cd / export 等 shell 状态在同一会话的命令之间保留
+    - 会话退出（命令里 exit、进程被杀）或超时后标记失效，下次执行自动重建
+
+    同一会话内命令串行执行（加锁）
+    """
+
+    def __init__(self, shell="/bin/bash"):
+        self.shell = shell
+        self.token = f"__ONETEAR_{uuid.uuid4().hex}__".encode()
+        self._proc = None
+        self._lock = threading.Lock()
+
+    @property
+    def alive(self):
+        return self._proc is not None and self._proc.poll() is None
+
+    def run(self, cmd: str, timeout=None):
+        if not cmd:
+            return {"stdout": "", "stderr": "", "rc": 0}
+
+        with self._lock:
+            if not self.alive:
+                self._spawn()
+
+            script = (
+                f"eval {shlex.quote(cmd)} </dev/null; __onetear_rc=$?; "
+                f"printf '%s%d\\n' '{self.token.decode()}' \"$__onetear_rc\"; "
+                f"printf '%s\\n' '{self.token.decode()}' >&2\n"
+            )
+            try:
+                self._proc.stdin.write(script.encode())
+                self._proc.stdin.flush()
+            except (BrokenPipeError, OSError):
+                # 会话在两条命令之间死掉：重建后再发一次
+                self._spawn()
+                self._proc.stdin.write(script.encode())
+                self._proc.stdin.flush()
+
+            return self._read_result(timeout)
+
+    def close(self):
+        with self._lock:
+            self._terminate()
+
+    # ---------- helpers ----------
+    def _spawn(self):
+        self._terminate()
+        self._proc = subprocess.Popen(
+            [self.shell, "--noprofile", "--norc"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True,
+        )
+
+    def _terminate(self, kill_group=False):
+        """
+        结束会话进程
+        - 正常关闭：关闭 stdin 让 bash 自行退出，命令启动的后台服务（如 pg_ctl start）不受影响
+        - kill_group=True（超时）：与 ShellCommand 超时语义一致，杀掉整个进程组
+        """
+        p, self._proc = self._proc, None
+        if p is None:
+            return
+        if kill_group:
+            try:
+                os.killpg(p.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        else:
+            try:
+                p.stdin.close()
+            except OSError:
+                pass
+            try:
+                p.wait(_CLOSE_GRACE)
+            except subprocess.TimeoutExpired:
+                p.kill()
+        p.wait()
+        for stream in (p.stdin, p.stdout, p.stderr):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+    def _complete(self, buf):
+        """sentinel 及其所在行（stdout 侧带返回码）已完整读到"""
+        idx = buf.find(self.token)
+        return idx >= 0 and buf.find(b"\n", idx) >= 0
+
+    def _read_result(self, timeout):
+        """读取 stdout / stderr 直到两边都出现 sentinel（或会话退出 / 超时）"""
+        p = self._proc
+        deadline = None if timeout is None else time.monotonic() + timeout
+        bufs = {p.stdout: bytearray(), p.stderr: bytearray()}
+        done = {p.stdout: False, p.stderr: False}
+
+        sel = selectors.DefaultSelector()
+        for stream in bufs:
+            sel.register(stream, selectors.EVENT_READ)
+
+        timed_out = False
+        try:
+            while not all(done.values()):
+                wait = None if deadline is None else deadline - time.monotonic()
+                if wait is not None and wait <= 0:
+                    timed_out = True
+                    break
+                for key, _ in sel.select(wait):
+                    stream = key.fileobj
+                    chunk = os.read(stream.fileno(), 64 * 1024)
+                    if not chunk:
+                        # EOF：会话进程已退出（命令中执行了 exit 等）
+                        done[stream] = True
+                        sel.unregister(stream)
+                        continue
+                    bufs[stream] += chunk
+                    if self._complete(bufs[stream]):
+                        done[stream] = True
+                        sel.unregister(stream)
+        finally:
+            sel.close()
+
+        out, err = bufs[p.stdout], bufs[p.stderr]
+        if timed_out:
+            self._terminate(kill_group=True)
+            return {
+                "stdout": _decode(out),
+                "stderr": (_decode(err) + f"\n[timed out after {timeout}s, session killed]").lstrip("\n"),
+                "rc": -signal.SIGKILL,
+                "timed_out": True,
+            }
+
+        if not self._complete(out):
+            # 会话在命令执行过程中退出：返回码取 shell 进程退出码
+            rc = p.wait()
+            self._terminate()
+            return {"stdout": _decode(out), "stderr": _decode(err), "rc": rc}
+
+        stdout, _, rest = bytes(out).partition(self.token)
+        stderr = bytes(err).partition(self.token)[0]
+        return {
+            "stdout": _decode(stdout),
+            "stderr": _decode(stderr),
+            "rc": int(rest.split(b"\n", 1)[0]),
+        }
+
+
+def _decode(data):
+    return bytes(data).decode("utf-8", errors="replace")
+
+
+class SessionPool:
+    """按 key（testcase_id / 节点名）维护 ShellSession，首次使用时创建"""
+
+    def __init__(self, shell="/bin/bash"):
+        self.shell = shell
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = ShellSession(self.shell)
+            return session
+
+    def close(self, key):
+        with self._lock:
+            session = self._sessions.pop(key, None)
+        if session is not None:
+            session.close()
+
+    def close_all(self):
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            session.close()
@@ -1,16 +1,9 @@
+import os
+import signal
 import subprocess
-from jinja2 import Environment, StrictUndefined
-
-# =========================
-# Jinja2 全局环境
-# =========================
-# - StrictUndefined：模板中引用未定义变量时直接抛异常（非常重要）
-#   防止 silent failure（命令中变量未替换却悄悄执行）
-# - autoescape=False：shell 命令不是 HTML，不需要转义
-_env = Environment(
-    undefined=StrictUndefined,
-    autoescape=False
-)
+import threading
+from command.output import OutputBuffer, pump
+from core.template import compile_template
 
 
 class ShellCommand:
@@ -23,15 +16,22 @@ class ShellCommand:
     - run(...)：真正执行 shell 命令
     """
 
-    def __init__(self, name, cmd, redo_cmd="", undo_cmd="", description=""):
+    def __init__(self, name, cmd, redo_cmd="", undo_cmd="", description="", capture=None,
+                 session=True):
         """
         :param name: 命令名称（唯一标识，用于 cmd_ref）
         :param cmd: 主命令模板（do）
         :param redo_cmd: 重试命令模板（可选，默认等于 cmd）
         :param undo_cmd: 回滚命令模板（可选）
         :param description: 命令说明（用于日志 / Allure 展示）
+        :param capture: 流式输出捕获配置（可选，传入即启用），透传给 OutputBuffer：
+                        spool_threshold / head_bytes / tail_bytes / spool_dir
+        :param session: engine 开启常驻 shell 会话时是否使用会话执行（默认是）
+                        需要干净进程环境的命令可设为 False
         """
         self.name = name
+        self.capture = capture
+        self.use_session = session
 
         # =========================
         # 预编译 Jinja2 模板
@@ -40,14 +40,29 @@ class ShellCommand:
         # 好处：
         # - 运行时更快
         # - 提前暴露语法错误
+        # 编译走共享的 TemplateService（StrictUndefined，按源码 LRU 缓存），
+        # do / redo 相同或多个命令共用同一模板时只编译一次
         self.templates = {
-            "do": _env.from_string(cmd),
-            "redo": _env.from_string(redo_cmd or cmd),
-            "undo": _env.from_string(undo_cmd) if undo_cmd else None,
+            "do": compile_template(cmd),
+            "redo": compile_template(redo_cmd or cmd),
+            "undo": compile_template(undo_cmd) if undo_cmd else None,
         }
 
         self.description = description
 
+    @classmethod
+    def from_config(cls, cfg: dict):
+        """由命令 yaml 条目构造（type: shell）"""
+        return cls(
+            name=cfg["name"],
+            cmd=cfg["cmd"],
+            redo_cmd=cfg.get("redo_cmd", ""),
+            undo_cmd=cfg.get("undo_cmd", ""),
+            description=cfg.get("description", ""),
+            capture=cfg.get("capture"),
+            session=cfg.get("session", True),
+        )
+
     def build(self, action: str, context: dict) -> str:
         """
         根据 action + context 渲染最终可执行的 shell 命令字符串
@@ -71,17 +86,19 @@ class ShellCommand:
         # 如果 context 缺少变量，这里会直接抛异常
         return tpl.render(**context)
 
-    def run(self, cmd: str):
+    def run(self, cmd: str, context: dict = None, timeout=None):
         """
         实际执行 shell 命令
 
         ⚠️ 注意：
         - 这里只负责“执行”，不做断言
-        - 不做重试
+        - 不做重试（重试策略由 engine 按 step 配置处理）
         - 不关心 testcase / step 语义
         - engine 会负责 orchestration
 
         :param cmd: 已渲染完成的 shell 命令
+        :param context: 执行上下文（与 SQLCommand.run 接口对齐，shell 执行不依赖它）
+        :param timeout: 超时秒数（可选）；超时后杀掉整个进程组，结果带 timed_out=True
         :return: 标准化的执行结果 dict
         """
         # 空命令直接视为 no-op
@@ -92,24 +109,209 @@ class ShellCommand:
                 "rc": 0,
             }
 
+        if self.capture is not None:
+            return self._run_streaming(cmd, timeout)
+
         # =========================
-        # 使用 subprocess.run 执行
+        # 使用 subprocess.Popen 执行
         # =========================
         # shell=True：
         #   - 允许使用 shell 特性（管道、重定向等）
-        # capture_output=True：
+        # stdout / stderr=PIPE：
         #   - 捕获 stdout / stderr
         # text=True：
         #   - 返回 str 而不是 bytes
-        p = subprocess.run(
+        # start_new_session=True：
+        #   - 子进程独立进程组，超时可以连同 ssh / pg_ctl 等孙进程一起杀掉
+        p = subprocess.Popen(
             cmd,
             shell=True,
-            capture_output=True,
-            text=True
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            start_new_session=True,
         )
 
-        return {
-            "stdout": p.stdout,
-            "stderr": p.stderr,
-            "rc": p.returncode,
-        }
+        timed_out = False
+        try:
+            stdout, stderr = p.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            _kill_group(p)
+            stdout, stderr = _drain(p)
+        except BaseException:
+            _kill_group(p)
+            raise
+
+        return _result(stdout, stderr, p.returncode, timed_out, timeout)
+
+    def _run_streaming(self, cmd: str, timeout=None):
+        """
+        流式捕获模式：增量读取 stdout / stderr 管道，输出超过阈值后落盘，
+        内存只保留 head / tail（适用于 journalctl、日志导出等超大输出命令）
+
+        返回结果中 stdout / stderr 为有界文本，
+        stdout_buffer / stderr_buffer 为 OutputBuffer，断言可据此流式扫描完整输出
+        """
+        p = subprocess.Popen(
+            cmd,
+            shell=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True,
+        )
+
+        out = OutputBuffer(**self.capture)
+        err = OutputBuffer(**self.capture)
+        readers = [
+            threading.Thread(target=pump, args=(p.stdout, out), daemon=True),
+            threading.Thread(target=pump, args=(p.stderr, err), daemon=True),
+        ]
+        for t in readers:
+            t.start()
+
+        timed_out = False
+        try:
+            p.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            _kill_group(p)
+        except BaseException:
+            _kill_group(p)
+            raise
+
+        # 脱离进程组的后台进程可能仍持有管道，超时场景下不无限等待
+        for t in readers:
+            t.join(_KILL_GRACE if timed_out else None)
+
+        result = _result(out.text, err.text, p.returncode, timed_out, timeout)
+        result["stdout_buffer"] = out
+        result["stderr_buffer"] = err
+        return result
+
+    async def arun(self, cmd: str, context: dict = None, timeout=None):
+        """
+        run 的 asyncio 版本（供 AsyncExecutionEngine 使用）
+        语义与 run 一致：独立进程组、超时杀整个进程组、capture 配置下流式落盘
+        """
+        # asyncio 只有 --async 引擎用到，同步运行不加载
+        import asyncio
+        if not cmd:
+            return {
+                "stdout": "",
+                "stderr": "",
+                "rc": 0,
+            }
+
+        p = await asyncio.create_subprocess_shell(
+            cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+        )
+
+        out = OutputBuffer(**(self.capture if self.capture is not None else {"spool_threshold": None}))
+        err = OutputBuffer(**(self.capture if self.capture is not None else {"spool_threshold": None}))
+        readers = asyncio.gather(_apump(p.stdout, out), _apump(p.stderr, err))
+
+        timed_out = False
+        try:
+            await asyncio.wait_for(asyncio.shield(readers), timeout)
+            await p.wait()
+        except asyncio.TimeoutError:
+            timed_out = True
+            await _akill_group(p)
+            try:
+                await asyncio.wait_for(readers, _KILL_GRACE)
+            except asyncio.TimeoutError:
+                pass
+        except BaseException:
+            await _akill_group(p)
+            readers.cancel()
+            raise
+
+        if self.capture is None:
+            # 与 text=True 的行为保持一致：统一换行符
+            result = _result(_universal_newlines(out.text), _universal_newlines(err.text),
+                             p.returncode, timed_out, timeout)
+        else:
+            result = _result(out.text, err.text, p.returncode, timed_out, timeout)
+            result["stdout_buffer"] = out
+            result["stderr_buffer"] = err
+        return result
+
+
+# 超时后 SIGTERM 与 SIGKILL 之间的宽限时间（秒）
+_KILL_GRACE = 2.0
+
+
+def _kill_group(p):
+    """先 SIGTERM 整个进程组，宽限期后 SIGKILL，确保孙进程一并退出"""
+    try:
+        os.killpg(p.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+    try:
+        p.wait(_KILL_GRACE)
+    except subprocess.TimeoutExpired:
+        pass
+    try:
+        os.killpg(p.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    p.wait()
+
+
+async def _akill_group(p):
+    """_kill_group 的 asyncio 版本"""
+    import asyncio
+    try:
+        os.killpg(p.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+    try:
+        await asyncio.wait_for(p.wait(), _KILL_GRACE)
+    except asyncio.TimeoutError:
+        pass
+    try:
+        os.killpg(p.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    await p.wait()
+
+
+async def _apump(stream, buffer: OutputBuffer, chunk_size=64 * 1024):
+    try:
+        while True:
+            chunk = await stream.read(chunk_size)
+            if not chunk:
+                break
+            buffer.write(chunk)
+    finally:
+        buffer.close()
+
+
+def _universal_newlines(text):
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _drain(p):
+    """收集被杀进程的残留输出；管道仍被外部进程占用时放弃"""
+    try:
+        return p.communicate(timeout=_KILL_GRACE)
+    except subprocess.TimeoutExpired:
+        for stream in (p.stdout, p.stderr):
+            stream.close()
+        return "", ""
+
+
+def _result(stdout, stderr, rc, timed_out, timeout):
+    result = {
+        "stdout": stdout,
+        "stderr": stderr,
+        "rc": rc,
+    }
+    if timed_out:
+        result["timed_out"] = True
+        result["stderr"] = f"{stderr}\n[timed out after {timeout}s, process group killed]".lstrip("\n")
+    return result
@@ -1,6 +1,4 @@
-from jinja2 import Environment, StrictUndefined
-
-_env = Environment(undefined=StrictUndefined, autoescape=False)
+from core.template import compile_template
 
 
 class BaseSQLCommand:
@@ -8,26 +6,58 @@ class BaseSQLCommand:
     SQL Command 的抽象基类
 
     负责：
-    - SQL 模板渲染
+    - SQL 模板渲染（do / redo / undo，与 ShellCommand 保持同一接口）
     - 统一执行接口
 
     子类负责：
     - 具体数据库连接与执行逻辑
     """
 
-    def __init__(self, name, sql, description=""):
+    def __init__(self, name, sql, redo_sql="", undo_sql="", description=""):
         self.name = name
-        self.template = _env.from_string(sql)
+        self.templates = {
+            "do": compile_template(sql),
+            "redo": compile_template(redo_sql or sql),
+            "undo": compile_template(undo_sql) if undo_sql else None,
+        }
         self.description = description
 
-    def build(self, context: dict) -> str:
+    @classmethod
+    def from_config(cls, cfg: dict):
+        """由命令 yaml 条目构造（type: sql，db 选择子类，见 command.registry）"""
+        return cls(
+            name=cfg["name"],
+            sql=cfg["sql"],
+            redo_sql=cfg.get("redo_sql", ""),
+            undo_sql=cfg.get("undo_sql", ""),
+            description=cfg.get("description", ""),
+        )
+
+    def build(self, action: str, context: dict) -> str:
         """
-        使用 context 渲染 SQL
+        使用 context 渲染 SQL，action 没有定义模板时返回空字符串
         """
-        return self.template.render(**context)
+        tpl = self.templates.get(action)
+        if not tpl:
+            return ""
+        return tpl.render(**context)
 
-    def run(self, sql: str, context: dict):
+    def run(self, sql: str, context: dict, timeout=None):
         """
         执行 SQL（子类必须实现）
+        timeout: 语句超时秒数（可选），超时结果带 timed_out=True
         """
         raise NotImplementedError
+
+    async def arun(self, sql: str, context: dict, timeout=None):
+        """
+        asyncio 执行入口
+        同步驱动（连接池 + 阻塞执行）放到 executor(context) 返回的线程池；有原生 async 驱动的子类可覆盖
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor(context), self.run, sql, context, timeout)
+
+    def executor(self, context: dict):
+        """arun 使用的线程池；None 为事件循环的默认线程池，使用连接池的子类返回与池同样大小的专用线程池"""
+        return None
@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ConnectionPool:
+    """
+    通用数据库连接池（与具体驱动解耦，由子类命令传入 connect / 健康检查函数）
+
+    - max_size：同时借出的连接上限，超出时 acquire 阻塞等待
+    - idle_timeout：空闲超过该时长的连接在下次借还时被关闭
+    - 借出时做健康检查：is_alive 每次检查（廉价），ping 仅在空闲超过 ping_after 时执行
+    - 归还时 broken=True 或连接已失效则直接丢弃
+    - executor：与 max_size 同样大小的专用线程池，asyncio 引擎经它执行阻塞驱动调用，
+      并发语句在池内排队，不占用事件循环的默认线程池
+    """
+
+    def __init__(self, connect, max_size=4, idle_timeout=300.0,
+                 is_alive=None, ping=None, ping_after=5.0, close=None):
+        if max_size < 1:
+            raise ValueError(f"invalid pool max_size: {max_size}")
+        self._connect = connect
+        self._is_alive = is_alive or (lambda conn: True)
+        self._ping = ping
+        self._close = close or (lambda conn: conn.close())
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.ping_after = ping_after
+
+        # 空闲连接：(conn, 最近归还时间)；LIFO 复用，尽量命中热连接
+        self._idle = deque()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._executor = None
+        self.closed = False
+
+    def acquire(self, timeout=None):
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"no free connection within {timeout}s (max_size={self.max_size})")
+
+        try:
+            while True:
+                with self._lock:
+                    if self.closed:
+                        raise RuntimeError("connection pool is closed")
+                    self._evict_idle()
+                    item = self._idle.pop() if self._idle else None
+
+                if item is None:
+                    return self._connect()
+
+                conn, last_used = item
+                if self._healthy(conn, last_used):
+                    return conn
+                self._discard(conn)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_size, thread_name_prefix="sql-pool")
+            return self._executor
+
+    def release(self, conn, broken=False):
+        try:
+            if broken or self.closed or not self._is_alive(conn):
+                self._discard(conn)
+                return
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+                self._evict_idle()
+        finally:
+            self._slots.release()
+
+    def discard_idle(self):
+        """
+        关闭全部空闲连接
+        某个连接被对端断开（如 chaos 杀掉主库）时，同一 server 的其他连接大概率也已失效
+        """
+        with self._lock:
+            items, self._idle = list(self._idle), deque()
+        for conn, _ in items:
+            self._discard(conn)
+
+    def close(self):
+        self.closed = True
+        self.discard_idle()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    # ---------- helpers ----------
+    def _healthy(self, conn, last_used):
+        if not self._is_alive(conn):
+            return False
+        if self._ping and time.monotonic() - last_used >= self.ping_after:
+            try:
+                self._ping(conn)
+            except Exception:
+                return False
+        return True
+
+    def _evict_idle(self):
+        # 调用方持有 self._lock；deque 左侧是最久未使用的连接
+        now = time.monotonic()
+        while self._idle and now - self._idle[0][1] > self.idle_timeout:
+            conn, _ = self._idle.popleft()
+            self._discard(conn)
+
+    def _discard(self, conn):
+        try:
+            self._close(conn)
+        except Exception:
+            pass
+
+
+class PoolRegistry:
+    """按 key（如 host/port/user/db）维护连接池，首次使用时通过 factory 创建"""
+
+    def __init__(self):
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, factory):
+        pool = self._pools.get(key)
+        if pool is not None:
+            return pool
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = factory()
+            return pool
+
+    def close_all(self):
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
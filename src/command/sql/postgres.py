@@ -1,48 +1,131 @@
-import psycopg2
+import atexit
 from command.sql.base import BaseSQLCommand
+from command.sql.pool import ConnectionPool, PoolRegistry
+
+# 进程级连接池：按 (host, port, user, db) 区分
+_pools = PoolRegistry()
+atexit.register(_pools.close_all)
+
+
+def _ping(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT 1")
+    conn.rollback()
+
+
+def _pool_for(context: dict):
+    key = (
+        context["pg_host"],
+        context.get("pg_port", 5432),
+        context["pg_user"],
+        context["pg_db"],
+    )
+
+    def factory():
+        # 驱动在第一次建连时才加载：不含 SQL 命令的运行不需要 psycopg2
+        import psycopg2
+        return ConnectionPool(
+            connect=lambda: psycopg2.connect(
+                host=context["pg_host"],
+                port=context.get("pg_port", 5432),
+                user=context["pg_user"],
+                password=context["pg_password"],
+                dbname=context["pg_db"],
+            ),
+            max_size=context.get("pg_pool_size", 4),
+            idle_timeout=context.get("pg_pool_idle_timeout", 300),
+            is_alive=lambda conn: conn.closed == 0,
+            ping=_ping,
+        )
+
+    return _pools.get(key, factory)
 
 
 class PostgresSQLCommand(BaseSQLCommand):
     """
     PostgreSQL SQL Command 实现
+
+    连接从进程级连接池借出，执行完归还；
+    借连接（建连 / 空闲连接健康检查）失败时丢弃该 server 的空闲连接并重试一次；
+    语句执行过程中连接断开不重试：服务端可能已经提交，重放非幂等的 INSERT / UPDATE 会执行两次，
+    只丢弃失效的空闲连接并返回错误（由 step 的 retries / eventually 决定是否重新执行）
     """
 
-    def run(self, sql: str, context: dict):
+    # 结果缓存默认按连接目标区分（见 command.cache）
+    cache_vars = ("pg_host", "pg_port", "pg_user", "pg_db")
+
+    def executor(self, context: dict):
+        # 同一连接目标的语句最多 pg_pool_size 条同时执行，其余在专用线程池中排队
+        return _pool_for(context).executor
+
+    def run(self, sql: str, context: dict, timeout=None):
         """
         执行 SQL 并返回统一结果结构
+        timeout 通过事务级 statement_timeout 下推给服务端，超时结果带 timed_out=True
         """
-        conn = psycopg2.connect(
-            host=context["pg_host"],
-            port=context.get("pg_port", 5432),
-            user=context["pg_user"],
-            password=context["pg_password"],
-            dbname=context["pg_db"],
-        )
+        if not sql:
+            return {"stdout": "", "stderr": "", "rc": 0}
+
+        import psycopg2
+        pool = _pool_for(context)
+        conn = self._acquire(pool, psycopg2)
+        if isinstance(conn, dict):
+            return conn
 
+        broken = False
         try:
-            with conn:
-                with conn.cursor() as cur:
-                    cur.execute(sql)
-
-                    # SELECT 才有结果
-                    if cur.description:
-                        rows = cur.fetchall()
-                        stdout = "\n".join(str(r) for r in rows)
-                    else:
-                        stdout = ""
-
-            return {
-                "stdout": stdout,
-                "stderr": "",
-                "rc": 0,
-            }
+            return self._execute(conn, sql, timeout)
+
+        except psycopg2.extensions.QueryCanceledError as e:
+            result = self._error(e)
+            result["timed_out"] = True
+            return result
+
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            broken = conn.closed != 0
+            if broken:
+                pool.discard_idle()
+            return self._error(e)
 
         except Exception as e:
-            return {
-                "stdout": "",
-                "stderr": str(e),
-                "rc": 1,
-            }
+            return self._error(e)
 
         finally:
-            conn.close()
+            pool.release(conn, broken=broken)
+
+    def _acquire(self, pool, psycopg2):
+        """借连接，失败时重试一次；仍失败返回错误结果"""
+        for attempt in (1, 2):
+            try:
+                return pool.acquire()
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                pool.discard_idle()
+                if attempt == 2:
+                    return self._error(e)
+
+    def _execute(self, conn, sql, timeout=None):
+        with conn:
+            with conn.cursor() as cur:
+                if timeout:
+                    cur.execute("SET LOCAL statement_timeout = %s", (int(timeout * 1000),))
+                cur.execute(sql)
+
+                # SELECT 才有结果
+                if cur.description:
+                    rows = cur.fetchall()
+                    stdout = "\n".join(str(r) for r in rows)
+                else:
+                    stdout = ""
+
+        return {
+            "stdout": stdout,
+            "stderr": "",
+            "rc": 0,
+        }
+
+    def _error(self, e):
+        return {
+            "stdout": "",
+            "stderr": str(e),
+            "rc": 1,
+        }
@@ -0,0 +1,20 @@
+# core/address.py
+"""
+协调者地址与认证密钥的解析（main 解析命令行时使用，不依赖 multiprocessing，见 core.distributed）
+"""
+import os
+
+AUTHKEY_ENV = "ONETEAR_AUTHKEY"
+
+
+def parse_address(spec: str):
+    """'host:port' -> (host, port)"""
+    host, sep, port = spec.rpartition(":")
+    if not sep or not port.isdigit():
+        raise ValueError(f"invalid address: {spec!r} (expected host:port)")
+    return host or "127.0.0.1", int(port)
+
+
+def authkey_from_env():
+    key = os.environ.get(AUTHKEY_ENV)
+    return key.encode() if key else None
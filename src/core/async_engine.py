@@ -0,0 +1,241 @@
+# core/async_engine.py
+"""
+asyncio 执行引擎（--async 时才加载，同步运行不 import asyncio）
+"""
+import asyncio
+import time
+from core.context import ExecutionContext
+from core.engine import ExecutionEngine, _error_text
+from core.scheduler import expand_suite, schedule
+
+
+class AsyncExecutionEngine(ExecutionEngine):
+    """
+    asyncio 执行引擎
+
+    与 ExecutionEngine 语义一致（hooks / DAG / retry / timeout / eventually / observer 事件），
+    区别在于 step 与 matrix 组合都是协程：
+    - shell 命令走 asyncio.create_subprocess_shell（ShellCommand.arun）
+    - 同步驱动的 SQL 在与连接池同样大小的专用线程池中执行（BaseSQLCommand.arun），
+      其余没有 arun 的命令放到默认线程池，均不阻塞事件循环
+    - 观察者事件经 bus.try_notify 入队，队列满时让出事件循环等待（见 anotify）
+    单进程即可同时驱动成百上千个 step，不需要为每个并发单元占用一个 OS 线程
+
+    max_workers 为同时执行的 matrix 组合上限
+    """
+
+    def run(self, testcase):
+        return asyncio.run(self.arun(testcase))
+
+    async def arun(self, testcase):
+        """返回值与 ExecutionEngine.run 相同：按展开顺序的 context 列表，失败按展开顺序抛出第一个"""
+        combos = list(testcase.expand())
+        self._plan_hooks(expand_suite([testcase]))
+        sem = asyncio.Semaphore(max(1, self.max_workers))
+
+        async def one(vars):
+            async with sem:
+                return await self._arun_combo(testcase, vars)
+
+        results = await asyncio.gather(*(one(v) for v in combos), return_exceptions=True)
+        for r in results:
+            if isinstance(r, BaseException):
+                raise r
+        return results
+
+    def run_items(self, items, history=None):
+        return asyncio.run(self.arun_items(items, history))
+
+    async def arun_items(self, items, history=None):
+        """
+        同 ExecutionEngine.run_items：任务按预估耗时降序创建，
+        信号量按等待顺序放行，长组合先开始；失败在全部结束后按展开顺序抛出
+        """
+        items = schedule(items, history)
+        self._plan_hooks(items)
+        sem = asyncio.Semaphore(max(1, self.max_workers))
+
+        async def one(item):
+            async with sem:
+                return await self._arun_combo(item.testcase, item.vars)
+
+        results = await asyncio.gather(*(one(i) for i in items), return_exceptions=True)
+        done = {item.index: r for item, r in zip(items, results)}
+        ordered = [done[i] for i in sorted(done)]
+        for r in ordered:
+            if isinstance(r, BaseException):
+                raise r
+        return ordered
+
+    def run_item(self, item):
+        return asyncio.run(self._arun_combo(item.testcase, item.vars))
+
+    async def anotify(self, event, *args):
+        """同 notify；observer_overflow=block 且队列已满时让出事件循环等待，不阻塞其他协程"""
+        start = time.time_ns()
+        delay = 0.001
+        while not self.bus.try_notify(event, *args):
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.05)
+        if event.startswith("step_"):
+            args[-1].phases.append(("observe", start, time.time_ns(), {"event": event}))
+
+    async def _arun_combo(self, testcase, vars):
+        ctx = ExecutionContext(vars, testcase)
+        started = time.monotonic()
+        held = []
+        await self.anotify("testcase_start", testcase, ctx)
+        try:
+            await self._asetup_hooks(testcase.hooks.before, ctx, held)
+            await self._arun_steps(testcase, ctx)
+            await self._arun_hooks(testcase.hooks.after, ctx)
+            await asyncio.to_thread(self._teardown_hooks, ctx, held)
+            await self.anotify("testcase_end", testcase, ctx)
+            self._record(ctx, "passed", started)
+        except Exception as e:
+            ctx.error = _error_text(e)
+            await self._arun_hooks(testcase.hooks.on_fail, ctx)
+            await asyncio.to_thread(self._teardown_hooks, ctx, held)
+            await self.anotify("testcase_fail", testcase, ctx)
+            self._record(ctx, "failed", started)
+            raise
+        finally:
+            if self.sessions is not None:
+                await asyncio.to_thread(self._close_testcase_session, ctx)
+            if self.cache is not None:
+                self.cache.forget(ctx)
+            await asyncio.to_thread(self.bus.flush)
+        return ctx
+
+    async def _arun_steps(self, testcase, ctx):
+        dag = testcase.dag
+        limit = testcase.parallelism or self.step_workers
+
+        if not dag.concurrent or limit <= 1:
+            for i in dag.order:
+                step = dag.steps[i]
+                ctx.next_step(step.name)
+                await self._arun_step(step, ctx)
+            return
+
+        await self._arun_dag(dag, ctx, limit)
+
+    async def _arun_dag(self, dag, ctx, limit):
+        """调度规则同 ExecutionEngine._run_dag"""
+        remaining = [len(d) for d in dag.deps]
+        ready = [i for i, n in enumerate(remaining) if n == 0]
+        running = {}
+        error = None
+
+        while ready or running:
+            while ready and error is None and len(running) < limit:
+                i = ready.pop(0)
+                task = asyncio.ensure_future(self._arun_forked_step(dag.steps[i], ctx))
+                running[task] = i
+
+            if not running:
+                break
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for t in sorted(done, key=running.get):
+                i = running.pop(t)
+                exc = t.exception()
+                if exc is not None:
+                    error = error or exc
+                    continue
+                for child in dag.children[i]:
+                    remaining[child] -= 1
+                    if remaining[child] == 0:
+                        ready.append(child)
+            ready.sort()
+
+        if error is not None:
+            raise error
+
+    async def _arun_forked_step(self, step, ctx):
+        step_ctx = ctx.fork(step.name)
+        try:
+            await self._arun_step(step, step_ctx)
+        finally:
+            ctx.merge(step_ctx)
+
+    async def _arun_step(self, step, ctx):
+        await self.anotify("step_start", step, ctx)
+        try:
+            result = await self._aexecute_with_retry(step, ctx)
+
+            if step.asserter:
+                with ctx.phase("assert"):
+                    asserter = step.asserter.render(ctx.vars)
+                    rerun = lambda: self._aexecute(step.command, "redo", ctx, step.timeout)
+                    if hasattr(asserter, "aassert_result"):
+                        result = await asserter.aassert_result(result, rerun=rerun)
+                    else:
+                        result = await asyncio.to_thread(asserter.assert_result, result)
+                ctx.update(result)
+
+            await self.anotify("step_end", step, ctx)
+
+        except Exception as e:
+            ctx.error = _error_text(e)
+            await self._aexecute(step.command, "undo", ctx, step.timeout)
+            await self.anotify("step_fail", step, ctx)
+            raise e
+
+    async def _aexecute_with_retry(self, step, ctx):
+        """重试规则同 ExecutionEngine._execute_with_retry"""
+        result = await self._aexecute(step.command, "do", ctx, step.timeout)
+        ctx.update(result)
+
+        attempt = 0
+        while attempt < step.retries and step.should_retry(result):
+            attempt += 1
+            ctx.retry_count = attempt
+            await self.anotify("step_retry", step, ctx)
+            if step.retry_delay:
+                await asyncio.sleep(step.retry_delay)
+            result = await self._aexecute(step.command, "redo", ctx, step.timeout)
+            ctx.update(result)
+
+        if result.get("timed_out"):
+            raise TimeoutError(f"{ctx.step_id} timed out after {step.timeout}s")
+        return result
+
+    async def _aexecute(self, command, action, ctx, timeout=None):
+        with ctx.phase("render", action=action):
+            cmd_str = ctx.last_command = command.build(action, ctx.vars)
+        cached = self._cache_lookup(command, action, cmd_str, ctx)
+        if cached is not None:
+            return cached
+
+        result = None
+        try:
+            with ctx.phase("execute", action=action):
+                session = self._session_for(command, ctx)
+                arun = getattr(command, "arun", None)
+                if session is not None:
+                    # 会话读写是阻塞的，且同一会话内本就串行
+                    result = await asyncio.to_thread(session.run, cmd_str, timeout)
+                elif arun is not None:
+                    result = await arun(cmd_str, ctx.vars, timeout=timeout)
+                else:
+                    result = await asyncio.to_thread(command.run, cmd_str, ctx.vars, timeout=timeout)
+            return result
+        finally:
+            if self.cache is not None:
+                self.cache.after_execute(command, action, cmd_str, ctx, result)
+
+    async def _arun_hooks(self, hooks, ctx):
+        for h in hooks:
+            await self._aexecute(self._hook_command(h), "do", ctx)
+
+    async def _asetup_hooks(self, hooks, ctx, held):
+        for hook in hooks:
+            if hook.shared:
+                # 等待其他组合的共享 setup 会阻塞，放到线程里（setup 本身走同步执行）
+                await asyncio.to_thread(self._setup_hooks, [hook], ctx, held)
+                continue
+            command = self._hook_command(hook)
+            await self._aexecute(command, "do", ctx)
+            if hook.teardown:
+                held.append((command, command.build("undo", ctx.vars)))
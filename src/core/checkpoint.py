@@ -0,0 +1,104 @@
+# core/checkpoint.py
+"""
+Checkpoint 日志：记录已结束的组合，供中断后 --resume 跳过已通过的组合
+
+格式为追加写的 JSONL，每个组合结束时写一行：
+
+    {"key": "<testcase_id>", "status": "passed|failed", "duration": 12.3, "error": null, "ts": 1700000000.0}
+
+- 每行写入后立即 flush 到内核，fsync 按批进行（每 fsync_every 行或距上次超过 fsync_interval 秒），
+  机器掉电最多丢最后一批，进程被 kill 不丢
+- 读取时同一组合以最后一行为准；被截断的末行（写到一半时崩溃）忽略
+- --shard I/N 时每片使用独立的日志（见 shard_path），同一目录下并发的分片进程互不覆盖
+"""
+import json
+import os
+import threading
+import time
+
+
+class CheckpointJournal:
+    def __init__(self, path, resume=False, fsync_every=16, fsync_interval=1.0):
+        """
+        resume=False：新的一次运行，清空旧日志
+        resume=True： 在旧日志后追加，entries 为此前的记录
+        """
+        self.path = str(path)
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+
+        self.entries = load_journal(self.path) if resume else {}
+        parent = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(parent, exist_ok=True)
+        self._fp = open(self.path, "a" if resume else "w", encoding="utf-8")
+        if resume and not _ends_with_newline(self.path):
+            # 上次在写一行的中途被中断：另起一行，避免新记录接在残行后面
+            self._fp.write("\n")
+
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def completed(self):
+        """最后一次结果为 passed 的组合"""
+        return {key for key, e in self.entries.items() if e["status"] == "passed"}
+
+    def record(self, key, status, duration=None, error=None):
+        entry = {"key": key, "status": status, "duration": duration, "error": error, "ts": time.time()}
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            self.entries[key] = entry
+            self._fp.write(line)
+            self._fp.flush()
+            self._unsynced += 1
+            if (self._unsynced >= self.fsync_every
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync()
+
+    def close(self):
+        with self._lock:
+            if self._fp.closed:
+                return
+            self._sync()
+            self._fp.close()
+
+    def _sync(self):
+        os.fsync(self._fp.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+
+def shard_path(path, shard=None):
+    """
+    分片运行的日志路径：logs/checkpoint.jsonl + (1, 4) -> logs/checkpoint.shard-1-of-4.jsonl
+    续跑时传入相同的 --shard 即可找到对应分片的日志
+    """
+    if shard is None:
+        return str(path)
+    root, ext = os.path.splitext(str(path))
+    index, count = shard
+    return f"{root}.shard-{index}-of-{count}{ext}"
+
+
+def load_journal(path):
+    """读取日志：{key: 最后一条记录}；文件不存在时为空"""
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            entries[entry["key"]] = entry
+    return entries
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
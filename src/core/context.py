@@ -1,4 +1,22 @@
 # core/context.py
+import copy
+import threading
+import time
+from contextlib import contextmanager
+
+
+def build_testcase_id(testcase, vars):
+    """组合的唯一标识：name[k1=v1,k2=v2]（无 matrix 时就是 name）"""
+    if not testcase.matrix:
+        return testcase.name
+
+    parts = [
+        f"{k}={vars[k]}"
+        for k in testcase.matrix.keys()
+    ]
+    return f"{testcase.name}[{','.join(parts)}]"
+
+
 class ExecutionContext:
     def __init__(self, vars: dict, testcase):
         self.vars = dict(vars)
@@ -7,20 +25,70 @@ class ExecutionContext:
 
         self.step_index = 0
         self.step_id = None
+        self.retry_count = 0
+        self.last_stdout_buffer = None
+        # 当前 step 各阶段耗时：[(name, start_ns, end_ns, attrs)]，供 tracing 等观察者使用
+        self.phases = []
+        # 最近一次实际执行的命令文本（渲染后），观察者直接取用，无需重新渲染
+        self.last_command = None
+        # 失败原因（"ExceptionType: message"），由引擎在 step / 组合失败时填写
+        self.error = None
+        # 事件发出时刻（snapshot 时填写）：后台投递的观察者据此计算耗时 / 时间戳
+        self.event_time = None
+        self.event_ns = None
 
-    def _build_testcase_id(self):
-        if not self.testcase.matrix:
-            return self.testcase.name
+        # DAG 并发 step 共享同一个 testcase context，step 编号与结果回写需要加锁
+        self._lock = threading.Lock()
 
-        parts = [
-            f"{k}={self.vars[k]}"
-            for k in self.testcase.matrix.keys()
-        ]
-        return f"{self.testcase.name}[{','.join(parts)}]"
+    def _build_testcase_id(self):
+        return build_testcase_id(self.testcase, self.vars)
 
     def next_step(self, step_name):
         self.step_index += 1
         self.step_id = f"{self.testcase_id}::step-{self.step_index}:{step_name}"
+        self.retry_count = 0
+        self.phases = []
+        self.last_command = None
+        self.error = None
+
+    def fork(self, step_name):
+        """
+        为并发执行的 step 派生子 context：
+        - 共享 testcase / testcase_id / 锁
+        - 拥有独立的 step_id 和 vars 副本（并发 step 互不覆盖 last_*）
+        """
+        with self._lock:
+            self.next_step(step_name)
+            child = copy.copy(self)
+            child.vars = dict(self.vars)
+            child.phases = []
+        return child
+
+    def snapshot(self):
+        """事件快照：供观察者异步读取，之后引擎对 ctx 的修改不影响快照"""
+        snap = copy.copy(self)
+        snap.vars = dict(self.vars)
+        snap.phases = list(self.phases)
+        snap.event_time = time.monotonic()
+        snap.event_ns = time.time_ns()
+        return snap
+
+    @contextmanager
+    def phase(self, name, **attrs):
+        """记录当前 step 内一个阶段（render / execute / assert / observe）的起止时间"""
+        start = time.time_ns()
+        try:
+            yield
+        finally:
+            self.phases.append((name, start, time.time_ns(), attrs))
+
+    def merge(self, child):
+        """将子 context 的执行结果回写到 testcase context，供后继 step 引用"""
+        with self._lock:
+            for key in ("last_stdout", "last_stderr", "last_returncode", "last_stdout_file"):
+                if key in child.vars:
+                    self.vars[key] = child.vars[key]
+            self.last_stdout_buffer = child.last_stdout_buffer
 
     def update(self, result: dict):
         self.vars.update({
@@ -28,3 +96,9 @@ class ExecutionContext:
             "last_stderr": result["stderr"],
             "last_returncode": result["rc"],
         })
+
+        # 流式捕获且已落盘：last_stdout 只是 head/tail 摘要，完整输出路径单独暴露
+        # 同时持有 buffer 引用，保证临时 spool 文件在下一个 step 之前不会被回收删除
+        buf = result.get("stdout_buffer")
+        self.last_stdout_buffer = buf
+        self.vars["last_stdout_file"] = buf.path if buf is not None and buf.spooled else None
@@ -0,0 +1,373 @@
+# core/distributed.py
+"""
+协调者 / 工作者分布式执行
+
+协调者（Coordinator）持有展开后的工作队列（按历史耗时从长到短），工作者进程通过
+multiprocessing.connection 连接后按需拉取组合执行（空闲即领取，天然均衡，慢机器少做）：
+
+    worker -> ("hello", host, pid)
+    worker -> ("ready",)                         协调者回复 ("item", key, attempt) 或 ("stop",)
+    worker -> ("event", event, key, attempt, step, state)
+                                                 观察者事件，协调者转给本地 observers
+    worker -> ("done", key, attempt, error)      error 为 None 表示通过
+    worker -> ("heartbeat",)                     后台线程定期发送
+
+- 工作者只传组合 id（testcase_id），用例定义由双方各自从同一份 conf 加载，避免序列化命令对象
+- 所有工作者的事件汇总到协调者的一组 observers（经 ObserverBus 按到达顺序投递）
+- 工作者断开（进程被 OOM kill）或超过 heartbeat_timeout 没有心跳：为其正在执行的组合补发
+  step_fail / testcase_fail（error 为 WorkerLost），组合重新排到队首，最多执行 max_attempts 次
+- 每次分配带 attempt 编号：超时被判丢失、但其实还活着的慢工作者之后发来的事件和结果属于过期的 attempt，
+  直接丢弃，不会与重新分配后的执行混在一起
+
+远程主机上的工作者需设置相同的 ONETEAR_AUTHKEY 环境变量：
+
+    python main.py --coordinator 0.0.0.0:7777                  # 协调者
+    python main.py --worker coordinator-host:7777              # 各主机上的工作者
+"""
+import os
+import socket
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import Client, Listener
+from core.address import authkey_from_env
+from core.context import ExecutionContext
+from core.scheduler import schedule
+from observer.base import BaseObserver
+from observer.bus import ObserverBus
+
+# 协调者检查心跳的间隔（秒）
+_POLL_INTERVAL = 1.0
+# 全部完成后等待工作者收到 stop 并断开的时间（秒）
+_STOP_GRACE = 5.0
+
+
+class WorkerLost(Exception):
+    pass
+
+
+# ---------- ctx 序列化 ----------
+def _ctx_state(ctx):
+    return {
+        "vars": dict(ctx.vars),
+        "step_index": ctx.step_index,
+        "step_id": ctx.step_id,
+        "retry_count": ctx.retry_count,
+        "phases": list(ctx.phases),
+        "last_command": ctx.last_command,
+        "error": ctx.error,
+        "event_time": ctx.event_time,
+        "event_ns": ctx.event_ns,
+    }
+
+
+def _restore_ctx(testcase, state):
+    ctx = ExecutionContext(state["vars"], testcase)
+    for key, value in state.items():
+        if key != "vars":
+            setattr(ctx, key, value)
+    return ctx
+
+
+# ---------- Coordinator ----------
+class _Worker:
+    def __init__(self, conn):
+        self.conn = conn
+        self.name = "?"
+        self.last_seen = time.monotonic()
+        self.inflight = None
+        self.attempt = None
+        self.assigned_at = None
+        # 已转发 start、尚未结束的 testcase / step 状态，工作者丢失时用于补发失败事件
+        self.testcase_state = None
+        self.step = None
+
+
+class Coordinator:
+    def __init__(self, items, observers=None, address=("127.0.0.1", 0), authkey=None,
+                 heartbeat_timeout=30.0, max_attempts=2, history=None, checkpoint=None):
+        self.items = schedule(list(items), history)
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_attempts = max_attempts
+        self.checkpoint = checkpoint
+        self.authkey = authkey or os.urandom(16).hex().encode()
+
+        self.bus = ObserverBus(observers)
+        self.results = {}
+        self._pending = deque(self.items)
+        self._by_key = {i.key: i for i in self.items}
+        self._steps = {}
+        self._attempts = {}
+        self._workers = set()
+        self._cond = threading.Condition()
+        # 事件转发与丢失补发的唯一通道：attempt 校验、工作者状态更新与 bus.notify 在同一把锁内完成，
+        # 补发的失败事件之后不会再出现旧 attempt 的事件（先于 _cond 获取，notify 阻塞时不影响分配）
+        self._dispatch = threading.Lock()
+        self._closing = False
+
+        self.listener = Listener(address, authkey=self.authkey)
+        self.address = self.listener.address
+
+    @property
+    def finished(self):
+        return len(self.results) == len(self.items)
+
+    def serve(self, procs=None):
+        """
+        接受工作者连接并分发，直到所有组合结束
+        procs：本地启动的工作者进程；它们全部退出且没有其他工作者在线时放弃等待
+        返回 {key: error}，顺序与展开顺序一致（error 为 None 表示通过）
+        """
+        threading.Thread(target=self._accept, name="coordinator-accept", daemon=True).start()
+        try:
+            with self._cond:
+                while not self.finished:
+                    self._cond.wait(_POLL_INTERVAL)
+                    if procs and not self._workers and all(p.poll() is not None for p in procs):
+                        # 本地工作者全部退出且无人在线：剩余组合判失败
+                        for item in self._pending:
+                            self.results.setdefault(item.key, "WorkerLost: no workers left")
+                        self._pending.clear()
+                # 唤醒等待领取的工作者，回复 stop 后再关闭
+                self._cond.notify_all()
+                self._cond.wait_for(lambda: not self._workers, _STOP_GRACE)
+        finally:
+            self._close()
+        return {i.key: self.results.get(i.key) for i in sorted(self.items, key=lambda i: i.index)}
+
+    def _close(self):
+        self._closing = True
+        # 用一次本地连接唤醒阻塞在 accept 上的线程
+        try:
+            Client(self.address, authkey=self.authkey).close()
+        except OSError:
+            pass
+        self.listener.close()
+        self.bus.close()
+
+    def _accept(self):
+        while not self._closing:
+            try:
+                conn = self.listener.accept()
+            except Exception:
+                # 认证失败等单个连接错误不影响协调者
+                if self._closing:
+                    return
+                continue
+            if self._closing:
+                conn.close()
+                return
+            threading.Thread(target=self._handle, args=(conn,), name="coordinator-worker",
+                             daemon=True).start()
+
+    def _handle(self, conn):
+        w = _Worker(conn)
+        with self._cond:
+            self._workers.add(w)
+        try:
+            while True:
+                if not conn.poll(_POLL_INTERVAL):
+                    if w.inflight and time.monotonic() - w.last_seen > self.heartbeat_timeout:
+                        raise WorkerLost(f"no heartbeat from worker {w.name} for {self.heartbeat_timeout}s")
+                    continue
+
+                msg = conn.recv()
+                w.last_seen = time.monotonic()
+                kind = msg[0]
+                if kind == "hello":
+                    w.name = f"{msg[1]}:{msg[2]}"
+                elif kind == "event":
+                    self._on_event(w, *msg[1:])
+                elif kind == "done":
+                    self._on_done(w, *msg[1:])
+                elif kind == "ready":
+                    item = self._next_item(w)
+                    if item is None:
+                        conn.send(("stop",))
+                        return
+                    conn.send(("item", item.key, w.attempt))
+        except WorkerLost as e:
+            self._lost(w, f"WorkerLost: {e}")
+        except (EOFError, OSError):
+            self._lost(w, f"WorkerLost: worker {w.name} disconnected")
+        finally:
+            conn.close()
+            with self._cond:
+                self._workers.discard(w)
+                self._cond.notify_all()
+
+    def _next_item(self, w):
+        with self._cond:
+            # 队列暂时为空时等待：其他工作者丢失后组合会被重新排队
+            self._cond.wait_for(lambda: self._pending or self.finished)
+            if not self._pending:
+                return None
+            item = self._pending.popleft()
+            w.inflight = item.key
+            w.assigned_at = time.monotonic()
+            w.attempt = self._attempts[item.key] = self._attempts.get(item.key, 0) + 1
+            return item
+
+    def _current(self, w, key, attempt):
+        # 调用方持有 self._cond；只接受该组合最近一次分配给 w 的 attempt
+        return (w.inflight == key and w.attempt == attempt
+                and self._attempts.get(key) == attempt and key not in self.results)
+
+    def _on_done(self, w, key, attempt, error):
+        with self._cond:
+            if not self._current(w, key, attempt):
+                return
+            w.inflight = w.attempt = None
+            w.testcase_state = w.step = None
+            self.results[key] = error
+            self._cond.notify_all()
+        self._record(key, error, time.monotonic() - w.assigned_at)
+
+    def _record(self, key, error, duration=None):
+        if self.checkpoint is not None:
+            self.checkpoint.record(key, "failed" if error else "passed", duration, error)
+
+    def _on_event(self, w, event, key, attempt, step_name, state):
+        item = self._by_key.get(key)
+        if item is None:
+            return
+        testcase = item.testcase
+        with self._dispatch:
+            with self._cond:
+                if not self._current(w, key, attempt):
+                    return
+                if event.startswith("testcase_"):
+                    w.testcase_state = state if event == "testcase_start" else None
+                else:
+                    w.step = (step_name, state) if event in ("step_start", "step_retry") else None
+
+            ctx = _restore_ctx(testcase, state)
+            if event.startswith("testcase_"):
+                self.bus.notify(event, testcase, ctx)
+            else:
+                self.bus.notify(event, self._step(testcase, step_name), ctx)
+
+    def _step(self, testcase, name):
+        steps = self._steps.get(testcase.name)
+        if steps is None:
+            steps = self._steps[testcase.name] = {s.name: s for s in testcase.steps}
+        return steps[name]
+
+    def _lost(self, w, error):
+        with self._dispatch:
+            with self._cond:
+                key, w.inflight, w.attempt = w.inflight, None, None
+                if key is None or key in self.results:
+                    return
+                item = self._by_key[key]
+                testcase_state, step = w.testcase_state, w.step
+                w.testcase_state = w.step = None
+
+            # 补发结束事件，保证 observers 看到的 start / end 成对；
+            # 补发完再重新排队 / 记录结果，新 attempt 的事件一定在这之后，协调者也不会先于补发关闭 bus
+            if step is not None:
+                ctx = _restore_ctx(item.testcase, dict(step[1], error=error, event_time=None, event_ns=None))
+                self.bus.notify("step_fail", self._step(item.testcase, step[0]), ctx)
+            if testcase_state is not None:
+                ctx = _restore_ctx(item.testcase, dict(testcase_state, error=error, event_time=None, event_ns=None))
+                self.bus.notify("testcase_fail", item.testcase, ctx)
+
+            with self._cond:
+                requeue = self._attempts.get(key, 0) < self.max_attempts
+                if requeue:
+                    self._pending.appendleft(item)
+                else:
+                    self.results[key] = error
+                self._cond.notify_all()
+        if not requeue:
+            self._record(key, error)
+
+
+# ---------- Worker ----------
+class _ForwardObserver(BaseObserver):
+    """工作者侧观察者：把事件（ctx 快照）发回协调者"""
+
+    def __init__(self, send):
+        self.send = send
+        # 当前执行的分配编号（协调者据此丢弃过期 attempt 的事件）
+        self.attempt = None
+
+    def testcase_start(self, testcase, ctx):
+        self._forward("testcase_start", None, ctx)
+
+    def testcase_end(self, testcase, ctx):
+        self._forward("testcase_end", None, ctx)
+
+    def testcase_fail(self, testcase, ctx):
+        self._forward("testcase_fail", None, ctx)
+
+    def step_start(self, step, ctx):
+        self._forward("step_start", step.name, ctx)
+
+    def step_end(self, step, ctx):
+        self._forward("step_end", step.name, ctx)
+
+    def step_fail(self, step, ctx):
+        self._forward("step_fail", step.name, ctx)
+
+    def step_retry(self, step, ctx):
+        self._forward("step_retry", step.name, ctx)
+
+    def _forward(self, event, step_name, ctx):
+        self.send(("event", event, ctx.testcase_id, self.attempt, step_name, _ctx_state(ctx)))
+
+
+def run_worker(address, items, make_engine, authkey=None, heartbeat_interval=5.0):
+    """
+    连接协调者并循环领取组合执行，直到收到 stop
+    items：本地加载的 WorkItem（按 key 查找）；make_engine(observers) 返回执行引擎
+    """
+    conn = Client(address, authkey=authkey or authkey_from_env())
+    lock = threading.Lock()
+
+    def send(msg):
+        with lock:
+            conn.send(msg)
+
+    stopped = threading.Event()
+
+    def heartbeat():
+        while not stopped.wait(heartbeat_interval):
+            try:
+                send(("heartbeat",))
+            except OSError:
+                return
+
+    by_key = {i.key: i for i in items}
+    forward = _ForwardObserver(send)
+    engine = make_engine([forward])
+    threading.Thread(target=heartbeat, name="worker-heartbeat", daemon=True).start()
+    try:
+        send(("hello", socket.gethostname(), os.getpid()))
+        while True:
+            send(("ready",))
+            try:
+                msg = conn.recv()
+            except EOFError:
+                # 协调者已结束
+                return
+            if msg[0] == "stop":
+                return
+            key, attempt = msg[1], msg[2]
+            item = by_key.get(key)
+            if item is None:
+                send(("done", key, attempt, f"ValueError: unknown work item {key} on this worker"))
+                continue
+            forward.attempt = attempt
+            try:
+                engine.run_item(item)
+                error = None
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            # 先把本组合的事件送完，再报告完成
+            engine.bus.flush()
+            send(("done", key, attempt, error))
+    finally:
+        stopped.set()
+        engine.close()
+        conn.close()
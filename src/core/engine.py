@@ -1,55 +1,369 @@
 import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from core.context import ExecutionContext
+from core.scheduler import expand_suite, schedule
+from core.shared_hooks import SharedHooks
 from command.shell import ShellCommand
+from command.session import SessionPool
+from command.cache import policy_of
+from observer.bus import ObserverBus
+
+def _error_text(e):
+    return f"{type(e).__name__}: {e}"
+
 
 class ExecutionEngine:
-    def __init__(self, cmd_registry, observers=None):
+    def __init__(self, cmd_registry, observers=None, max_workers=1, step_workers=1,
+                 shell_session=None, observer_overflow="block", checkpoint=None, cache=None):
+        """
+        cmd_registry: 命令注册表
+        observers:    观察者列表（Logger / Allure / ...）
+        max_workers:  matrix 组合的并发度
+                      - 1：串行执行（默认，首个失败立即抛出）
+                      - >1：线程池并发执行各组合，每个组合独立 ExecutionContext
+        step_workers: DAG 模式下单个组合内 step 的默认并发度（testcase.parallelism 优先）
+        shell_session: 常驻 shell 会话（可选，默认每条命令 fork 一个 /bin/sh）
+                      - "testcase"：每个 matrix 组合一个会话，组合结束时关闭
+                      - "node"：按 ctx.vars["node"] 共享会话（没有 node 变量时退化为 testcase），
+                        engine.close() 时关闭
+        observer_overflow: 观察者事件队列满时的策略（"block" / "drop"，见 observer.bus）
+        checkpoint:   CheckpointJournal（可选），每个组合结束时记录结果，供 --resume 跳过
+        cache:        ResultCache（可选），缓存 cacheable 只读命令的结果（见 command.cache）
+        """
         self.cmd_registry = cmd_registry
         self.observers = observers or []
+        # 观察者在后台线程按序投递，不占用 step 执行时间
+        self.bus = ObserverBus(self.observers, overflow=observer_overflow)
+        self.max_workers = max_workers
+        self.step_workers = step_workers
+        self.shell_session = shell_session
+        self.sessions = SessionPool() if shell_session else None
+        self.checkpoint = checkpoint
+        self.cache = cache
+        # hook -> ShellCommand，避免每个组合重复构造
+        self._hook_cmds = {}
+        # testcase / run 作用域 before hook 的去重与引用计数（见 core.shared_hooks）
+        self.shared_hooks = SharedHooks()
+
+    def close(self):
+        """释放 engine 持有的资源（未到期的共享 hook teardown、观察者事件队列、常驻 shell 会话）"""
+        try:
+            self._run_teardowns([
+                (command, text, ExecutionContext(vars, testcase))
+                for command, text, testcase, vars in self.shared_hooks.leftovers()
+            ])
+        finally:
+            self.bus.close()
+            if self.sessions is not None:
+                self.sessions.close_all()
 
     def notify(self, event, *args):
-        for obs in self.observers:
-            fn = getattr(obs, event, None)
-            if fn:
-                fn(*args)
+        # 最后一个参数是 ctx：step 事件的通知耗时（入队 + 同步观察者）记为 observe 阶段
+        start = time.time_ns()
+        self.bus.notify(event, *args)
+        if event.startswith("step_"):
+            args[-1].phases.append(("observe", start, time.time_ns(), {"event": event}))
 
     def run(self, testcase):
-        for vars in testcase.expand():
-            ctx = ExecutionContext(vars,testcase)
-            self.notify("testcase_start", testcase, ctx)
-            try:
-                self._run_hooks(testcase.hooks.before, ctx)
+        """
+        执行 testcase 的所有 matrix 组合
+
+        返回每个组合的 ExecutionContext，顺序与 testcase.expand() 一致（与并发完成顺序无关）
+        并发模式下会等待所有组合结束，再按展开顺序抛出第一个失败
+        """
+        combos = list(testcase.expand())
+        self._plan_hooks(expand_suite([testcase]))
+
+        if self.max_workers <= 1 or len(combos) <= 1:
+            return [self._run_combo(testcase, vars) for vars in combos]
+
+        # 组合之间互不共享 context；shell 执行主要耗时在子进程，线程池即可
+        workers = min(self.max_workers, len(combos))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="combo") as pool:
+            futures = [pool.submit(self._run_combo, testcase, vars) for vars in combos]
+
+        return [f.result() for f in futures]
+
+    def run_suite(self, testcases, history=None):
+        """
+        跨 testcase 统一调度：展开所有组合后按历史耗时从长到短提交（见 core.scheduler），
+        线程池空闲 worker 总是领取剩余最长的组合
+
+        返回每个组合的 ExecutionContext，顺序与展开顺序一致
+        串行模式下首个失败立即抛出；并发模式下等待全部结束，再按展开顺序抛出第一个失败
+        """
+        return self.run_items(expand_suite(testcases), history)
+
+    def run_items(self, items, history=None):
+        """同 run_suite，执行已展开（可能已分片）的 WorkItem 列表"""
+        items = schedule(items, history)
+        self._plan_hooks(items)
+
+        if self.max_workers <= 1 or len(items) <= 1:
+            done = {item.index: self.run_item(item) for item in items}
+            return [done[i] for i in sorted(done)]
+
+        workers = min(self.max_workers, len(items))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="combo") as pool:
+            futures = {item.index: pool.submit(self.run_item, item) for item in items}
+
+        return [futures[i].result() for i in sorted(futures)]
+
+    def run_item(self, item):
+        """执行单个 WorkItem（一个 matrix 组合），供 pytest 等外部调度逐个调用"""
+        return self._run_combo(item.testcase, item.vars)
+
+    def _run_combo(self, testcase, vars):
+        ctx = ExecutionContext(vars, testcase)
+        started = time.monotonic()
+        # 本组合已 setup、待 teardown 的 combo 作用域 hook：[(command, teardown 文本)]
+        held = []
+        self.notify("testcase_start", testcase, ctx)
+        try:
+            self._setup_hooks(testcase.hooks.before, ctx, held)
+            self._run_steps(testcase, ctx)
+            self._run_hooks(testcase.hooks.after, ctx)
+            self._teardown_hooks(ctx, held)
+            self.notify("testcase_end", testcase, ctx)
+            self._record(ctx, "passed", started)
+        except Exception as e:
+            ctx.error = _error_text(e)
+            self._run_hooks(testcase.hooks.on_fail, ctx)
+            self._teardown_hooks(ctx, held)
+            self.notify("testcase_fail", testcase, ctx)
+            self._record(ctx, "failed", started)
+            raise
+        finally:
+            self._close_testcase_session(ctx)
+            if self.cache is not None:
+                self.cache.forget(ctx)
+            # 组合结束时等观察者处理完本组合的事件（日志 / 报告完整落盘）
+            self.bus.flush()
+        return ctx
+
+    def _record(self, ctx, status, started):
+        if self.checkpoint is not None:
+            self.checkpoint.record(ctx.testcase_id, status, time.monotonic() - started, ctx.error)
+
+    def _run_steps(self, testcase, ctx):
+        dag = testcase.dag
+        limit = testcase.parallelism or self.step_workers
+
+        if not dag.concurrent or limit <= 1:
+            for i in dag.order:
+                step = dag.steps[i]
+                ctx.next_step(step.name)
+                self._run_step(step, ctx)
+            return
+
+        self._run_dag(dag, ctx, limit)
+
+    def _run_dag(self, dag, ctx, limit):
+        """
+        按依赖关系调度 step：
+        - 依赖全部成功的 step 进入 ready 队列（按声明顺序，保证确定性）
+        - 同时运行的 step 不超过 limit
+        - 任一 step 失败后不再派发新 step，等待在途 step 结束后抛出首个失败
+        """
+        remaining = [len(d) for d in dag.deps]
+        ready = [i for i, n in enumerate(remaining) if n == 0]
+        running = {}
+        error = None
+
+        with ThreadPoolExecutor(max_workers=limit, thread_name_prefix="step") as pool:
+            while ready or running:
+                while ready and error is None and len(running) < limit:
+                    i = ready.pop(0)
+                    step = dag.steps[i]
+                    running[pool.submit(self._run_forked_step, step, ctx)] = i
 
-                for step in testcase.steps:
-                    self._run_step(step, ctx)
+                if not running:
+                    break
 
-                self._run_hooks(testcase.hooks.after, ctx)
-                self.notify("testcase_end", testcase, ctx)
-            except Exception:
-                self._run_hooks(testcase.hooks.on_fail, ctx)
-                self.notify("testcase_fail", testcase, ctx)
-                raise
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for f in sorted(done, key=running.get):
+                    i = running.pop(f)
+                    exc = f.exception()
+                    if exc is not None:
+                        error = error or exc
+                        continue
+                    for child in dag.children[i]:
+                        remaining[child] -= 1
+                        if remaining[child] == 0:
+                            ready.append(child)
+                ready.sort()
+
+        if error is not None:
+            raise error
+
+    def _run_forked_step(self, step, ctx):
+        step_ctx = ctx.fork(step.name)
+        try:
+            self._run_step(step, step_ctx)
+        finally:
+            ctx.merge(step_ctx)
 
     def _run_step(self, step, ctx):
-        ctx.next_step(step.name)
         self.notify("step_start", step, ctx)
         try:
-            cmd_str = step.command.build("do", ctx.vars)
-            result = step.command.run(cmd_str)
-            ctx.update(result)
+            result = self._execute_with_retry(step, ctx)
 
             if step.asserter:
-                step.asserter.render(ctx.vars).assert_result(result)
+                # eventually 断言失败时用 redo 模板重新执行命令，拿新结果再判断
+                with ctx.phase("assert"):
+                    result = step.asserter.render(ctx.vars).assert_result(
+                        result, rerun=lambda: self._execute(step.command, "redo", ctx, step.timeout)
+                    )
+                ctx.update(result)
 
             self.notify("step_end", step, ctx)
 
         except Exception as e:
-            undo_cmd = step.command.build("undo", ctx.vars)
-            step.command.run(undo_cmd)
+            ctx.error = _error_text(e)
+            self._execute(step.command, "undo", ctx, step.timeout)
             self.notify("step_fail", step, ctx)
             raise e
 
+    def _execute_with_retry(self, step, ctx):
+        """
+        执行 step 命令，按 step.retries / retry_on 用 redo 模板重试
+        每次重试前通知 step_retry（此时 ctx 中是失败那次的结果）
+        重试耗尽后仍超时则抛 TimeoutError
+        """
+        result = self._execute(step.command, "do", ctx, step.timeout)
+        ctx.update(result)
+
+        attempt = 0
+        while attempt < step.retries and step.should_retry(result):
+            attempt += 1
+            ctx.retry_count = attempt
+            self.notify("step_retry", step, ctx)
+            if step.retry_delay:
+                time.sleep(step.retry_delay)
+            result = self._execute(step.command, "redo", ctx, step.timeout)
+            ctx.update(result)
+
+        if result.get("timed_out"):
+            raise TimeoutError(f"{ctx.step_id} timed out after {step.timeout}s")
+        return result
+
+    def _execute(self, command, action, ctx, timeout=None):
+        with ctx.phase("render", action=action):
+            cmd_str = command.build(action, ctx.vars)
+        return self._run_rendered(command, action, cmd_str, ctx, timeout)
+
+    def _run_rendered(self, command, action, cmd_str, ctx, timeout=None):
+        ctx.last_command = cmd_str
+        cached = self._cache_lookup(command, action, cmd_str, ctx)
+        if cached is not None:
+            return cached
+
+        result = None
+        try:
+            with ctx.phase("execute", action=action):
+                session = self._session_for(command, ctx)
+                if session is not None:
+                    result = session.run(cmd_str, timeout=timeout)
+                else:
+                    result = command.run(cmd_str, ctx.vars, timeout=timeout)
+            return result
+        finally:
+            if self.cache is not None:
+                self.cache.after_execute(command, action, cmd_str, ctx, result)
+
+    def _cache_lookup(self, command, action, cmd_str, ctx):
+        if self.cache is None or not policy_of(command).cacheable:
+            return None
+        with ctx.phase("cache", action=action):
+            return self.cache.lookup(command, action, cmd_str, ctx)
+
     def _run_hooks(self, hooks, ctx):
         for h in hooks:
-            cmd = ShellCommand("hook", h).build("do", ctx.vars)
-            ShellCommand("hook", h).run(cmd)
+            self._execute(self._hook_command(h), "do", ctx)
+
+    def _hook_command(self, hook):
+        policy = hook.cache_policy
+        key = (hook.cmd, hook.teardown, hook.shared, policy.effect, policy.effect_scope)
+        cmd = self._hook_cmds.get(key)
+        if cmd is None:
+            # 共享 hook 的副作用属于整个运行，不进入某个组合的常驻会话
+            cmd = self._hook_cmds[key] = ShellCommand("hook", hook.cmd, undo_cmd=hook.teardown,
+                                                      session=not hook.shared)
+            cmd.cache_policy = policy
+        return cmd
+
+    # ---------- before hook setup / teardown ----------
+    def _plan_hooks(self, items):
+        """登记每个组合将使用的共享 hook，最后一个使用者结束时 teardown"""
+        for item in items:
+            keys = []
+            for hook in item.testcase.hooks.before:
+                if not hook.shared:
+                    continue
+                try:
+                    text = self._hook_command(hook).build("do", item.vars)
+                except Exception:
+                    # 渲染失败的组合运行时直接失败，不会使用该 hook
+                    continue
+                keys.append(self.shared_hooks.key(hook, item.testcase, text))
+            if keys:
+                self.shared_hooks.plan(item.key, keys)
+
+    def _setup_hooks(self, hooks, ctx, held):
+        for hook in hooks:
+            command = self._hook_command(hook)
+            if not hook.shared:
+                self._execute(command, "do", ctx)
+                if hook.teardown:
+                    held.append((command, command.build("undo", ctx.vars)))
+                continue
+
+            with ctx.phase("render", action="do"):
+                text = command.build("do", ctx.vars)
+            self.shared_hooks.acquire(
+                self.shared_hooks.key(hook, ctx.testcase, text),
+                lambda: self._setup_shared(command, text, ctx),
+            )
+
+    def _setup_shared(self, command, text, ctx):
+        self._run_rendered(command, "do", text, ctx)
+        return command, command.build("undo", ctx.vars), ctx.testcase, dict(ctx.vars)
+
+    def _teardown_hooks(self, ctx, held):
+        """
+        逆序执行本组合的 teardown，再释放共享 hook（最后一个使用者负责其 teardown）
+        全部执行完后抛出第一个失败；重复调用时不会重复 teardown
+        """
+        due = [held.pop() for _ in range(len(held))] + self.shared_hooks.release(ctx.testcase_id)
+        self._run_teardowns([(command, text, ctx) for command, text in due])
+
+    def _run_teardowns(self, teardowns):
+        error = None
+        for command, text, ctx in teardowns:
+            try:
+                self._run_rendered(command, "undo", text, ctx)
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+
+    # ---------- shell session ----------
+    def _session_for(self, command, ctx):
+        """
+        命令是否走常驻会话：需开启 shell_session，且是未关闭 session、
+        未启用流式捕获（会话模式不支持落盘）的 ShellCommand
+        """
+        if self.sessions is None or not isinstance(command, ShellCommand):
+            return None
+        if not command.use_session or command.capture is not None:
+            return None
+        return self.sessions.get(self._session_key(ctx))
+
+    def _session_key(self, ctx):
+        if self.shell_session == "node" and "node" in ctx.vars:
+            return f"node:{ctx.vars['node']}"
+        return ctx.testcase_id
+
+    def _close_testcase_session(self, ctx):
+        if self.sessions is not None and self._session_key(ctx) == ctx.testcase_id:
+            self.sessions.close(ctx.testcase_id)
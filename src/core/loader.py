@@ -1,33 +1,62 @@
-import yaml
 from pathlib import Path
+from core.yaml_files import yaml_files
 from domain.step import Step
 from domain.testcase import TestCase
 from domain.hooks import Hooks
 from assertor.registry import build_asserter
 
-def load_testcases(path: str, cmd_registry):
+def load_testcases(path: str, cmd_registry, errors=None):
+    """
+    加载目录下所有 testcase yaml（cmd_ref / 断言 / DAG / matrix 配置在此校验）
+
+    errors: 传入列表时不在第一个错误处抛出，而是把出错文件记为
+            {"file": 路径, "error": 说明} 并跳过该文件（--plan 一次报告全部问题）
+    """
     cases = []
 
-    for file in Path(path).glob("*.yaml"):
-        with open(file) as f:
-            conf = yaml.safe_load(f)
+    files = list(Path(path).glob("*.yaml"))
+    for file, conf in zip(files, yaml_files.load_many(files, return_errors=True)):
+        try:
+            if isinstance(conf, ValueError):
+                # YAML 语法错误（见 yaml_files.load_many）
+                raise conf
+            cases.append(_build_testcase(conf, cmd_registry))
+        except (ValueError, KeyError, TypeError) as e:
+            if errors is None:
+                raise ValueError(f"{file}: {e}") from e
+            errors.append({"file": str(file), "error": f"{type(e).__name__}: {e}"})
 
-        steps = []
-        for s in conf["steps"]:
-            cmd_def = cmd_registry.get(s["cmd_ref"])
-            asserter = build_asserter(s["expect"]) if "expect" in s else None
-            steps.append(Step(s["name"], cmd_def, asserter))
+    return cases
 
-        hooks = Hooks(**conf.get("hooks", {}))
 
-        cases.append(
-            TestCase(
-                name=conf["name"],
-                matrix=conf.get("matrix", {}),
-                context=conf.get("context", {}),
-                steps=steps,
-                hooks=hooks,
-            )
-        )
+def _build_testcase(conf, cmd_registry):
+    steps = []
+    for s in conf["steps"]:
+        try:
+            cmd_def = cmd_registry.get(s["cmd_ref"])
+        except KeyError:
+            raise ValueError(f"step '{s['name']}' references unknown cmd_ref '{s['cmd_ref']}'") from None
+        asserter = build_asserter(s["expect"]) if "expect" in s else None
+        steps.append(Step(
+            s["name"], cmd_def, asserter,
+            depends_on=s.get("depends_on"),
+            timeout=s.get("timeout"),
+            retries=s.get("retries", 0),
+            retry_on=s.get("retry_on"),
+            retry_delay=s.get("retry_delay", 0),
+        ))
 
-    return cases
+    hooks = Hooks(**conf.get("hooks", {}))
+    return TestCase(
+        name=conf["name"],
+        matrix=conf.get("matrix", {}),
+        context=conf.get("context", {}),
+        steps=steps,
+        hooks=hooks,
+        parallelism=conf.get("parallelism"),
+        matrix_strategy=conf.get("matrix_strategy", "full"),
+        matrix_strength=conf.get("matrix_strength", 2),
+        matrix_seed=conf.get("matrix_seed", 0),
+        exclude=conf.get("exclude"),
+        include=conf.get("include"),
+    )
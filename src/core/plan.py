@@ -0,0 +1,190 @@
+# core/plan.py
+"""
+Dry-run 计划：执行前渲染并校验整个展开后的套件
+
+对每个 (testcase, matrix 组合)：
+- 渲染 before / after / on_fail hook 及 teardown
+- 渲染每个 step 的 do / redo / undo 命令和断言
+- 模板错误（StrictUndefined 缺变量、语法错误）按组合逐条记录，不在第一个错误处停止
+
+cmd_ref、断言配置、DAG（重名 / 未知依赖 / 环）在加载阶段校验（见 core.loader 的 errors 参数），
+与渲染错误一起汇总到计划里
+
+渲染时模拟引擎的变量可见性：before hook 和 DAG 根 step 的 do 看不到上一步结果；
+on_fail hook 在 before hook 或第一个 step 失败时也会执行，同样按看不到上一步结果渲染；
+其余模板可以引用 last_stdout / last_stderr / last_returncode / last_stdout_file（用占位值渲染）
+
+组合多时按批分给进程池渲染：fork 出的子进程直接继承已加载的套件，
+其他启动方式下由子进程按相同目录重新加载（命令对象持有编译好的模板，无法跨进程传递）
+"""
+import os
+from core.template import compile_template
+
+# ctx.update 写入的运行时变量（见 ExecutionContext.update）
+_RUNTIME_VARS = {
+    "last_stdout": "",
+    "last_stderr": "",
+    "last_returncode": 0,
+    "last_stdout_file": None,
+}
+
+# 子进程中的 {组合 id: WorkItem}
+_ITEMS = None
+
+
+def render_item(item):
+    """渲染一个组合，返回 (计划条目, 错误列表)"""
+    tc = item.testcase
+    before = dict(item.vars)
+    after = dict(item.vars, **_RUNTIME_VARS)
+    errors = []
+
+    def render(where, fn, vars):
+        try:
+            return fn(vars)
+        except Exception as e:
+            errors.append({"key": item.key, "where": where, "error": f"{type(e).__name__}: {e}"})
+            return None
+
+    def template(source):
+        return lambda vars: compile_template(source).render(**vars) if source else ""
+
+    hooks = {
+        "before": [
+            {
+                "cmd": render(f"hooks.before[{i}]", template(h.cmd), before),
+                "scope": h.scope,
+                "teardown": render(f"hooks.before[{i}].teardown", template(h.teardown), before),
+            }
+            for i, h in enumerate(tc.hooks.before)
+        ],
+        "after": [render(f"hooks.after[{i}]", template(h.cmd), after) for i, h in enumerate(tc.hooks.after)],
+        "on_fail": [render(f"hooks.on_fail[{i}]", template(h.cmd), before) for i, h in enumerate(tc.hooks.on_fail)],
+    }
+
+    steps = []
+    for i in tc.dag.order:
+        step = tc.dag.steps[i]
+        do_vars = after if tc.dag.deps[i] else before
+        entry = {"name": step.name, "command": step.command.name}
+        entry["do"] = render(f"step '{step.name}' do", lambda v: step.command.build("do", v), do_vars)
+        for action in ("redo", "undo"):
+            entry[action] = render(f"step '{step.name}' {action}",
+                                   lambda v, a=action: step.command.build(a, v), after)
+        if step.asserter is not None:
+            asserter = render(f"step '{step.name}' expect", step.asserter.render, after)
+            entry["expect"] = None if asserter is None else _describe(asserter)
+        steps.append(entry)
+
+    plan = {"key": item.key, "testcase": tc.name, "vars": _jsonable(item.vars),
+            "hooks": hooks, "steps": steps}
+    return plan, errors
+
+
+def _describe(asserter):
+    describe = getattr(asserter, "describe", None)
+    if describe is not None:
+        return describe()
+    return {"type": type(asserter).__name__, "text": getattr(asserter, "text", None)}
+
+
+def _jsonable(vars):
+    return {k: v if isinstance(v, (str, int, float, bool, type(None), list, dict)) else repr(v)
+            for k, v in vars.items()}
+
+
+# ---------- 进程池 ----------
+def load_suite(command_dir, testcase_dir):
+    """子进程重新加载套件用（配合 functools.partial 传给 build_plan）"""
+    from command.registry import CommandRegistry
+    from core.loader import load_testcases
+    from core.scheduler import expand_suite
+
+    cmds = CommandRegistry()
+    cmds.load_dir(command_dir)
+    return expand_suite(load_testcases(testcase_dir, cmds, errors=[]))
+
+
+def _init_worker(load):
+    global _ITEMS
+    if _ITEMS is None:
+        # 非 fork 启动：子进程自行加载同一份套件
+        _ITEMS = {item.key: item for item in load()}
+
+
+def _render_batch(keys):
+    return [render_item(_ITEMS[key]) for key in keys]
+
+
+def build_plan(items, load_errors=(), workers=None, batch_size=200, load=None):
+    """
+    items:       展开后的 WorkItem 列表
+    load_errors: 加载阶段收集的错误（core.loader 的 errors）
+    workers:     渲染进程数（None 为 CPU 数，1 为当前进程串行渲染）
+    load:        子进程重新加载套件的函数（可 pickle 的模块级函数，返回 WorkItem 列表）；
+                 为 None 时只在当前进程渲染
+    """
+    global _ITEMS
+    items = list(items)
+    workers = workers or os.cpu_count() or 1
+    batches = [[i.key for i in items[n:n + batch_size]] for n in range(0, len(items), batch_size)]
+
+    if workers <= 1 or len(batches) <= 1 or load is None:
+        results = [render_item(item) for item in items]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        # fork 的子进程继承 _ITEMS，无需重新加载
+        _ITEMS = {item.key: item for item in items}
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(batches)),
+                                     initializer=_init_worker, initargs=(load,)) as pool:
+                results = [r for batch in pool.map(_render_batch, batches) for r in batch]
+        finally:
+            _ITEMS = None
+
+    combos = [plan for plan, _ in results]
+    errors = list(load_errors) + [e for _, errs in results for e in errs]
+    return {
+        "counts": _counts(items, combos, load_errors, errors),
+        "error_summary": summarize_errors(errors),
+        "errors": errors,
+        "combos": combos,
+    }
+
+
+def summarize_errors(errors):
+    """同一 testcase、同一位置、同一原因的渲染错误合并为一条（附组合数与一个示例组合）"""
+    summary = {}
+    for e in errors:
+        if "key" not in e:
+            summary[(e["file"], e["error"])] = dict(e)
+            continue
+        testcase = e["key"].split("[", 1)[0]
+        s = summary.setdefault((testcase, e["where"], e["error"]), {
+            "testcase": testcase, "where": e["where"], "error": e["error"], "combos": 0, "example": e["key"],
+        })
+        s["combos"] += 1
+    return list(summary.values())
+
+
+def _counts(items, combos, load_errors, errors):
+    testcases = {i.testcase.name for i in items}
+    rendered = 0
+    for c in combos:
+        templates = [h["cmd"] for h in c["hooks"]["before"]] + [h["teardown"] for h in c["hooks"]["before"]]
+        templates += c["hooks"]["after"] + c["hooks"]["on_fail"]
+        for s in c["steps"]:
+            templates += [s["do"], s["redo"], s["undo"]]
+        rendered += sum(1 for t in templates if t)
+    return {
+        "testcases": len(testcases),
+        "combos": len(combos),
+        "steps": sum(len(c["steps"]) for c in combos),
+        "hooks": sum(len(c["hooks"]["before"]) + len(c["hooks"]["after"]) + len(c["hooks"]["on_fail"])
+                     for c in combos),
+        "assertions": sum(1 for c in combos for s in c["steps"] if "expect" in s),
+        "rendered_commands": rendered,
+        "load_errors": len(load_errors),
+        "errors": len(errors),
+        "failed_combos": len({e["key"] for e in errors if "key" in e}),
+    }
@@ -0,0 +1,52 @@
+# core/plugins.py
+"""
+按名称延迟加载的插件注册表
+
+命令类型、SQL 数据库、观察者都以 "模块路径:属性名" 登记，第一次 get() 时才 import：
+只跑 shell 用例的进程不会加载 psycopg2 / allure / prometheus_client 等重依赖，
+短生命周期的 runner 进程（CI 分片、分布式工作者）启动更快
+
+    COMMAND_TYPES.register("mysql", "my_plugins.mysql:MySQLCommand")
+    COMMAND_TYPES.get("mysql")   # -> MySQLCommand 类
+"""
+import importlib
+import threading
+
+
+class PluginRegistry:
+    def __init__(self, kind, plugins=None):
+        """
+        kind:    插件类别，用于错误信息（"command type" / "observer" ...）
+        plugins: {名称: "模块路径:属性名" 或已加载的对象}
+        """
+        self.kind = kind
+        self._targets = dict(plugins or {})
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, target):
+        """target 为 "模块路径:属性名"（延迟加载）或对象本身；同名覆盖"""
+        with self._lock:
+            self._targets[name] = target
+            self._loaded.pop(name, None)
+
+    def names(self):
+        return sorted(self._targets)
+
+    def get(self, name):
+        loaded = self._loaded.get(name)
+        if loaded is not None:
+            return loaded
+
+        with self._lock:
+            if name not in self._targets:
+                raise ValueError(f"unsupported {self.kind}: {name} (expected one of {self.names()})")
+            target = self._targets[name]
+            if isinstance(target, str):
+                module, _, attr = target.partition(":")
+                target = getattr(importlib.import_module(module), attr)
+            self._loaded[name] = target
+            return target
+
+    def create(self, name, *args, **kwargs):
+        return self.get(name)(*args, **kwargs)
@@ -0,0 +1,82 @@
+# core/scheduler.py
+"""
+按历史耗时调度 matrix 组合
+
+所有 testcase 的组合先展开成一个 WorkItem 列表（跨 testcase），再按预估耗时从长到短排序后
+依次交给线程池：空闲 worker 总是领取剩余最长的组合（LPT，longest processing time first），
+避免最长的 failover 用例最后才开始、独自拖长整体耗时
+
+预估耗时来自结果库（observer.results）中该组合最近几次运行的中位数；
+没有记录的组合依次退化为：同名 testcase 的中位数 → 全部已知组合的中位数 → default
+"""
+import statistics
+from pathlib import Path
+from core.context import build_testcase_id
+
+
+class WorkItem:
+    """一个待执行的 (testcase, matrix 组合)；index 为展开顺序"""
+
+    __slots__ = ("testcase", "vars", "key", "index", "estimate")
+
+    def __init__(self, testcase, vars, index):
+        self.testcase = testcase
+        self.vars = vars
+        self.key = build_testcase_id(testcase, vars)
+        self.index = index
+        self.estimate = None
+
+    def __repr__(self):
+        return f"WorkItem({self.key!r}, estimate={self.estimate})"
+
+
+def expand_suite(testcases):
+    """按加载顺序展开所有 testcase 的组合"""
+    items = []
+    for tc in testcases:
+        for vars in tc.expand():
+            items.append(WorkItem(tc, vars, len(items)))
+    return items
+
+
+class DurationHistory:
+    def __init__(self, durations=None, default=0.0):
+        """
+        durations: [(testcase 名称, testcase_id, 秒)]
+        default:   完全没有历史时的预估值
+        """
+        by_id, by_name = {}, {}
+        for name, key, seconds in durations or []:
+            by_id.setdefault(key, []).append(seconds)
+            by_name.setdefault(name, []).append(seconds)
+
+        self._by_id = {k: statistics.median(v) for k, v in by_id.items()}
+        self._by_name = {k: statistics.median(v) for k, v in by_name.items()}
+        self.default = statistics.median(self._by_id.values()) if self._by_id else default
+
+    @classmethod
+    def from_db(cls, path, per_case=10, default=0.0):
+        """从结果库读取；库文件不存在时返回空历史"""
+        if not path or not Path(path).exists():
+            return cls(default=default)
+
+        from observer.results import ResultStore
+        store = ResultStore(path)
+        try:
+            rows = store.recent_durations(per_case)
+        finally:
+            store.close()
+        return cls([(r["testcase"], r["testcase_id"], r["duration"]) for r in rows], default)
+
+    def estimate(self, item):
+        if item.key in self._by_id:
+            return self._by_id[item.key]
+        return self._by_name.get(item.testcase.name, self.default)
+
+
+def schedule(items, history=None):
+    """按预估耗时降序排列（稳定排序：耗时相同保持展开顺序）"""
+    history = history or DurationHistory()
+    for item in items:
+        item.estimate = history.estimate(item)
+    return sorted(items, key=lambda i: -i.estimate)
@@ -0,0 +1,57 @@
+# core/shard.py
+"""
+把展开后的 (testcase, matrix 组合) 列表确定性地切分为 n 片，多个进程 / CI 机器各跑一片，无需协调
+
+- hash：     按组合 id（testcase_id）的 sha1 取模，与机器、PYTHONHASHSEED、加载顺序无关；
+             新增 / 删除组合只影响该组合本身的归属
+- duration： 按历史耗时做 LPT 贪心装箱（长的先放，每次放进当前总耗时最小的分片），各片耗时更均衡；
+             所有分片必须读取同一份结果库，否则切分结果不一致
+
+分片编号从 1 开始：--shard 1/4 ... --shard 4/4
+"""
+import hashlib
+from core.scheduler import DurationHistory
+
+MODES = ("hash", "duration")
+
+
+def parse_shard(spec: str):
+    """'i/n' -> (i, n)"""
+    try:
+        index, count = (int(x) for x in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"invalid shard spec: {spec!r} (expected i/n, e.g. 1/4)") from None
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"invalid shard spec: {spec!r} (need 1 <= i <= n)")
+    return index, count
+
+
+def shard_items(items, index, count, mode="hash", history=None):
+    """返回第 index 片（1-based）的 WorkItem，保持展开顺序"""
+    if mode not in MODES:
+        raise ValueError(f"unknown shard mode: {mode} (expected one of {MODES})")
+    if count == 1:
+        return list(items)
+
+    if mode == "hash":
+        return [item for item in items if _bucket(item.key, count) == index - 1]
+
+    history = history or DurationHistory()
+    # 耗时相同按组合 id 排序，保证各机器得到同样的装箱结果
+    ordered = sorted(items, key=lambda i: (-history.estimate(i), i.key))
+    loads = [0.0] * count
+    # 没有历史时预估全为 0，按组合个数均分
+    sizes = [0] * count
+    picked = []
+    for item in ordered:
+        target = min(range(count), key=lambda s: (loads[s], sizes[s], s))
+        loads[target] += history.estimate(item)
+        sizes[target] += 1
+        if target == index - 1:
+            picked.append(item)
+    return sorted(picked, key=lambda i: i.index)
+
+
+def _bucket(key, count):
+    digest = hashlib.sha1(key.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count
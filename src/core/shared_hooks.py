@@ -0,0 +1,118 @@
+# core/shared_hooks.py
+"""
+共享 before hook 的去重与引用计数
+
+testcase / run 作用域的 before hook 按（作用域, 渲染后的命令文本）去重：
+
+    hooks:
+      before:
+        - cmd: "provision_cluster --pg {{pg_version}}"
+          scope: run
+          teardown: "destroy_cluster --pg {{pg_version}}"
+
+pg_version 相同的组合共享一次 provision，不论串行还是并发：
+- 第一个到达的组合执行 setup，其余组合等待其结束（setup 失败时全部以同一异常失败）
+- 引擎在执行前按展开后的组合列表登记每个 key 的使用者数（plan），
+  最后一个使用者结束（通过或失败）时由它执行 teardown
+- 未登记的使用者（pytest 逐个 run_item、分布式工作者）无法预知何时是最后一个，
+  teardown 推迟到 engine.close()
+"""
+import threading
+
+
+class _Entry:
+    def __init__(self):
+        self.expected = 0
+        self.released = 0
+        self.started = False
+        self.done = threading.Event()
+        self.error = None
+        self.torn_down = False
+        # setup 成功后填写：teardown 所需的命令、渲染好的文本、setup 时的组合
+        self.command = None
+        self.teardown = ""
+        self.testcase = None
+        self.vars = None
+
+
+class SharedHooks:
+    def __init__(self):
+        self._entries = {}
+        # testcase_id -> 登记过、尚未释放的 key
+        self._planned = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(hook, testcase, text):
+        if hook.scope == "testcase":
+            return "testcase", testcase.name, text
+        return "run", text
+
+    def plan(self, testcase_id, keys):
+        """登记一个组合将使用的共享 key（同一组合多次登记会累加）"""
+        with self._lock:
+            self._planned.setdefault(testcase_id, []).extend(keys)
+            for key in keys:
+                self._entry(key).expected += 1
+
+    def acquire(self, key, setup):
+        """
+        获取共享 hook：第一个使用者执行 setup()，其余等待其结果
+        setup() 返回 (command, 渲染好的 teardown 文本, testcase, vars)
+        """
+        with self._lock:
+            entry = self._entry(key)
+            owner = not entry.started
+            entry.started = True
+
+        if not owner:
+            entry.done.wait()
+            if entry.error is not None:
+                raise entry.error
+            return
+
+        try:
+            entry.command, entry.teardown, entry.testcase, entry.vars = setup()
+        except Exception as e:
+            entry.error = e
+            raise
+        finally:
+            entry.done.set()
+
+    def release(self, testcase_id):
+        """
+        组合结束：释放其登记的全部 key（含因提前失败未获取到的）
+        返回此时到期的 teardown：[(command, 文本)]，按登记顺序逆序
+        """
+        due = []
+        with self._lock:
+            for key in reversed(self._planned.pop(testcase_id, [])):
+                entry = self._entries[key]
+                entry.released += 1
+                if entry.released >= entry.expected and self._take(entry):
+                    due.append((entry.command, entry.teardown))
+        return due
+
+    def leftovers(self):
+        """engine.close() 时仍未 teardown 的共享 hook：[(command, 文本, testcase, vars)]"""
+        with self._lock:
+            return [
+                (e.command, e.teardown, e.testcase, e.vars)
+                for e in reversed(list(self._entries.values()))
+                if self._take(e)
+            ]
+
+    def _entry(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry.torn_down:
+            # 已 teardown 后又有使用者（登记数与实际不符）：重新 setup
+            entry = self._entries[key] = _Entry()
+        return entry
+
+    @staticmethod
+    def _take(entry):
+        """把已 setup 的 entry 标记为结束（之后的使用者重新 setup），返回是否需要执行 teardown"""
+        if entry.torn_down or not entry.done.is_set():
+            return False
+        entry.torn_down = True
+        return entry.error is None and bool(entry.teardown)
@@ -0,0 +1,108 @@
+"""
+Template Service
+命令 / SQL / hook / 断言共用的 Jinja2 模板编译服务
+
+- 全进程共享一个 Environment（StrictUndefined，autoescape=False）
+- 按模板源码做有界 LRU 缓存：相同文本只编译一次（matrix 展开、hook、断言渲染都会命中）
+- 可选磁盘字节码缓存（FileSystemBytecodeCache），跨进程 / 跨运行复用编译结果
+- hits / misses 计数，便于确认缓存效果
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from jinja2 import Environment, FileSystemBytecodeCache, FunctionLoader, StrictUndefined
+
+
+class TemplateService:
+    def __init__(self, max_size=1024, bytecode_dir=None):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        # 编译时 loader 通过模板名（源码摘要）取回源码，这样才能走 bytecode cache
+        self._sources = {}
+
+        # =========================
+        # Jinja2 全局环境
+        # =========================
+        # - StrictUndefined：模板中引用未定义变量时直接抛异常
+        #   防止 silent failure（命令中变量未替换却悄悄执行）
+        # - autoescape=False：shell / SQL 不是 HTML，不需要转义
+        # - cache_size=0：由本服务的 LRU 统一缓存
+        self._env = Environment(
+            undefined=StrictUndefined,
+            autoescape=False,
+            loader=FunctionLoader(self._load_source),
+            cache_size=0,
+        )
+        self.configure(bytecode_dir=bytecode_dir)
+
+    def configure(self, max_size=None, bytecode_dir=None):
+        """
+        调整缓存配置（应在加载命令前调用）
+        bytecode_dir 为 None 时关闭磁盘字节码缓存
+        """
+        with self._lock:
+            if max_size is not None:
+                self.max_size = max_size
+                while len(self._cache) > self.max_size:
+                    self._cache.popitem(last=False)
+            if bytecode_dir:
+                os.makedirs(bytecode_dir, exist_ok=True)
+                self._env.bytecode_cache = FileSystemBytecodeCache(str(bytecode_dir))
+            else:
+                self._env.bytecode_cache = None
+
+    def compile(self, source: str):
+        """返回编译好的 Template；相同源码命中 LRU 缓存"""
+        with self._lock:
+            tpl = self._cache.get(source)
+            if tpl is not None:
+                self.hits += 1
+                self._cache.move_to_end(source)
+                return tpl
+
+            self.misses += 1
+            name = hashlib.sha1(source.encode("utf-8")).hexdigest()
+            self._sources[name] = source
+            try:
+                tpl = self._env.get_template(name)
+            finally:
+                self._sources.pop(name, None)
+
+            self._cache[source] = tpl
+            if len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+            return tpl
+
+    def render(self, source: str, context: dict) -> str:
+        return self.compile(source).render(**context)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._cache),
+                "max_size": self.max_size,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.hits = self.misses = 0
+
+    def _load_source(self, name):
+        return self._sources[name], None, lambda: True
+
+
+# 进程级共享实例
+templates = TemplateService()
+
+
+def compile_template(source: str):
+    return templates.compile(source)
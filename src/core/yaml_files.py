@@ -0,0 +1,160 @@
+"""
+YAML 文件加载服务
+命令 / testcase 配置共用的 YAML 解析与磁盘缓存
+
+- 优先使用 libyaml 的 CSafeLoader（未编译 libyaml 时退回纯 Python 的 SafeLoader）
+- 可选磁盘缓存：解析结果按文件路径 pickle 到 cache_dir，
+  文件 mtime / size 不变直接命中；变了再比对内容 sha1（touch、git checkout 不会重新解析）
+- 文件多时并行加载：线程池读文件，进程池解析未命中的文件（libyaml 构造对象时持有 GIL，线程池无法并行）
+- hits / misses 计数，便于确认缓存效果
+
+缓存的是解析后的数据而不是构造好的命令 / 断言对象：后者持有编译好的 Jinja2 模板，无法序列化；
+模板编译由 TemplateService 的字节码缓存（--template-cache-dir）负责跨运行复用
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+
+Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# 缓存格式版本：解析器或缓存结构变化时递增，旧缓存整体失效
+_FORMAT = (1, Loader.__name__, yaml.__version__)
+_INDEX = "yaml-cache.pickle"
+
+
+def parse_yaml(data: bytes):
+    """进程池中逐文件解析：语法错误作为结果（ValueError）返回，一个坏文件不中断整批"""
+    try:
+        return yaml.load(data, Loader=Loader)
+    except yaml.YAMLError as e:
+        return ValueError(f"invalid YAML: {e}")
+
+
+class YamlFileService:
+    def __init__(self, cache_dir=None, workers=None, parallel_threshold=32):
+        """
+        cache_dir:          磁盘缓存目录（None 关闭）
+        workers:            并行解析的进程数（None 为 CPU 数）
+        parallel_threshold: 文件数达到该值才并行读取 / 解析
+        """
+        self.workers = workers
+        self.parallel_threshold = parallel_threshold
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        # 绝对路径 -> (mtime_ns, size, sha1, data)
+        self._index = {}
+        self._dirty = False
+        self.configure(cache_dir=cache_dir)
+
+    def configure(self, cache_dir=None, workers=None):
+        """调整缓存配置（应在加载命令 / testcase 前调用）；cache_dir 为 None 时关闭磁盘缓存"""
+        with self._lock:
+            if workers is not None:
+                self.workers = workers
+            self.cache_dir = str(cache_dir) if cache_dir else None
+            self._index = self._read_index() if self.cache_dir else {}
+            self._dirty = False
+
+    def load(self, path):
+        return self.load_many([path])[0]
+
+    def load_many(self, paths, return_errors=False):
+        """
+        按给定顺序返回各文件的解析结果
+
+        return_errors: YAML 语法错误的文件在结果中对应一个 ValueError（不缓存），
+                       其余文件照常返回；为 False 时抛出第一个错误
+        """
+        paths = [os.path.abspath(p) for p in paths]
+        # stat / 读文件是 IO，线程池即可并行
+        probes = self._map(ThreadPoolExecutor, self._probe, paths, max_workers=min(32, len(paths) or 1))
+
+        results = [None] * len(paths)
+        missing = []
+        with self._lock:
+            for i, (path, (meta, cached, raw)) in enumerate(zip(paths, probes)):
+                if raw is None:
+                    results[i] = cached
+                    self.hits += 1
+                    if self._index[path][:3] != meta:
+                        # 内容未变，只是 mtime 变了
+                        self._index[path] = meta + (cached,)
+                        self._dirty = True
+                else:
+                    missing.append(i)
+                    self.misses += 1
+
+        # 解析是 CPU 密集且持有 GIL，用进程池（multiprocessing 较重，用到时才 import）
+        from concurrent.futures import ProcessPoolExecutor
+        parsed = self._map(ProcessPoolExecutor, parse_yaml, [probes[i][2] for i in missing],
+                           max_workers=self.workers, chunksize=16)
+        with self._lock:
+            for i, data in zip(missing, parsed):
+                results[i] = data
+                if not isinstance(data, ValueError):
+                    self._index[paths[i]] = probes[i][0] + (data,)
+                    self._dirty = True
+
+        self.flush()
+        if not return_errors:
+            for path, data in zip(paths, results):
+                if isinstance(data, ValueError):
+                    raise ValueError(f"{path}: {data}")
+        return results
+
+    def flush(self):
+        """把新解析的结果写回磁盘缓存（原子替换，多进程同时写时以最后一次为准）"""
+        with self._lock:
+            if not self.cache_dir or not self._dirty:
+                return
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((_FORMAT, self._index), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, os.path.join(self.cache_dir, _INDEX))
+            self._dirty = False
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._index)}
+
+    def _probe(self, path):
+        """返回 ((mtime_ns, size, sha1), 缓存的解析结果, 需要重新解析时的文件内容)"""
+        st = os.stat(path)
+        entry = self._index.get(path)
+        if entry is not None and entry[:2] == (st.st_mtime_ns, st.st_size):
+            return entry[:3], entry[3], None
+
+        with open(path, "rb") as f:
+            raw = f.read()
+        meta = (st.st_mtime_ns, st.st_size, hashlib.sha1(raw).hexdigest())
+        if entry is not None and entry[2] == meta[2]:
+            return meta, entry[3], None
+        return meta, None, raw
+
+    def _map(self, executor, fn, *iterables, max_workers=None, chunksize=1):
+        """数量达到 parallel_threshold 才用 executor 并行（进程 / 线程启动有固定开销）"""
+        n = len(iterables[0])
+        if n < self.parallel_threshold or max_workers == 1:
+            return list(map(fn, *iterables))
+        with executor(max_workers=max_workers) as pool:
+            return list(pool.map(fn, *iterables, chunksize=chunksize))
+
+    def _read_index(self):
+        try:
+            with open(os.path.join(self.cache_dir, _INDEX), "rb") as f:
+                fmt, index = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError, TypeError):
+            return {}
+        return index if fmt == _FORMAT else {}
+
+
+# 进程级共享实例
+yaml_files = YamlFileService()
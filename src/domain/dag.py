@@ -0,0 +1,67 @@
+class StepDAG:
+    """
+    Step 依赖图（节点用 step 在列表中的下标表示）
+
+    - 没有任何 step 声明 depends_on：退化为按列表顺序的链（与旧行为一致）
+    - 否则只使用显式声明的依赖，未声明依赖的 step 为根节点，可并发执行
+
+    构造时即完成校验（重名 / 未知依赖 / 环），loader 加载阶段就能暴露 DSL 错误
+    """
+
+    def __init__(self, steps):
+        self.steps = list(steps)
+        self.explicit = any(s.depends_on for s in self.steps)
+
+        # deps[i]：step i 依赖的下标；children[i]：依赖 step i 的下标
+        self.deps = [[] for _ in self.steps]
+        self.children = [[] for _ in self.steps]
+
+        if self.explicit:
+            index = {}
+            for i, s in enumerate(self.steps):
+                if s.name in index:
+                    raise ValueError(f"duplicate step name in DAG: {s.name}")
+                index[s.name] = i
+
+            for i, s in enumerate(self.steps):
+                for dep in dict.fromkeys(s.depends_on):
+                    if dep not in index:
+                        raise ValueError(f"step '{s.name}' depends on unknown step '{dep}'")
+                    self.deps[i].append(index[dep])
+        else:
+            # 隐式链：每个 step 依赖前一个（按位置，不要求名称唯一）
+            for i in range(1, len(self.steps)):
+                self.deps[i].append(i - 1)
+
+        for i, deps in enumerate(self.deps):
+            for d in deps:
+                self.children[d].append(i)
+
+        self.order = self._topo_order()
+
+    @property
+    def concurrent(self):
+        """是否存在可并发的 step（只有显式 DAG 才可能）"""
+        return self.explicit
+
+    def _topo_order(self):
+        """
+        Kahn 拓扑排序，同层按声明顺序，保证结果确定
+        存在环时抛 ValueError 并指出环上的 step
+        """
+        indegree = [len(d) for d in self.deps]
+        ready = [i for i, d in enumerate(indegree) if d == 0]
+        order = []
+        while ready:
+            i = ready.pop(0)
+            order.append(i)
+            for child in self.children[i]:
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    ready.append(child)
+
+        if len(order) != len(self.steps):
+            cyclic = [self.steps[i].name for i, d in enumerate(indegree) if d > 0]
+            raise ValueError(f"cycle detected in step DAG among: {cyclic}")
+
+        return order
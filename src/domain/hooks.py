@@ -1,5 +1,47 @@
+from command.cache import CachePolicy
+
+SCOPES = ("combo", "testcase", "run")
+
+
+class Hook:
+    def __init__(self, cmd, scope="combo", teardown=None, effect=None, effect_scope=None):
+        """
+        cmd:      hook 命令模板
+        scope:    combo（默认）：每个 matrix 组合各执行一次
+                  testcase：同一 testcase 内渲染结果相同的组合共享一次执行
+                  run：整个运行内渲染结果相同的组合（可跨 testcase）共享一次执行
+        teardown: 清理命令模板（可选），用 setup 时的 context 渲染；
+                  combo 在组合结束时执行，testcase / run 在最后一个使用者结束时执行
+        effect / effect_scope: 对命令结果缓存的影响，同命令 yaml（见 command/cache.py），
+                  缺省不影响缓存；准备 / 清理会改变系统状态时声明 write / chaos
+        """
+        if scope not in SCOPES:
+            raise ValueError(f"unknown hook scope: {scope} (expected one of {SCOPES})")
+        self.cmd = cmd
+        self.scope = scope
+        self.teardown = teardown or ""
+        self.cache_policy = CachePolicy(effect=effect, effect_scope=effect_scope)
+
+    @classmethod
+    def parse(cls, entry):
+        """字符串（combo 作用域、无 teardown）或 {cmd, scope, teardown, effect, effect_scope}"""
+        if isinstance(entry, str):
+            return cls(entry)
+        return cls(entry["cmd"], entry.get("scope", "combo"), entry.get("teardown"),
+                   entry.get("effect"), entry.get("effect_scope"))
+
+    @property
+    def shared(self):
+        return self.scope != "combo"
+
+
 class Hooks:
     def __init__(self, before=None, after=None, on_fail=None):
-        self.before = before or []
-        self.after = after or []
-        self.on_fail = on_fail or []
+        self.before = [Hook.parse(h) for h in before or []]
+        self.after = [Hook.parse(h) for h in after or []]
+        self.on_fail = [Hook.parse(h) for h in on_fail or []]
+
+        # scope / teardown 只对 before 有意义
+        for hook in self.after + self.on_fail:
+            if hook.shared or hook.teardown:
+                raise ValueError(f"scope / teardown only apply to before hooks: {hook.cmd!r}")
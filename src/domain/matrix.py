@@ -0,0 +1,240 @@
+"""
+Matrix 展开策略
+
+- full：    全部参数组合（笛卡尔积），与旧行为一致
+- pairwise：覆盖任意两个参数的所有取值组合（strength=2 的覆盖数组）
+- n-wise：  覆盖任意 strength 个参数的所有取值组合
+
+覆盖数组用贪心（AETG 风格）构造：每轮生成若干候选行，选新覆盖组合最多的一行，
+随机数只用于打破平局，固定 seed 保证同一份 matrix 每次展开结果相同
+
+约束：
+- exclude：[{key: value 或 [values]}]，匹配的组合不会生成
+- include：[完整组合]，原样加入结果（排在最前，并计入覆盖）
+"""
+import itertools
+import math
+import random
+
+STRATEGIES = ("full", "pairwise", "n-wise")
+
+# 每轮贪心生成的候选行数
+_CANDIDATES = 20
+
+
+
+def expand_matrix(matrix: dict, strategy="full", strength=2, seed=0, exclude=None, include=None):
+    """
+    :return: 组合列表 [{key: value}]，顺序确定
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"unknown matrix_strategy: {strategy} (expected one of {STRATEGIES})")
+    if not matrix:
+        return []
+
+    keys = list(matrix.keys())
+    values = [list(v) for v in matrix.values()]
+    excludes = [_normalize_exclude(e, keys) for e in (exclude or [])]
+    rows = [_normalize_include(r, keys) for r in (include or [])]
+
+    if strategy == "pairwise":
+        strength = 2
+    if strategy == "full" or strength >= len(keys):
+        combos = itertools.product(*values)
+        rows += [list(c) for c in combos if not _excluded(keys, c, excludes)]
+        return _dedup(keys, rows)
+
+    if strength < 1:
+        raise ValueError(f"invalid matrix_strength: {strength}")
+
+    builder = _CoveringArray(keys, values, strength, excludes, random.Random(seed))
+    rows += builder.build([[_value_index(values[i], r[i]) for i in range(len(keys))] for r in rows])
+    return _dedup(keys, rows)
+
+
+# ---------- constraints ----------
+def _normalize_exclude(conf, keys):
+    unknown = set(conf) - set(keys)
+    if unknown:
+        raise ValueError(f"exclude references unknown matrix keys: {sorted(unknown)}")
+    return {
+        keys.index(k): (v if isinstance(v, list) else [v])
+        for k, v in conf.items()
+    }
+
+
+def _normalize_include(conf, keys):
+    if set(conf) != set(keys):
+        raise ValueError(f"include must specify exactly the matrix keys {keys}, got {sorted(conf)}")
+    return [conf[k] for k in keys]
+
+
+def _excluded(keys, row, excludes):
+    """row 为完整取值序列（可含 None 表示未赋值）；只判定涉及参数都已赋值的约束"""
+    for ex in excludes:
+        if all(row[i] is not None and row[i] in allowed for i, allowed in ex.items()):
+            return True
+    return False
+
+
+def _value_index(vals, v):
+    # include 的取值可以不在 matrix 里，此时不参与覆盖计算
+    return vals.index(v) if v in vals else None
+
+
+def _dedup(keys, rows):
+    seen = set()
+    out = []
+    for r in rows:
+        marker = repr(r)
+        if marker in seen:
+            continue
+        seen.add(marker)
+        out.append(dict(zip(keys, r)))
+    return out
+
+
+# ---------- covering array ----------
+def _primes(count):
+    primes = []
+    n = 2
+    while len(primes) < count:
+        if all(n % q for q in primes if q * q <= n):
+            primes.append(n)
+        n += 1
+    return primes
+
+
+class _CoveringArray:
+    """
+    未覆盖的 t 元组同时保存在三处，覆盖时同步删除：
+    - pool：    列表（初始排序一次），随机挑起始元组；删除时用末尾元素填位，O(1)
+    - index：   元组 -> 在 pool 中的位置
+    - partners：(param, value) -> 含该取值的未覆盖元组去掉它后剩下的部分，
+                计算某个取值的新增覆盖数 = 已赋值参数组成的 (t-1) 元组与之求交（C 层集合运算）
+    (t-1) 元组用整数表示：每个 (param, value) 对应一个质数，元组为其乘积（与顺序无关、不会冲突，哈希代价小）
+    """
+
+    def __init__(self, keys, values, strength, excludes, rng):
+        self.keys = keys
+        self.values = values
+        self.t = strength
+        self.excludes = excludes
+        self.rng = rng
+        self.n = len(keys)
+
+        # 待覆盖的 t 元组：((param, value_index), ...)，按 param 升序
+        self.pool = []
+        for params in itertools.combinations(range(self.n), self.t):
+            for idx in itertools.product(*(range(len(values[p])) for p in params)):
+                tup = tuple(zip(params, idx))
+                if not self._violates(dict(tup)):
+                    self.pool.append(tup)
+        self.index = {tup: i for i, tup in enumerate(self.pool)}
+        pairs = [(p, v) for p in range(self.n) for v in range(len(values[p]))]
+        self.prime = dict(zip(pairs, _primes(len(pairs))))
+        self.partners = {pv: set() for pv in pairs}
+        for tup in self.pool:
+            for pv, rest in self._rests(tup):
+                self.partners[pv].add(rest)
+
+    def build(self, seed_rows):
+        for row in seed_rows:
+            if None not in row:
+                self._cover(row)
+
+        rows = []
+        while self.pool:
+            # 每个候选从一个未覆盖的元组出发（随机数固定 seed，保证确定性）
+            starts = [self.pool[self.rng.randrange(len(self.pool))] for _ in range(_CANDIDATES)]
+
+            best, best_gain = None, 0
+            for start in starts:
+                row, gain = self._candidate(start)
+                if row is not None and gain > best_gain:
+                    best, best_gain = row, gain
+
+            if best is None:
+                # 这些元组放不进任何满足 exclude 的完整组合：放弃，避免死循环
+                for tup in starts:
+                    self._remove(tup)
+                continue
+
+            self._cover(best)
+            rows.append([self.values[p][v] for p, v in enumerate(best)])
+        return rows
+
+    def _candidate(self, start):
+        """
+        固定起始元组，其余参数按随机顺序贪心填充（新覆盖最多的取值优先）
+        返回 (行, 新覆盖的元组数)：每个元组在它最后一个参数被赋值时计入一次
+        """
+        row = [None] * self.n
+        # subsets[k]：已赋值的 (param, value) 中任取 k 个组成的元组（按 param 升序），随赋值增量维护
+        subsets = [{1}] + [set() for _ in range(self.t - 1)]
+        for pv in start:
+            row[pv[0]] = pv[1]
+            self._extend(subsets, pv)
+        total = 1
+
+        order = [p for p in range(self.n) if row[p] is None]
+        self.rng.shuffle(order)
+        for p in order:
+            rests = subsets[-1]
+            scored = []
+            for v in range(len(self.values[p])):
+                row[p] = v
+                if self._violates_row(row):
+                    continue
+                gain = len(rests & self.partners[p, v])
+                scored.append((gain, self.rng.random(), v))
+            if not scored:
+                return None, 0
+            gain, _, row[p] = max(scored)
+            total += gain
+            self._extend(subsets, (p, row[p]))
+        return row, total
+
+    def _extend(self, subsets, pv):
+        prime = self.prime[pv]
+        for k in range(len(subsets) - 1, 0, -1):
+            subsets[k] |= {s * prime for s in subsets[k - 1]}
+
+    def _rests(self, tup):
+        """[(元组中的一个 (param, value), 其余部分的乘积)]"""
+        key = math.prod(self.prime[pv] for pv in tup)
+        return [(pv, key // self.prime[pv]) for pv in tup]
+
+    def _tuples(self, row):
+        return [
+            tuple((p, row[p]) for p in params)
+            for params in itertools.combinations(range(self.n), self.t)
+        ]
+
+    def _cover(self, row):
+        for tup in self._tuples(row):
+            if tup in self.index:
+                self._remove(tup)
+
+    def _remove(self, tup):
+        i = self.index.pop(tup, None)
+        if i is None:
+            return
+        last = self.pool.pop()
+        if last != tup:
+            self.pool[i] = last
+            self.index[last] = i
+        for pv, rest in self._rests(tup):
+            self.partners[pv].discard(rest)
+
+    def _violates(self, assignment):
+        row = [None] * self.n
+        for p, v in assignment.items():
+            row[p] = v
+        return self._violates_row(row)
+
+    def _violates_row(self, row):
+        if not self.excludes:
+            return False
+        actual = [None if v is None else self.values[p][v] for p, v in enumerate(row)]
+        return _excluded(self.keys, actual, self.excludes)
@@ -1,5 +1,55 @@
+import re
+
+
 class Step:
-    def __init__(self, name, command, asserter=None):
+    def __init__(self, name, command, asserter=None, depends_on=None,
+                 timeout=None, retries=0, retry_on=None, retry_delay=0):
+        """
+        name:       step 名称（DAG 模式下在 testcase 内唯一）
+        command:    命令定义（ShellCommand / SQLCommand）
+        asserter:   断言（可选）
+        depends_on: 依赖的 step 名称列表（可选）
+                    testcase 中任一 step 声明了 depends_on 即启用 DAG 调度，
+                    否则按列表顺序串行执行
+        timeout:    单次执行超时秒数（可选），超时杀掉整个进程组
+        retries:    失败后最多重试次数（使用 redo 模板），默认 0
+        retry_on:   重试条件（可选），缺省为 rc != 0 或超时；声明了 rc / stderr 时只按其匹配
+                    {"rc": [1, 255], "stderr": "connection refused|timeout", "timeout": true}
+        retry_delay: 两次重试之间的等待秒数
+        """
         self.name = name
         self.command = command
         self.asserter = asserter
+        if isinstance(depends_on, str):
+            depends_on = [depends_on]
+        self.depends_on = list(depends_on or [])
+
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.retry_on = retry_on
+
+        retry_on = retry_on or {}
+        rc = retry_on.get("rc")
+        self._retry_rc = None if rc is None else set(rc if isinstance(rc, list) else [rc])
+        stderr = retry_on.get("stderr")
+        try:
+            self._retry_stderr = re.compile(stderr) if stderr else None
+        except re.error as e:
+            raise ValueError(f"invalid retry_on.stderr regex {stderr!r} in step {name}: {e}") from None
+        self._retry_timeout = retry_on.get("timeout", True)
+
+    def should_retry(self, result: dict) -> bool:
+        """根据 retry_on 判断本次执行结果是否需要重试"""
+        if result.get("timed_out"):
+            return self._retry_timeout
+
+        # 只声明了 timeout 时其余仍按默认：rc != 0 即重试
+        if self._retry_rc is None and self._retry_stderr is None:
+            return result["rc"] != 0
+
+        if self._retry_rc is not None and result["rc"] in self._retry_rc:
+            return True
+        if self._retry_stderr is not None and self._retry_stderr.search(result["stderr"] or ""):
+            return True
+        return False
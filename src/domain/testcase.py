@@ -1,7 +1,11 @@
 import itertools
+from domain.dag import StepDAG
+from domain.matrix import STRATEGIES, expand_matrix
 
 class TestCase:
-    def __init__(self, name, matrix, context, steps, hooks):
+    def __init__(self, name, matrix, context, steps, hooks, parallelism=None,
+                 matrix_strategy="full", matrix_strength=2, matrix_seed=0,
+                 exclude=None, include=None):
         """
         name:    测试用例名称
         matrix:  参数矩阵（用于参数化执行）
@@ -13,12 +17,31 @@ class TestCase:
         context: 基础上下文变量（所有 step / command / assert 都可引用）
         steps:   Step 列表，定义执行流程
         hooks:   Hooks(before / after / on_fail)
+        parallelism: DAG 模式下同时执行的 step 上限（None 表示使用 engine 配置）
+        matrix_strategy: matrix 展开策略 full | pairwise | n-wise（见 domain/matrix.py）
+        matrix_strength: n-wise 的覆盖强度（任意 strength 个参数的取值组合都会出现）
+        matrix_seed:     覆盖数组构造的随机种子（固定则展开结果固定）
+        exclude / include: 组合约束，exclude 中匹配的组合不执行，include 中的组合一定执行
         """
         self.name = name
         self.matrix = matrix
         self.context = context
         self.steps = steps
         self.hooks = hooks
+        self.parallelism = parallelism
+
+        if matrix_strategy not in STRATEGIES:
+            raise ValueError(f"unknown matrix_strategy: {matrix_strategy} (expected one of {STRATEGIES})")
+        self.matrix_strategy = matrix_strategy
+        self.matrix_strength = matrix_strength
+        self.matrix_seed = matrix_seed
+        self.exclude = exclude or []
+        self.include = include or []
+        # expand() 的组合缓存（见 _matrix_combos）
+        self._combos = None
+
+        # 构造即校验依赖（未知依赖 / 环直接抛 ValueError）
+        self.dag = StepDAG(steps)
 
     def expand(self):
         """
@@ -31,6 +54,11 @@ class TestCase:
             - 对 matrix 中所有参数做笛卡尔积
             - 每一种组合都会生成一个独立的 context
             - Engine 会对每一个 context 独立执行整个 TestCase
+
+        如果指定了 pairwise / n-wise 策略或 exclude / include 约束:
+            - 由 domain.matrix.expand_matrix 生成组合（覆盖数组 / 过滤后的笛卡尔积）
+
+        组合只计算一次（engine.run 与 hook 规划等都会展开同一个 testcase），每次产出新的 context
         """
 
         # 情况 1：没有 matrix，直接返回基础 context
@@ -38,6 +66,28 @@ class TestCase:
             yield self.context
             return
 
+        for combo in self._matrix_combos():
+            # 复制基础 context，避免污染原始 context
+            ctx = dict(self.context)
+            ctx.update(combo)
+            yield ctx
+
+    def _matrix_combos(self):
+        if self._combos is not None:
+            return self._combos
+
+        # 情况 2：覆盖数组 / 带约束的展开
+        if self.matrix_strategy != "full" or self.exclude or self.include:
+            self._combos = expand_matrix(
+                self.matrix,
+                strategy=self.matrix_strategy,
+                strength=self.matrix_strength,
+                seed=self.matrix_seed,
+                exclude=self.exclude,
+                include=self.include,
+            )
+            return self._combos
+
         # matrix 的 key，如 ["pg_version", "node_count"]
         keys = self.matrix.keys()
 
@@ -48,14 +98,7 @@ class TestCase:
         #
         # product 后得到:
         # (14, 1), (14, 3), (15, 1), (15, 3)
-        for values in itertools.product(*self.matrix.values()):
-            # 复制基础 context，避免污染原始 context
-            ctx = dict(self.context)
-
-            # 将参数组合写入 context
-            # zip(keys, values) =>
-            # {"pg_version": 14, "node_count": 1}
-            ctx.update(dict(zip(keys, values)))
-
-            # 产出一个完整可执行的 context
-            yield ctx
+        # zip(keys, values) =>
+        # {"pg_version": 14, "node_count": 1}
+        self._combos = [dict(zip(keys, values)) for values in itertools.product(*self.matrix.values())]
+        return self._combos
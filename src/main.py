@@ -1,15 +1,237 @@
+import argparse
+import functools
+import json
+import os
+import subprocess
+import sys
+
 from command.registry import CommandRegistry
 from core.loader import load_testcases
-from core.engine import ExecutionEngine
-from observer.logger import LoggerObserver
+from core.scheduler import DurationHistory, expand_suite
+from core.shard import parse_shard, shard_items
+from command.cache import ResultCache
+from core.checkpoint import CheckpointJournal, shard_path
+from core.address import AUTHKEY_ENV, authkey_from_env, parse_address
+from observer.registry import OBSERVERS
+from core.template import templates
+from core.yaml_files import yaml_files
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="oneTear 用例执行入口")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="matrix 组合并发数（默认 1，串行执行）")
+    parser.add_argument("--step-workers", type=int, default=1,
+                        help="DAG 用例内 step 并发数（testcase.parallelism 优先）")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="使用 asyncio 引擎（单线程驱动大量并发 step / 组合）")
+    parser.add_argument("--shell-session", choices=["testcase", "node"], default=None,
+                        help="shell 命令复用常驻 bash 会话（按组合或按 node 变量）")
+    parser.add_argument("--template-cache-dir", default=None,
+                        help="Jinja2 模板字节码缓存目录（跨运行复用编译结果）")
+    parser.add_argument("--yaml-cache-dir", default=None,
+                        help="命令 / testcase YAML 解析结果缓存目录（文件未变时跳过解析）")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="在本地该端口暴露 Prometheus /metrics")
+    parser.add_argument("--metrics-textfile", default=None,
+                        help="写 node_exporter textfile collector 文件（.prom）")
+    parser.add_argument("--observer-overflow", choices=["block", "drop"], default="block",
+                        help="观察者事件队列满时阻塞等待（默认）或丢弃 step 事件")
+    parser.add_argument("--log-compress", choices=["gzip", "zstd"], default=None,
+                        help="压缩轮转出的日志与结束的组合日志")
+    parser.add_argument("--shard", type=parse_shard, default=None, metavar="I/N",
+                        help="只执行展开后组合的第 I 片（共 N 片，1-based），用于多进程 / 多机切分")
+    parser.add_argument("--shard-mode", choices=["hash", "duration"], default="hash",
+                        help="hash：按组合 id 哈希切分；duration：按结果库历史耗时均衡切分")
+    parser.add_argument("--results-db", default=None,
+                        help="把 testcase / step 结果写入该 SQLite 结果库（python -m observer.results 查询）")
+    parser.add_argument("--trace-file", default=None,
+                        help="按批追加 OTLP/JSON span 到该文件")
+    parser.add_argument("--trace-endpoint", default=None,
+                        help="POST OTLP/JSON span 到 collector，如 http://127.0.0.1:4318/v1/traces")
+    parser.add_argument("--checkpoint", default="logs/checkpoint.jsonl",
+                        help="记录已结束组合的 checkpoint 日志（空字符串关闭）；"
+                             "--shard I/N 时按分片加后缀，如 checkpoint.shard-1-of-4.jsonl")
+    parser.add_argument("--resume", action="store_true",
+                        help="从 checkpoint 续跑：跳过已通过的组合，只执行失败 / 未完成的")
+    parser.add_argument("--cache", action="store_true",
+                        help="启用 cacheable 命令的结果缓存（内存中的 testcase / run 作用域，默认关闭）")
+    parser.add_argument("--cache-dir", default=None,
+                        help="cache_scope: persistent 的结果落盘到该目录（隐含 --cache）；"
+                             "未指定时 persistent 退化为 run 作用域")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="关闭命令结果缓存，优先于 --cache / --cache-dir（cacheable 命令也总是执行）")
+    parser.add_argument("--distributed", type=int, default=None, metavar="N",
+                        help="协调者模式：启动 N 个本地工作者进程领取组合执行（可为 0，只接受远程工作者）")
+    parser.add_argument("--coordinator", type=parse_address, default=None, metavar="HOST:PORT",
+                        help=f"协调者监听地址（默认 127.0.0.1 随机端口）；远程工作者需设置 {AUTHKEY_ENV}")
+    parser.add_argument("--worker", type=parse_address, default=None, metavar="HOST:PORT",
+                        help="工作者模式：连接协调者领取组合执行")
+    parser.add_argument("--heartbeat-timeout", type=float, default=30.0,
+                        help="工作者超过该秒数没有心跳视为丢失，其组合重新分配")
+    parser.add_argument("--observer", action="append", default=[], metavar="NAME",
+                        help="额外启用的观察者插件（可重复，见 observer.registry），如 allure")
+    parser.add_argument("--plan", action="store_true",
+                        help="只渲染并校验展开后的全部组合（不执行），打印统计与错误；有错误时退出码 1")
+    parser.add_argument("--plan-out", default=None, metavar="PATH",
+                        help="--plan 时把完整计划（每个组合渲染后的命令 / hook / 断言）写成 JSON")
+    parser.add_argument("--plan-workers", type=int, default=None,
+                        help="--plan 渲染进程数（默认 CPU 数，1 为单进程）")
+    return parser.parse_args()
+
+
+def build_observers(args):
+    # 观察者插件按需加载：没启用的观察者不会 import 其依赖（prometheus_client / allure ...）
+    observers = [OBSERVERS.create("logger", compress=args.log_compress)]
+    if args.metrics_port is not None or args.metrics_textfile:
+        observers.append(OBSERVERS.create("metrics", port=args.metrics_port, textfile=args.metrics_textfile))
+    if args.results_db:
+        observers.append(OBSERVERS.create("results", args.results_db, argv=sys.argv[1:]))
+    if args.trace_file or args.trace_endpoint:
+        from observer.tracing import FileSpanExporter, HttpSpanExporter
+        if args.trace_file:
+            observers.append(OBSERVERS.create("tracing", FileSpanExporter(args.trace_file)))
+        if args.trace_endpoint:
+            observers.append(OBSERVERS.create("tracing", HttpSpanExporter(args.trace_endpoint)))
+    for name in args.observer:
+        observers.append(OBSERVERS.create(name))
+    return observers
+
+
+def build_engine(args, cmds, observers, checkpoint=None):
+    # asyncio 引擎只在 --async 时加载
+    if args.use_async:
+        from core.async_engine import AsyncExecutionEngine as engine_cls
+    else:
+        from core.engine import ExecutionEngine as engine_cls
+    return engine_cls(cmds, observers=observers,
+                      max_workers=args.workers, step_workers=args.step_workers,
+                      shell_session=args.shell_session,
+                      observer_overflow=args.observer_overflow,
+                      checkpoint=checkpoint,
+                      cache=build_cache(args, cmds))
+
+
+def build_cache(args, cmds):
+    if args.no_cache or not (args.cache or args.cache_dir):
+        return None
+    return ResultCache(args.cache_dir, scopes=cmds.cache_scopes())
+
+
+def run_distributed(args, items, observers, history, checkpoint=None):
+    """协调者：分发组合给本地 / 远程工作者，事件汇总到本进程的 observers"""
+    from core.distributed import Coordinator
+    authkey = authkey_from_env() or os.urandom(16).hex().encode()
+    coordinator = Coordinator(items, observers, address=args.coordinator or ("127.0.0.1", 0),
+                              authkey=authkey, heartbeat_timeout=args.heartbeat_timeout,
+                              history=history, checkpoint=checkpoint)
+    host, port = coordinator.address
+    if args.coordinator:
+        print(f"coordinator listening on {host}:{port}", flush=True)
+
+    # 本地工作者沿用执行相关参数，观察者只保留协调者这一份
+    worker_args = ["--worker", f"{'127.0.0.1' if host == '0.0.0.0' else host}:{port}",
+                   "--step-workers", str(args.step_workers)]
+    if args.use_async:
+        worker_args.append("--async")
+    if args.shell_session:
+        worker_args += ["--shell-session", args.shell_session]
+    if args.template_cache_dir:
+        worker_args += ["--template-cache-dir", args.template_cache_dir]
+    if args.yaml_cache_dir:
+        worker_args += ["--yaml-cache-dir", args.yaml_cache_dir]
+    if args.no_cache:
+        worker_args.append("--no-cache")
+    elif args.cache_dir:
+        worker_args += ["--cache-dir", args.cache_dir]
+    elif args.cache:
+        worker_args.append("--cache")
+    env = dict(os.environ, **{AUTHKEY_ENV: authkey.decode()})
+    procs = [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__)] + worker_args, env=env)
+        for _ in range(args.distributed or 0)
+    ]
+
+    try:
+        results = coordinator.serve(procs)
+    finally:
+        for p in procs:
+            try:
+                p.wait(10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+                p.wait()
+
+    failed = [(key, error) for key, error in results.items() if error]
+    if failed:
+        key, error = failed[0]
+        raise AssertionError(f"{len(failed)}/{len(results)} combos failed, first: {key}: {error}")
+
+
+def run_plan(args, items, load_errors):
+    from core.plan import build_plan, load_suite
+    plan = build_plan(items, load_errors, workers=args.plan_workers,
+                      load=functools.partial(load_suite, "conf/command", "conf/testcases"))
+    if args.plan_out:
+        with open(args.plan_out, "w", encoding="utf-8") as f:
+            json.dump(plan, f, ensure_ascii=False, indent=2)
+
+    # 逐组合的错误明细只写进 --plan-out，终端打印合并后的摘要
+    print(json.dumps({"counts": plan["counts"], "errors": plan["error_summary"]}, ensure_ascii=False, indent=2))
+    if plan["errors"]:
+        sys.exit(1)
+
+
+def main():
+    args = parse_args()
+    templates.configure(bytecode_dir=args.template_cache_dir)
+    yaml_files.configure(cache_dir=args.yaml_cache_dir)
+
+    # 加载命令
+    cmds = CommandRegistry()
+    cmds.load_dir("conf/command")  # 目录下所有 yaml 都会加载
+
+    # --plan 时收集全部加载错误（cmd_ref / 断言 / DAG）一起报告，而不是停在第一个
+    load_errors = [] if args.plan else None
+    items = expand_suite(load_testcases("conf/testcases", cmds, errors=load_errors))
+    if args.worker:
+        # 工作者按协调者下发的组合 id 执行，事件发回协调者
+        from core.distributed import run_worker
+        run_worker(args.worker, items, lambda observers: build_engine(args, cmds, observers))
+        return
+
+    # 按历史耗时（结果库）从长到短调度执行
+    history = DurationHistory.from_db(args.results_db)
+    if args.shard:
+        items = shard_items(items, *args.shard, mode=args.shard_mode, history=history)
+
+    if args.plan:
+        return run_plan(args, items, load_errors)
+
+    checkpoint = None
+    if args.checkpoint:
+        checkpoint = CheckpointJournal(shard_path(args.checkpoint, args.shard), resume=args.resume)
+    if args.resume and checkpoint is not None:
+        done = checkpoint.completed()
+        items = [i for i in items if i.key not in done]
 
-# 加载命令
-cmds = CommandRegistry()
-cmds.load_dir("conf/command")  # 目录下所有 yaml 都会加载
+    observers = build_observers(args)
+    try:
+        if args.distributed is not None or args.coordinator:
+            run_distributed(args, items, observers, history, checkpoint)
+        else:
+            engine = build_engine(args, cmds, observers, checkpoint)
+            try:
+                engine.run_items(items, history=history)
+            finally:
+                engine.close()
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+        for obs in observers:
+            if hasattr(obs, "close"):
+                obs.close()
 
-# 初始化 Engine + Observer
-engine = ExecutionEngine(cmds, observers=[LoggerObserver()])
 
-# 加载所有 TestCase 并执行
-for tc in load_testcases("conf/testcases", cmds):
-    engine.run(tc)
+if __name__ == "__main__":
+    main()
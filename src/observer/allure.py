@@ -1,20 +1,35 @@
 # observer/allure.py
+import threading
 import allure
 from observer.base import BaseObserver
 
 class AllureObserver(BaseObserver):
+    # allure.step 依赖调用线程上的上下文栈，必须在引擎线程内同步调用（见 observer.bus）
+    synchronous = True
+
+    def __init__(self):
+        # step_id -> allure.step 上下文；并发组合各自独立，互不覆盖
+        self._steps = {}
+        self._lock = threading.Lock()
+
     def testcase_start(self, suite, ctx):
         pass  # pytest 侧 Allure 用 test name
 
     def step_start(self, step, ctx):
         allure.dynamic.title(ctx.step_id)
-        self._step = step
-        self._ctx = ctx
-        self._step_ctx = allure.step(ctx.step_id)
-        self._step_ctx.__enter__()
+        step_ctx = allure.step(ctx.step_id)
+        step_ctx.__enter__()
+        with self._lock:
+            self._steps[ctx.step_id] = step_ctx
 
     def step_end(self, step, ctx):
-        self._step_ctx.__exit__(None, None, None)
+        with self._lock:
+            step_ctx = self._steps.pop(ctx.step_id, None)
+        if step_ctx:
+            step_ctx.__exit__(None, None, None)
 
     def step_fail(self, step, ctx):
-        self._step_ctx.__exit__(Exception, Exception("step failed"), None)
+        with self._lock:
+            step_ctx = self._steps.pop(ctx.step_id, None)
+        if step_ctx:
+            step_ctx.__exit__(Exception, Exception("step failed"), None)
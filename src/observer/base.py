@@ -19,3 +19,7 @@ class BaseObserver:
 
     def step_fail(self, step, ctx):
         pass
+
+    def step_retry(self, step, ctx):
+        """step 即将重试（ctx.retry_count 为本次重试序号，ctx.vars 中是失败那次的结果）"""
+        pass
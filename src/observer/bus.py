@@ -0,0 +1,154 @@
+# observer/bus.py
+"""
+Observer Bus：把观察者回调移出 step 执行的关键路径
+
+- 构造时预计算每个事件的回调表：只登记真正覆盖了 BaseObserver 方法的观察者，
+  通知时不再逐个 getattr，也不会调用空实现
+- 事件连同 ctx 快照放入有界队列，由单个后台线程按入队顺序投递（全局有序，
+  同一观察者看到的事件顺序与引擎发出的顺序一致）
+- 队列满时的策略：
+  - block（默认）：引擎等待队列腾出空间，事件不丢
+  - drop：只丢弃 step_start 并计数，同一 step 之后的 step_retry / step_end / step_fail 随之丢弃；
+    其他事件（testcase 级、已入队 start 的后续事件）仍然阻塞入队，保证观察者看到的开闭成对
+- try_notify()：入队会阻塞时直接返回 False（asyncio 引擎据此让出事件循环，稍后重试）
+- flush()：等待此前入队的事件全部投递完；引擎在每个组合结束时调用
+- synchronous = True 的观察者（如 Allure，依赖调用线程上的上下文）仍在引擎线程内同步调用
+
+后台投递中观察者抛出的异常只记日志，不影响用例结果
+"""
+import logging
+import queue
+import threading
+from observer.base import BaseObserver
+
+EVENTS = (
+    "testcase_start", "testcase_end", "testcase_fail",
+    "step_start", "step_end", "step_fail", "step_retry",
+)
+OVERFLOW_POLICIES = ("block", "drop")
+
+_log = logging.getLogger("observer.bus")
+
+
+def _overrides(obs, event):
+    fn = getattr(obs, event, None)
+    if fn is None:
+        return None
+    base = getattr(BaseObserver, event, None)
+    if base is not None and getattr(type(obs), event, None) is base:
+        return None
+    return fn
+
+
+class ObserverBus:
+    def __init__(self, observers, max_queue=10000, overflow="block"):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"unknown overflow policy: {overflow} (expected one of {OVERFLOW_POLICIES})")
+        self.observers = list(observers or [])
+        self.overflow = overflow
+        self.dropped = 0
+        # drop 策略下被丢弃了 step_start 的 step_id，其后续事件一并丢弃
+        self._dropped_steps = set()
+
+        # event -> [callback]，分同步 / 后台两张表
+        self._inline = {e: [] for e in EVENTS}
+        self._background = {e: [] for e in EVENTS}
+        for obs in self.observers:
+            table = self._inline if getattr(obs, "synchronous", False) else self._background
+            for event in EVENTS:
+                fn = _overrides(obs, event)
+                if fn is not None:
+                    table[event].append(fn)
+
+        self._queue = queue.Queue(max_queue)
+        # 入队 / 投递序号，flush 按序号等待，不受其他组合后续入队的影响
+        self._enqueued = 0
+        self._delivered = 0
+        self._seq_lock = threading.RLock()
+        self._cond = threading.Condition()
+        self._thread = None
+        if any(self._background.values()):
+            self._thread = threading.Thread(target=self._worker, name="observer-bus", daemon=True)
+            self._thread.start()
+
+    def notify(self, event, *args):
+        for fn in self._inline[event]:
+            fn(*args)
+
+        if self.overflow == "drop" and event.startswith("step_") and self._drop(event, args[-1]):
+            return
+        handlers = self._background[event]
+        if not handlers:
+            return
+        # ctx 在引擎里会继续变化（下一个 step、下一次结果），投递的是此刻的快照
+        args = args[:-1] + (args[-1].snapshot(),)
+        with self._seq_lock:
+            if self.overflow == "drop" and event == "step_start":
+                try:
+                    self._queue.put_nowait((self._enqueued + 1, handlers, args))
+                except queue.Full:
+                    self.dropped += 1
+                    self._dropped_steps.add(args[-1].step_id)
+                    return
+            else:
+                self._queue.put((self._enqueued + 1, handlers, args))
+            self._enqueued += 1
+
+    def try_notify(self, event, *args):
+        """
+        同 notify，但不阻塞：block 策略下队列已满时不调用任何观察者，返回 False；
+        生产者之间经 _seq_lock 互斥、投递线程只取不放，检查时未满则随后的入队不会阻塞
+        """
+        with self._seq_lock:
+            if self._would_block(event, args[-1]):
+                return False
+            self.notify(event, *args)
+            return True
+
+    def _would_block(self, event, ctx):
+        if not self._background[event] or not self._queue.full():
+            return False
+        if self.overflow == "drop" and event.startswith("step_"):
+            # step_start 满了直接丢弃，已丢弃 step 的后续事件不入队
+            return event != "step_start" and ctx.step_id not in self._dropped_steps
+        return True
+
+    def _drop(self, event, ctx):
+        """start 已被丢弃的 step，其后续事件也丢弃（只在后台投递中丢弃，同步观察者照常收到）"""
+        with self._seq_lock:
+            if ctx.step_id not in self._dropped_steps:
+                return False
+            if event in ("step_end", "step_fail"):
+                self._dropped_steps.discard(ctx.step_id)
+            self.dropped += 1
+            return True
+
+    def flush(self, timeout=None):
+        """等待调用前已入队的事件投递完成；超时返回 False"""
+        with self._seq_lock:
+            target = self._enqueued
+        with self._cond:
+            return self._cond.wait_for(lambda: self._delivered >= target, timeout)
+
+    def close(self):
+        if self._thread is None:
+            return
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            seq, handlers, args = item
+            for fn in handlers:
+                try:
+                    fn(*args)
+                except Exception:
+                    _log.exception("observer %s failed", getattr(fn, "__qualname__", fn))
+            with self._cond:
+                self._delivered = seq
+                self._cond.notify_all()
@@ -1,91 +1,211 @@
 # observer/logger.py
+import gzip
 import logging
+import logging.handlers
+import os
+import queue
+import shutil
+from collections import OrderedDict
 from pathlib import Path
 from observer.base import BaseObserver
 
+_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+_DATEFMT = "%Y-%m-%d %H:%M:%S"
+
+_LEVELS = {
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
+
+COMPRESSIONS = (None, "gzip", "zstd")
+
+
+def _formatter():
+    return logging.Formatter(_FORMAT, _DATEFMT)
+
+
 class LoggerObserver(BaseObserver):
-    def __init__(self, base_dir="logs"):
+    """
+    每个 matrix 组合一个日志文件：logs/<testcase>/<testcase_id>.log
+
+    - 记录直接构造成 LogRecord 放入队列（QueueHandler），由 QueueListener 线程写文件 / 控制台，
+      不再为每个 testcase_id 注册 logging.Logger（全局 logger 表不会随 matrix 规模增长）
+    - 文件 handler 按 testcase_id 放在有界 LRU 池中复用（max_open），淘汰时关闭，再次写入时追加打开
+    - 单文件超过 max_bytes 时轮转，保留 backup_count 个历史文件
+    - compress="gzip" / "zstd"：轮转出的历史文件与结束的组合日志压缩为 .gz / .zst
+      （追加为新的压缩帧，多次运行同一组合时不覆盖旧内容；zstd 需要 zstandard 包）
+    - stdout / stderr 超过 max_output 个字符只记录首尾，并指向完整输出的 spool 文件
+    """
+
+    def __init__(self, base_dir="logs", max_bytes=64 * 1024 * 1024, backup_count=5,
+                 max_open=64, compress=None, max_output=64 * 1024):
         self.base_dir = Path(base_dir)
         self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.max_output = max_output
 
-        self.console = self._console_logger()
-        self.file = None
-
-    def _formatter(self):
-        return logging.Formatter(
-            "%(asctime)s [%(levelname)s] %(message)s",
-            "%Y-%m-%d %H:%M:%S",
-        )
+        self.router = _TestcaseFileRouter(self.base_dir, max_bytes, backup_count, max_open, compress)
+        self.router.setFormatter(_formatter())
 
-    def _console_logger(self):
-        logger = logging.getLogger("console")
-        logger.setLevel(logging.INFO)
-        if not logger.handlers:
-            h = logging.StreamHandler()
-            h.setFormatter(self._formatter())
-            logger.addHandler(h)
-        return logger
-
-    def _open_file_logger(self, ctx):
-        tc_dir = self.base_dir / ctx.testcase.name
-        tc_dir.mkdir(parents=True, exist_ok=True)
+        console = logging.StreamHandler()
+        console.setFormatter(_formatter())
+        console.addFilter(lambda record: getattr(record, "console", False))
 
-        log_file = tc_dir / f"{ctx.testcase_id}.log"
-        logger = logging.getLogger(ctx.testcase_id)
-        logger.setLevel(logging.INFO)
-        logger.handlers.clear()
+        self._queue = queue.SimpleQueue()
+        self._handler = logging.handlers.QueueHandler(self._queue)
+        self.listener = logging.handlers.QueueListener(self._queue, self.router, console)
+        self.listener.start()
 
-        fh = logging.FileHandler(log_file, encoding="utf-8")
-        fh.setFormatter(self._formatter())
-        logger.addHandler(fh)
-        return logger
+    def close(self):
+        """等待队列中的日志写完，关闭所有文件"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+            self.router.close()
 
     # ---------- TestCase ----------
     def testcase_start(self, testcase, ctx):
-        self.file = self._open_file_logger(ctx)
-        self._log(f"[TESTCASE START] {ctx.testcase_id}", both=True)
+        self._log(ctx, f"[TESTCASE START] {ctx.testcase_id}", both=True)
 
     def testcase_end(self, testcase, ctx):
-        self._log(f"[TESTCASE END] {ctx.testcase_id}", both=True)
-        self._close()
+        self._log(ctx, f"[TESTCASE END] {ctx.testcase_id}", both=True)
+        self._finish(ctx)
 
     def testcase_fail(self, testcase, ctx):
-        self._log(f"[TESTCASE FAIL] {ctx.testcase_id}", level="error", both=True)
-        self._close()
+        self._log(ctx, f"[TESTCASE FAIL] {ctx.testcase_id}", level="error", both=True)
+        self._finish(ctx)
 
     # ---------- Step ----------
     def step_start(self, step, ctx):
-        self._log(f"[STEP START] {ctx.step_id}")
-        cmd = step.command.build("do", ctx.vars)
-        self._log(f"CMD: {cmd}")
+        self._log(ctx, f"[STEP START] {ctx.step_id}")
 
     def step_end(self, step, ctx):
-        self._log(f"[STEP END] {ctx.step_id}")
+        self._log(ctx, f"[STEP END] {ctx.step_id}")
         self._log_result(ctx)
 
+    def step_retry(self, step, ctx):
+        self._log(ctx, f"[STEP RETRY {ctx.retry_count}/{step.retries}] {ctx.step_id}", level="warning")
+        self._log_result(ctx, level="warning")
+
     def step_fail(self, step, ctx):
-        self._log(f"[STEP FAIL] {ctx.step_id}", level="error")
+        self._log(ctx, f"[STEP FAIL] {ctx.step_id}", level="error")
         self._log_result(ctx, level="error")
 
     # ---------- helpers ----------
-    def _log(self, msg, level="info", both=False):
-        targets = [self.file]
-        if both:
-            targets.append(self.console)
-        for lg in filter(None, targets):
-            getattr(lg, level)(msg)
+    def _record(self, ctx, msg, level="info", **extra):
+        record = logging.LogRecord("onetear", _LEVELS[level], "", 0, msg, None, None)
+        if ctx.event_ns is not None:
+            # 经 ObserverBus 后台投递：时间戳取事件发出时刻，而不是写日志的时刻
+            record.created = ctx.event_ns / 1e9
+            record.msecs = (ctx.event_ns // 1_000_000) % 1000
+        record.testcase = ctx.testcase.name
+        record.testcase_id = ctx.testcase_id
+        record.__dict__.update(extra)
+        return record
+
+    def _log(self, ctx, msg, level="info", both=False):
+        self._handler.handle(self._record(ctx, msg, level, console=both))
+
+    def _finish(self, ctx):
+        # 排在该组合所有日志之后：listener 处理到它时关闭文件并（可选）压缩
+        self._handler.handle(self._record(ctx, "", finish=True))
 
     def _log_result(self, ctx, level="info"):
+        # 命令文本由引擎在执行时记录在 ctx 上，这里不再重新渲染
+        if ctx.last_command:
+            self._log(ctx, f"CMD: {ctx.last_command}", level)
         if ctx.vars.get("last_stdout"):
-            self._log(f"STDOUT:\n{ctx.vars['last_stdout']}", level)
+            stdout = self._clip(ctx.vars["last_stdout"], ctx.vars.get("last_stdout_file"))
+            self._log(ctx, f"STDOUT:\n{stdout}", level)
         if ctx.vars.get("last_stderr"):
-            self._log(f"STDERR:\n{ctx.vars['last_stderr']}", level)
-        self._log(f"RC: {ctx.vars.get('last_returncode')}", level)
-
-    def _close(self):
-        if not self.file:
+            self._log(ctx, f"STDERR:\n{self._clip(ctx.vars['last_stderr'])}", level)
+        self._log(ctx, f"RC: {ctx.vars.get('last_returncode')}", level)
+
+    def _clip(self, text, full_path=None):
+        if self.max_output is None or len(text) <= self.max_output:
+            return text
+        half = self.max_output // 2
+        where = f"full output: {full_path}" if full_path else "full output not kept"
+        return f"{text[:half]}\n... [{len(text) - 2 * half} chars truncated, {where}] ...\n{text[-half:]}"
+
+
+class _TestcaseFileRouter(logging.Handler):
+    """按 record.testcase_id 把日志分发到对应文件（只在 QueueListener 线程中调用）"""
+
+    def __init__(self, base_dir, max_bytes, backup_count, max_open, compress):
+        super().__init__()
+        if compress not in COMPRESSIONS:
+            raise ValueError(f"unknown log compression: {compress} (expected one of {COMPRESSIONS})")
+        if compress == "zstd":
+            # 可选依赖，只有启用 zstd 时才需要
+            import zstandard  # noqa: F401
+
+        self.base_dir = base_dir
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.max_open = max_open
+        self.compress = compress
+        self.suffix = {"gzip": ".gz", "zstd": ".zst"}.get(compress, "")
+        # testcase_id -> RotatingFileHandler，LRU
+        self._files = OrderedDict()
+
+    def emit(self, record):
+        tid = getattr(record, "testcase_id", None)
+        if tid is None:
             return
-        for h in self.file.handlers:
-            h.close()
-        self.file.handlers.clear()
-        self.file = None
+        if getattr(record, "finish", False):
+            self._finish(record)
+            return
+        self._file(record).handle(record)
+
+    def close(self):
+        while self._files:
+            self._files.popitem(last=False)[1].close()
+        super().close()
+
+    def _file(self, record):
+        tid = record.testcase_id
+        fh = self._files.get(tid)
+        if fh is not None:
+            self._files.move_to_end(tid)
+            return fh
+
+        fh = logging.handlers.RotatingFileHandler(
+            self._path(record), maxBytes=self.max_bytes, backupCount=self.backup_count,
+            encoding="utf-8", delay=True,
+        )
+        fh.setFormatter(self.formatter)
+        if self.compress:
+            fh.namer = lambda name: name + self.suffix
+            fh.rotator = lambda source, dest: self._compress(source, dest, append=False)
+
+        self._files[tid] = fh
+        while len(self._files) > self.max_open:
+            self._files.popitem(last=False)[1].close()
+        return fh
+
+    def _path(self, record):
+        tc_dir = self.base_dir / record.testcase
+        tc_dir.mkdir(parents=True, exist_ok=True)
+        return tc_dir / f"{record.testcase_id}.log"
+
+    def _finish(self, record):
+        fh = self._files.pop(record.testcase_id, None)
+        if fh is not None:
+            fh.close()
+        # handler 可能已被 LRU 淘汰，按路径处理
+        path = str(self._path(record))
+        if self.compress and os.path.exists(path):
+            self._compress(path, path + self.suffix, append=True)
+
+    def _compress(self, source, dest, append):
+        mode = "ab" if append else "wb"
+        with open(source, "rb") as src:
+            if self.compress == "gzip":
+                with gzip.open(dest, mode) as out:
+                    shutil.copyfileobj(src, out)
+            else:
+                import zstandard
+                with open(dest, mode) as out:
+                    zstandard.ZstdCompressor().copy_stream(src, out)
+        os.remove(source)
@@ -0,0 +1,134 @@
+# observer/metrics.py
+import threading
+import time
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, start_http_server, write_to_textfile,
+)
+from observer.base import BaseObserver
+
+# 步骤耗时分桶（秒）：覆盖毫秒级探测到分钟级 failover
+_STEP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+_TESTCASE_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+class MetricsObserver(BaseObserver):
+    """
+    Prometheus 指标观察者
+
+    - onetear_step_duration_seconds{testcase, command}        step 耗时直方图
+    - onetear_testcase_duration_seconds{testcase, status}     matrix 组合耗时直方图
+    - onetear_step_rc_total{command, rc}                      返回码计数
+    - onetear_step_retries_total{testcase, command}           重试次数
+    - onetear_steps_in_flight{command} / onetear_testcases_in_flight{testcase}
+
+    label 使用 testcase 名称与命令名（不含 matrix 参数），控制时序基数；
+    port 不为空时在本地启动 /metrics 端点，textfile 不为空时在每个组合结束时写 textfile collector 文件
+    """
+
+    def __init__(self, port=None, addr="127.0.0.1", textfile=None, registry=None):
+        self.registry = registry or CollectorRegistry()
+        self.textfile = textfile
+
+        self.step_latency = Histogram(
+            "onetear_step_duration_seconds", "Step execution latency",
+            ["testcase", "command"], buckets=_STEP_BUCKETS, registry=self.registry,
+        )
+        self.testcase_latency = Histogram(
+            "onetear_testcase_duration_seconds", "Testcase (matrix combo) latency",
+            ["testcase", "status"], buckets=_TESTCASE_BUCKETS, registry=self.registry,
+        )
+        self.step_rc = Counter(
+            "onetear_step_rc_total", "Step return codes",
+            ["command", "rc"], registry=self.registry,
+        )
+        self.step_retries = Counter(
+            "onetear_step_retries_total", "Step retries",
+            ["testcase", "command"], registry=self.registry,
+        )
+        self.steps_in_flight = Gauge(
+            "onetear_steps_in_flight", "Steps currently executing",
+            ["command"], registry=self.registry,
+        )
+        self.testcases_in_flight = Gauge(
+            "onetear_testcases_in_flight", "Testcase combos currently executing",
+            ["testcase"], registry=self.registry,
+        )
+
+        # step_id / testcase_id -> 开始时间（并发组合 / DAG step 互不干扰）
+        self._started = {}
+        self._lock = threading.Lock()
+
+        self.server = None
+        if port is not None:
+            self.server, _ = start_http_server(port, addr=addr, registry=self.registry)
+
+    # ---------- TestCase ----------
+    def testcase_start(self, testcase, ctx):
+        self._start(ctx.testcase_id, ctx)
+        self.testcases_in_flight.labels(testcase.name).inc()
+
+    def testcase_end(self, testcase, ctx):
+        self._finish_testcase(testcase, ctx, "passed")
+
+    def testcase_fail(self, testcase, ctx):
+        self._finish_testcase(testcase, ctx, "failed")
+
+    # ---------- Step ----------
+    def step_start(self, step, ctx):
+        self._start(ctx.step_id, ctx)
+        self.steps_in_flight.labels(step.command.name).inc()
+
+    def step_end(self, step, ctx):
+        self._finish_step(step, ctx)
+
+    def step_fail(self, step, ctx):
+        self._finish_step(step, ctx)
+
+    def step_retry(self, step, ctx):
+        self.step_retries.labels(ctx.testcase.name, step.command.name).inc()
+        self._count_rc(step, ctx)
+
+    # ---------- helpers ----------
+    def dump(self):
+        """写 node_exporter textfile collector 文件（write_to_textfile 先写临时文件再 rename，原子替换）"""
+        if self.textfile:
+            write_to_textfile(str(self.textfile), self.registry)
+
+    def close(self):
+        self.dump()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server = None
+
+    def _start(self, key, ctx):
+        with self._lock:
+            self._started[key] = _event_time(ctx)
+
+    def _elapsed(self, key, ctx):
+        with self._lock:
+            started = self._started.pop(key, None)
+        return None if started is None else _event_time(ctx) - started
+
+    def _finish_testcase(self, testcase, ctx, status):
+        elapsed = self._elapsed(ctx.testcase_id, ctx)
+        if elapsed is not None:
+            self.testcase_latency.labels(testcase.name, status).observe(elapsed)
+        self.testcases_in_flight.labels(testcase.name).dec()
+        self.dump()
+
+    def _finish_step(self, step, ctx):
+        elapsed = self._elapsed(ctx.step_id, ctx)
+        if elapsed is not None:
+            self.step_latency.labels(ctx.testcase.name, step.command.name).observe(elapsed)
+        self.steps_in_flight.labels(step.command.name).dec()
+        self._count_rc(step, ctx)
+
+    def _count_rc(self, step, ctx):
+        rc = ctx.vars.get("last_returncode")
+        if rc is not None:
+            self.step_rc.labels(step.command.name, str(rc)).inc()
+
+
+def _event_time(ctx):
+    # 经 ObserverBus 后台投递时用事件发出时刻计时，排除队列等待
+    return ctx.event_time if ctx.event_time is not None else time.monotonic()
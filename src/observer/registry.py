@@ -0,0 +1,18 @@
+# observer/registry.py
+"""
+观察者插件：按名称延迟加载（见 core.plugins）
+
+allure / prometheus_client / sqlite3 等依赖只在对应观察者被启用时才 import；
+第三方观察者可注册后通过 main.py --observer NAME 启用（需无参构造）：
+
+    OBSERVERS.register("slack", "my_plugins.slack:SlackObserver")
+"""
+from core.plugins import PluginRegistry
+
+OBSERVERS = PluginRegistry("observer", {
+    "logger": "observer.logger:LoggerObserver",
+    "allure": "observer.allure:AllureObserver",
+    "metrics": "observer.metrics:MetricsObserver",
+    "results": "observer.results:ResultsObserver",
+    "tracing": "observer.tracing:TracingObserver",
+})
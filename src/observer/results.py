@@ -0,0 +1,331 @@
+# observer/results.py
+"""
+结果库：把每次运行的 testcase / step 结果写入本地 SQLite，供历史查询、调度与回归分析使用
+
+表结构：
+- runs       (run_id, started_at, finished_at, host, argv)
+- testcases  (run_id, testcase, testcase_id, params, status, started_at, duration, error)
+- steps      (run_id, testcase, testcase_id, step_id, step, command, status, rc, retries,
+              started_at, duration, stdout_digest, stderr_digest, error)
+
+params 为 matrix 参数的 JSON；digest 为输出摘要（blake2b-128），用于比较不同运行的输出是否变化
+
+命令行：
+    python -m observer.results --db results.db slowest [--limit 10]
+    python -m observer.results --db results.db flaky [--limit 10] [--min-runs 3]
+    python -m observer.results --db results.db trend <step> [--testcase NAME] [--limit 30]
+"""
+import argparse
+import hashlib
+import json
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from observer.base import BaseObserver
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      TEXT PRIMARY KEY,
+    started_at  REAL NOT NULL,
+    finished_at REAL,
+    host        TEXT,
+    argv        TEXT
+);
+CREATE TABLE IF NOT EXISTS testcases (
+    run_id      TEXT NOT NULL,
+    testcase    TEXT NOT NULL,
+    testcase_id TEXT NOT NULL,
+    params      TEXT,
+    status      TEXT NOT NULL,
+    started_at  REAL,
+    duration    REAL,
+    error       TEXT
+);
+CREATE TABLE IF NOT EXISTS steps (
+    run_id        TEXT NOT NULL,
+    testcase      TEXT NOT NULL,
+    testcase_id   TEXT NOT NULL,
+    step_id       TEXT NOT NULL,
+    step          TEXT NOT NULL,
+    command       TEXT,
+    status        TEXT NOT NULL,
+    rc            INTEGER,
+    retries       INTEGER,
+    started_at    REAL,
+    duration      REAL,
+    stdout_digest TEXT,
+    stderr_digest TEXT,
+    error         TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_testcases_run  ON testcases(run_id);
+CREATE INDEX IF NOT EXISTS idx_testcases_case ON testcases(testcase, testcase_id, started_at);
+CREATE INDEX IF NOT EXISTS idx_steps_run      ON steps(run_id);
+CREATE INDEX IF NOT EXISTS idx_steps_case     ON steps(testcase, step, started_at);
+CREATE INDEX IF NOT EXISTS idx_steps_step_id  ON steps(step_id);
+"""
+
+
+def _digest(text):
+    if not text:
+        return None
+    return hashlib.blake2b(text.encode("utf-8", errors="replace"), digest_size=16).hexdigest()
+
+
+class ResultStore:
+    """SQLite 结果库（WAL 模式，连接可跨线程使用，写入串行化）"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # WAL 下 NORMAL 只在 checkpoint 时 fsync，批量写入足够安全
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ---------- write ----------
+    def start_run(self, run_id, argv=None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO runs (run_id, started_at, host, argv) VALUES (?, ?, ?, ?)",
+                (run_id, time.time(), socket.gethostname(), json.dumps(argv or [])),
+            )
+            self._conn.commit()
+
+    def finish_run(self, run_id):
+        with self._lock:
+            self._conn.execute("UPDATE runs SET finished_at = ? WHERE run_id = ?", (time.time(), run_id))
+            self._conn.commit()
+
+    def write(self, testcases=(), steps=()):
+        """批量写入（一个事务）"""
+        with self._lock, self._conn:
+            if testcases:
+                self._conn.executemany(
+                    "INSERT INTO testcases VALUES (?, ?, ?, ?, ?, ?, ?, ?)", testcases)
+            if steps:
+                self._conn.executemany(
+                    "INSERT INTO steps VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", steps)
+
+    # ---------- query ----------
+    def query(self, sql, params=()):
+        with self._lock:
+            return [dict(r) for r in self._conn.execute(sql, params)]
+
+    def recent_durations(self, per_case=10):
+        """每个组合最近 per_case 次运行的耗时：[{testcase, testcase_id, duration}]"""
+        return self.query("""
+            SELECT testcase, testcase_id, duration FROM (
+                SELECT testcase, testcase_id, duration,
+                       ROW_NUMBER() OVER (PARTITION BY testcase_id ORDER BY started_at DESC) AS rn
+                FROM testcases
+                WHERE duration IS NOT NULL
+            )
+            WHERE rn <= ?""", (per_case,))
+
+    def slowest_steps(self, limit=10, run_id=None):
+        """按平均耗时排序的 step（testcase + step 名聚合所有 matrix 组合）"""
+        where, params = ("WHERE run_id = ?", (run_id,)) if run_id else ("", ())
+        return self.query(f"""
+            SELECT testcase, step, COUNT(*) AS runs,
+                   AVG(duration) AS avg_duration, MAX(duration) AS max_duration
+            FROM steps {where}
+            GROUP BY testcase, step
+            ORDER BY avg_duration DESC
+            LIMIT ?""", params + (limit,))
+
+    def flakiest_cases(self, limit=10, min_runs=2):
+        """
+        按结果翻转率排序的组合：相邻两次运行 passed / failed 不同记一次翻转，
+        flip_rate = 翻转次数 / (运行次数 - 1)；一直失败的组合不算 flaky
+        """
+        return self.query("""
+            WITH ordered AS (
+                SELECT testcase, testcase_id, status,
+                       LAG(status) OVER (PARTITION BY testcase_id ORDER BY started_at) AS prev
+                FROM testcases
+            )
+            SELECT testcase, testcase_id, COUNT(*) AS runs,
+                   SUM(status = 'failed') AS failures,
+                   SUM(prev IS NOT NULL AND prev != status) AS flips,
+                   CAST(SUM(prev IS NOT NULL AND prev != status) AS REAL) / (COUNT(*) - 1) AS flip_rate
+            FROM ordered
+            GROUP BY testcase, testcase_id
+            HAVING COUNT(*) >= MAX(?, 2) AND flips > 0
+            ORDER BY flip_rate DESC, failures DESC
+            LIMIT ?""", (min_runs, limit))
+
+    def duration_trend(self, step, testcase=None, limit=30):
+        """step 每次运行的平均 / 最大耗时，按运行开始时间升序（最近 limit 次）"""
+        where = "WHERE s.step = ?" + (" AND s.testcase = ?" if testcase else "")
+        params = (step,) + ((testcase,) if testcase else ())
+        rows = self.query(f"""
+            SELECT s.run_id, r.started_at, COUNT(*) AS samples,
+                   AVG(s.duration) AS avg_duration, MAX(s.duration) AS max_duration,
+                   SUM(s.status = 'failed') AS failures
+            FROM steps s JOIN runs r ON r.run_id = s.run_id
+            {where}
+            GROUP BY s.run_id
+            ORDER BY r.started_at DESC
+            LIMIT ?""", params + (limit,))
+        return rows[::-1]
+
+
+class ResultsObserver(BaseObserver):
+    """
+    结果库观察者：step / 组合结束时生成一行结果，攒够 batch_size 行或组合结束时批量写入
+    """
+
+    def __init__(self, path, run_id=None, batch_size=200, argv=None):
+        self.store = ResultStore(path)
+        self.run_id = run_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.batch_size = batch_size
+        self.store.start_run(self.run_id, argv)
+
+        # testcase_id / step_id -> (开始时间 monotonic, 开始时间 epoch)
+        self._started = {}
+        self._testcases = []
+        self._steps = []
+        self._lock = threading.Lock()
+
+    # ---------- TestCase ----------
+    def testcase_start(self, testcase, ctx):
+        self._start(ctx.testcase_id, ctx)
+
+    def testcase_end(self, testcase, ctx):
+        self._finish_testcase(testcase, ctx, "passed")
+
+    def testcase_fail(self, testcase, ctx):
+        self._finish_testcase(testcase, ctx, "failed")
+
+    # ---------- Step ----------
+    def step_start(self, step, ctx):
+        self._start(ctx.step_id, ctx)
+
+    def step_end(self, step, ctx):
+        self._finish_step(step, ctx, "passed")
+
+    def step_fail(self, step, ctx):
+        self._finish_step(step, ctx, "failed")
+
+    # ---------- helpers ----------
+    def flush(self):
+        with self._lock:
+            testcases, self._testcases = self._testcases, []
+            steps, self._steps = self._steps, []
+        if testcases or steps:
+            self.store.write(testcases, steps)
+
+    def close(self):
+        self.flush()
+        self.store.finish_run(self.run_id)
+        self.store.close()
+
+    def _now(self, ctx):
+        # 经 ObserverBus 后台投递时使用事件发出时刻
+        if ctx.event_time is not None:
+            return ctx.event_time, ctx.event_ns / 1e9
+        return time.monotonic(), time.time()
+
+    def _start(self, key, ctx):
+        with self._lock:
+            self._started[key] = self._now(ctx)
+
+    def _elapsed(self, key, ctx):
+        with self._lock:
+            started = self._started.pop(key, None)
+        if started is None:
+            return None, None
+        return started[1], self._now(ctx)[0] - started[0]
+
+    def _finish_step(self, step, ctx, status):
+        started_at, duration = self._elapsed(ctx.step_id, ctx)
+        row = (
+            self.run_id, ctx.testcase.name, ctx.testcase_id, ctx.step_id, step.name,
+            step.command.name, status, ctx.vars.get("last_returncode"), ctx.retry_count,
+            started_at, duration,
+            _digest(ctx.vars.get("last_stdout")), _digest(ctx.vars.get("last_stderr")),
+            ctx.error if status == "failed" else None,
+        )
+        with self._lock:
+            self._steps.append(row)
+            full = len(self._steps) >= self.batch_size
+        if full:
+            self.flush()
+
+    def _finish_testcase(self, testcase, ctx, status):
+        started_at, duration = self._elapsed(ctx.testcase_id, ctx)
+        params = {k: ctx.vars.get(k) for k in testcase.matrix}
+        row = (
+            self.run_id, testcase.name, ctx.testcase_id,
+            json.dumps(params, sort_keys=True, default=str), status,
+            started_at, duration, ctx.error if status == "failed" else None,
+        )
+        with self._lock:
+            self._testcases.append(row)
+        self.flush()
+
+
+# ---------- CLI ----------
+def _print_rows(rows):
+    if not rows:
+        print("(no results)")
+        return
+    cols = list(rows[0].keys())
+    cells = [[_fmt(r[c]) for c in cols] for r in rows]
+    widths = [max(len(c), *(len(row[i]) for row in cells)) for i, c in enumerate(cols)]
+    print("  ".join(c.ljust(w) for c, w in zip(cols, widths)))
+    for row in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(row, widths)))
+
+
+def _fmt(v):
+    if isinstance(v, float):
+        return f"{v:.3f}"
+    return "" if v is None else str(v)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m observer.results", description="查询 oneTear 结果库")
+    parser.add_argument("--db", default="results.db")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("slowest", help="平均耗时最长的 step")
+    p.add_argument("--limit", type=int, default=10)
+    p.add_argument("--run", default=None, help="只看某次运行")
+
+    p = sub.add_parser("flaky", help="结果翻转最多的组合")
+    p.add_argument("--limit", type=int, default=10)
+    p.add_argument("--min-runs", type=int, default=2)
+
+    p = sub.add_parser("trend", help="某个 step 历次运行的耗时")
+    p.add_argument("step")
+    p.add_argument("--testcase", default=None)
+    p.add_argument("--limit", type=int, default=30)
+
+    args = parser.parse_args(argv)
+    store = ResultStore(args.db)
+    try:
+        if args.cmd == "slowest":
+            rows = store.slowest_steps(args.limit, args.run)
+        elif args.cmd == "flaky":
+            rows = store.flakiest_cases(args.limit, args.min_runs)
+        else:
+            rows = store.duration_trend(args.step, args.testcase, args.limit)
+        _print_rows(rows)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,301 @@
+# observer/tracing.py
+"""
+OpenTelemetry 风格的 Trace 观察者（不依赖 opentelemetry SDK）
+
+span 结构（每个 matrix 组合一条 trace）：
+
+    testcase                      attributes: onetear.testcase_id / onetear.matrix.<key>
+    └── step                      attributes: onetear.step_id / onetear.command / onetear.rc ...
+        ├── render / execute      action=do|redo|undo，重试与 eventually 重跑各一段
+        ├── assert
+        └── observe               观察者回调耗时（本观察者自身开销也计入）
+
+span 结束后进入批处理队列，由后台线程按 batch_size / flush_interval 批量导出：
+- FileSpanExporter：每批一行 OTLP/JSON（ExportTraceServiceRequest），可直接导入 collector
+- HttpSpanExporter：POST OTLP/JSON 到本地 collector（如 http://127.0.0.1:4318/v1/traces）
+"""
+import json
+import os
+import queue
+import threading
+import time
+import urllib.request
+from observer.base import BaseObserver
+
+# OTLP span status code
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+# SPAN_KIND_INTERNAL
+_KIND_INTERNAL = 1
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start_ns", "end_ns",
+                 "attributes", "events", "status", "status_message")
+
+    def __init__(self, name, trace_id, parent_id="", start_ns=None, attributes=None):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.events = []
+        self.status = STATUS_UNSET
+        self.status_message = ""
+
+    def add_event(self, name, attributes=None, ts_ns=None):
+        self.events.append((name, ts_ns or time.time_ns(), dict(attributes or {})))
+
+    def end(self, status=STATUS_OK, message="", end_ns=None):
+        self.end_ns = end_ns or time.time_ns()
+        self.status = status
+        self.status_message = message
+
+    def to_otlp(self):
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "kind": _KIND_INTERNAL,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": _attributes(self.attributes),
+            "status": {"code": self.status},
+        }
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        if self.events:
+            span["events"] = [
+                {"name": name, "timeUnixNano": str(ts), "attributes": _attributes(attrs)}
+                for name, ts, attrs in self.events
+            ]
+        return span
+
+
+def _attr_value(v):
+    if isinstance(v, bool):
+        return {"boolValue": v}
+    if isinstance(v, int):
+        return {"intValue": str(v)}
+    if isinstance(v, float):
+        return {"doubleValue": v}
+    return {"stringValue": str(v)}
+
+
+def _attributes(attrs):
+    return [{"key": k, "value": _attr_value(v)} for k, v in attrs.items() if v is not None]
+
+
+def otlp_request(spans, service_name="onetear"):
+    """组装 OTLP/JSON ExportTraceServiceRequest"""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _attributes({"service.name": service_name})},
+            "scopeSpans": [{
+                "scope": {"name": "onetear"},
+                "spans": [s.to_otlp() for s in spans],
+            }],
+        }]
+    }
+
+
+# ---------- Exporters ----------
+class FileSpanExporter:
+    """每批 span 追加一行 OTLP/JSON"""
+
+    def __init__(self, path, service_name="onetear"):
+        self.path = path
+        self.service_name = service_name
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        self._fp = open(path, "a", encoding="utf-8")
+
+    def export(self, spans):
+        line = json.dumps(otlp_request(spans, self.service_name), ensure_ascii=False)
+        self._fp.write(line + "\n")
+        self._fp.flush()
+
+    def close(self):
+        self._fp.close()
+
+
+class HttpSpanExporter:
+    """POST OTLP/JSON 到 collector（OTLP/HTTP 的 JSON 编码）"""
+
+    def __init__(self, endpoint, service_name="onetear", timeout=5):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+
+    def export(self, spans):
+        body = json.dumps(otlp_request(spans, self.service_name)).encode("utf-8")
+        req = urllib.request.Request(
+            self.endpoint, data=body, method="POST",
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            resp.read()
+
+    def close(self):
+        pass
+
+
+class BatchSpanProcessor:
+    """
+    后台线程批量导出：攒满 batch_size 或距上次导出超过 flush_interval 秒即导出一批
+    队列满时丢弃新 span 并计数（dropped），不阻塞用例执行；导出失败同样只计数
+    """
+
+    def __init__(self, exporter, batch_size=512, flush_interval=1.0, max_queue=8192):
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.failed = 0
+
+        self._queue = queue.Queue(max_queue)
+        self._flush = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._worker, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def on_end(self, span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def force_flush(self):
+        self._flush.set()
+
+    def shutdown(self):
+        if self._stopped:
+            return
+        self._stopped = True
+        self._queue.put(None)
+        self._thread.join()
+        self.exporter.close()
+
+    def _worker(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                span = self._queue.get(timeout=max(deadline - time.monotonic(), 0.01))
+            except queue.Empty:
+                span = False
+
+            if span is None:
+                self._export(batch)
+                return
+            if span:
+                batch.append(span)
+
+            if (len(batch) >= self.batch_size or self._flush.is_set()
+                    or time.monotonic() >= deadline):
+                self._flush.clear()
+                self._export(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _export(self, batch):
+        if not batch:
+            return
+        try:
+            self.exporter.export(batch)
+        except Exception:
+            self.failed += len(batch)
+
+
+# ---------- Observer ----------
+class TracingObserver(BaseObserver):
+    """
+    step 的子 span 由 ctx.phases 生成（引擎在 render / execute / assert 及通知观察者时记录），
+    在 step_end / step_fail 时统一补出；因此 step_end 本次通知的观察者耗时不在 trace 中，
+    step_start / step_retry 的观察者耗时会记为 observe 子 span
+    """
+
+    def __init__(self, exporter, batch_size=512, flush_interval=1.0):
+        self.processor = BatchSpanProcessor(exporter, batch_size, flush_interval)
+        # testcase_id / step_id -> Span（并发组合 / DAG step 互不干扰）
+        self._spans = {}
+        self._lock = threading.Lock()
+
+    # ---------- TestCase ----------
+    def testcase_start(self, testcase, ctx):
+        attrs = {"onetear.testcase": testcase.name, "onetear.testcase_id": ctx.testcase_id}
+        for key in testcase.matrix:
+            attrs[f"onetear.matrix.{key}"] = ctx.vars.get(key)
+        span = Span(testcase.name, os.urandom(16).hex(), start_ns=ctx.event_ns, attributes=attrs)
+        with self._lock:
+            self._spans[ctx.testcase_id] = span
+
+    def testcase_end(self, testcase, ctx):
+        self._finish_testcase(ctx, STATUS_OK)
+
+    def testcase_fail(self, testcase, ctx):
+        self._finish_testcase(ctx, STATUS_ERROR, "testcase failed")
+
+    # ---------- Step ----------
+    def step_start(self, step, ctx):
+        with self._lock:
+            parent = self._spans.get(ctx.testcase_id)
+        if parent is None:
+            return
+        span = Span(step.name, parent.trace_id, parent.span_id, start_ns=ctx.event_ns, attributes={
+            "onetear.step_id": ctx.step_id,
+            "onetear.step_index": ctx.step_index,
+            "onetear.command": step.command.name,
+            "onetear.testcase_id": ctx.testcase_id,
+        })
+        with self._lock:
+            self._spans[ctx.step_id] = span
+
+    def step_end(self, step, ctx):
+        self._finish_step(ctx, STATUS_OK)
+
+    def step_fail(self, step, ctx):
+        self._finish_step(ctx, STATUS_ERROR, ctx.vars.get("last_stderr") or "step failed")
+
+    def step_retry(self, step, ctx):
+        with self._lock:
+            span = self._spans.get(ctx.step_id)
+        if span is not None:
+            span.add_event("retry", {
+                "onetear.retry_count": ctx.retry_count,
+                "onetear.rc": ctx.vars.get("last_returncode"),
+            }, ts_ns=ctx.event_ns)
+
+    # ---------- helpers ----------
+    def close(self):
+        self.processor.shutdown()
+
+    def _finish_step(self, ctx, status, message=""):
+        with self._lock:
+            span = self._spans.pop(ctx.step_id, None)
+        if span is None:
+            return
+
+        for name, start, end, attrs in list(ctx.phases):
+            child = Span(name, span.trace_id, span.span_id, start_ns=start, attributes=attrs)
+            child.end(STATUS_UNSET, end_ns=end)
+            self.processor.on_end(child)
+
+        span.attributes["onetear.rc"] = ctx.vars.get("last_returncode")
+        span.attributes["onetear.retry_count"] = ctx.retry_count
+        span.end(status, str(message)[:1024] if status == STATUS_ERROR else "", end_ns=ctx.event_ns)
+        self.processor.on_end(span)
+
+    def _finish_testcase(self, ctx, status, message=""):
+        with self._lock:
+            span = self._spans.pop(ctx.testcase_id, None)
+        if span is None:
+            return
+        span.end(status, message, end_ns=ctx.event_ns)
+        self.processor.on_end(span)
+        self.processor.force_flush()
@@ -0,0 +1,85 @@
+# tools/import_bench.py
+"""
+启动耗时基准：测量 import 入口模块（main / cases.conftest）的耗时，并检查重依赖没有被提前加载
+
+    python tools/import_bench.py                        # 报告
+    python tools/import_bench.py --budget-ms 150        # 超出预算退出码 1（CI 防回归）
+
+每次在新的解释器里执行 python -X importtime -c "import <module>"，取多次的中位数；
+--forbid 列出的模块（psycopg2 / allure / prometheus_client / asyncio / multiprocessing ...）只应在对应命令 / 观察者 / 模式启用时加载，
+出现在入口模块的 import 链上即判失败
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent
+
+DEFAULT_MODULES = ["main"]
+DEFAULT_FORBID = ["psycopg2", "allure", "prometheus_client", "sqlite3", "zstandard", "asyncio", "multiprocessing"]
+
+
+def measure(module):
+    """返回 (总耗时 ms, {模块: 自身耗时 ms})"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr}")
+
+    self_ms, total_ms = {}, 0.0
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        self_ms[name] = int(own) / 1000
+        if name == module:
+            total_ms = int(cumulative) / 1000
+    return total_ms, self_ms
+
+
+def forbidden_imports(imported, forbid):
+    return sorted(m for m in imported if m.split(".")[0] in forbid)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="import 耗时基准")
+    parser.add_argument("--module", action="append", default=None,
+                        help=f"入口模块（可重复，默认 {DEFAULT_MODULES}）")
+    parser.add_argument("--repeat", type=int, default=5, help="每个模块测量次数，取中位数")
+    parser.add_argument("--top", type=int, default=10, help="列出自身耗时最多的模块数")
+    parser.add_argument("--budget-ms", type=float, default=None, help="总耗时预算（中位数），超出即失败")
+    parser.add_argument("--forbid", nargs="*", default=DEFAULT_FORBID,
+                        help="不允许出现在 import 链上的顶层包")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module in args.module or DEFAULT_MODULES:
+        # 第一次运行会写 .pyc，不计入
+        measure(module)
+        runs = [measure(module) for _ in range(args.repeat)]
+        total = statistics.median(r[0] for r in runs)
+        self_ms = runs[-1][1]
+
+        print(f"{module}: {total:.1f} ms (median of {args.repeat}, {len(self_ms)} modules)")
+        for name, ms in sorted(self_ms.items(), key=lambda kv: -kv[1])[:args.top]:
+            print(f"  {ms:8.2f} ms  {name}")
+
+        bad = forbidden_imports(self_ms, set(args.forbid))
+        if bad:
+            failed = True
+            print(f"  FAIL: heavy modules imported eagerly: {', '.join(bad)}")
+        if args.budget_ms is not None and total > args.budget_ms:
+            failed = True
+            print(f"  FAIL: {total:.1f} ms exceeds budget {args.budget_ms:.1f} ms")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())